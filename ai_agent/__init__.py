@@ -1,19 +1,36 @@
 """
 Пакет для работы с LLM моделями через абстрактный интерфейс.
 Поддерживает DeepSeek, OpenAI и других провайдеров.
+
+Настройки, клиент и сервис создаются лениво при первом обращении,
+SDK провайдеров не импортируются при импорте пакета.
 """
 
-from .client import llm_client, LLMClient
-from .config import llm_settings
-from .food_analysis_service import food_analysis_service, FoodAnalysisService
+from importlib import import_module
+from typing import Any
 
-__all__ = [
+_LAZY_ATTRIBUTES = {
     # Синглтон-клиент
-    "llm_client",
-    "LLMClient",
+    "llm_client": ".client",
+    "LLMClient": ".client",
     # Настройки
-    "llm_settings",
+    "llm_settings": ".config",
+    "get_llm_settings": ".config",
     # Сервис
-    "food_analysis_service",
-    "FoodAnalysisService",
-]
+    "food_analysis_service": ".food_analysis_service",
+    "get_food_analysis_service": ".food_analysis_service",
+    "FoodAnalysisService": ".food_analysis_service",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module_name, __name__), name)
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,186 @@
+"""
+Модуль с circuit breaker для провайдеров LLM.
+
+Breaker отслеживает долю ошибок и медленных вызовов в скользящем окне.
+Разомкнутый провайдер пропускается сразу, без ожидания таймаута.
+"""
+
+import enum
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class BreakerState(str, enum.Enum):
+    """Состояния circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class ProviderUnavailableError(Exception):
+    """Провайдер недоступен: breaker разомкнут или цепочка исчерпана"""
+
+
+class CircuitBreaker:
+    """
+    Потокобезопасный circuit breaker (closed / open / half-open).
+
+    closed: вызовы проходят, результаты пишутся в окно.
+    open: вызовы отклоняются до истечения open_seconds.
+    half-open: пропускается half_open_calls пробных вызовов;
+        успех замыкает breaker, ошибка снова размыкает.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_size: int = 20,
+        slow_call_seconds: float = 20.0,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._window: deque[tuple[bool, float]] = deque(maxlen=window_size)
+        self._state = BreakerState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> BreakerState:
+        """Текущее состояние с учетом истечения open_seconds"""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> BreakerState:
+        if (
+            self._state == BreakerState.OPEN
+            and self._clock() - self._opened_at >= self.open_seconds
+        ):
+            self._state = BreakerState.HALF_OPEN
+            self._half_open_in_flight = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Проверяет, можно ли отправить вызов провайдеру"""
+        with self._lock:
+            state = self._current_state()
+            if state == BreakerState.CLOSED:
+                return True
+            if (
+                state == BreakerState.HALF_OPEN
+                and self._half_open_in_flight < self.half_open_calls
+            ):
+                self._half_open_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def release(self) -> None:
+        """Освобождает пробный слот вызова, отмененного без результата"""
+        with self._lock:
+            if self._state == BreakerState.HALF_OPEN and self._half_open_in_flight:
+                self._half_open_in_flight -= 1
+
+    def record_success(self, latency: float) -> None:
+        """Фиксирует успешный вызов (медленный вызов считается ошибкой)"""
+        if latency > self.slow_call_seconds:
+            self.record_failure(latency)
+            return
+        with self._lock:
+            if self._current_state() == BreakerState.HALF_OPEN:
+                self._close()
+            self._window.append((True, latency))
+
+    def record_failure(self, latency: float) -> None:
+        """Фиксирует неуспешный вызов"""
+        with self._lock:
+            if self._current_state() == BreakerState.HALF_OPEN:
+                self._open()
+                return
+            self._window.append((False, latency))
+            if self._should_open():
+                self._open()
+
+    def _should_open(self) -> bool:
+        if len(self._window) < self.min_calls:
+            return False
+        failures = sum(1 for ok, _ in self._window if not ok)
+        return failures / len(self._window) >= self.failure_rate
+
+    def _open(self) -> None:
+        self._state = BreakerState.OPEN
+        self._opened_at = self._clock()
+        self._half_open_in_flight = 0
+
+    def _close(self) -> None:
+        self._state = BreakerState.CLOSED
+        self._window.clear()
+        self._half_open_in_flight = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние breaker для интроспекции"""
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            latencies = [latency for _, latency in self._window]
+            return {
+                "state": state.value,
+                "calls": calls,
+                "failures": failures,
+                "error_rate": failures / calls if calls else 0.0,
+                "avg_latency": sum(latencies) / calls if calls else 0.0,
+                "rejected": self._rejected,
+                "open_remaining": (
+                    max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+                    if state == BreakerState.OPEN
+                    else 0.0
+                ),
+            }
+
+
+class CircuitBreakerRegistry:
+    """Реестр breaker'ов по провайдерам, общий для потоков воркера"""
+
+    def __init__(self, config_factory: Callable[[], Dict[str, Any]] = dict) -> None:
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._config_factory = config_factory
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Возвращает breaker провайдера, создавая его при первом обращении"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **self._config_factory())
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние всех breaker'ов"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Сбрасывает breaker провайдера или все breaker'ы"""
+        with self._lock:
+            if name is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(name, None)
@@ -2,48 +2,283 @@
 Модуль содержит клиент для работы с LLM.
 """
 
+import asyncio
+import threading
+import weakref
 from dataclasses import dataclass
+from functools import cached_property
 from logging import getLogger
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from gigachat import GigaChat
-from langchain_openai import ChatOpenAI
+from ai_agent.circuit_breaker import CircuitBreakerRegistry
+from ai_agent.concurrency_limiter import AdaptiveLimiterRegistry
+from ai_agent.config import LLMProvider, LLMSettings, ModelRoute, get_llm_settings
+from ai_agent.credentials import CredentialPool, CredentialPoolRegistry
+from ai_agent.http_pool import HTTPPoolRegistry
+from ai_agent.routing import RoutingPolicy, get_routing_policy
 
-from ai_agent.config import LLMProvider, llm_settings
+if TYPE_CHECKING:
+    from ai_agent.fake_provider import FakeLLM
+    from gigachat import GigaChat
+    from langchain_openai import ChatOpenAI
 
 logger = getLogger()
 
+# Breaker'ы провайдеров общие для всех потоков воркера
+circuit_breakers = CircuitBreakerRegistry(
+    lambda: get_llm_settings().get_breaker_config()
+)
+
+# Адаптивные лимиты одновременных вызовов провайдеров
+concurrency_limiters = AdaptiveLimiterRegistry(
+    lambda: get_llm_settings().get_concurrency_config()
+)
+
+# Пулы ключей провайдеров: выбор ключа и охлаждение после 429
+credential_pools = CredentialPoolRegistry(
+    lambda: get_llm_settings().get_credential_pool_config()
+)
+
+# Keep-alive пулы соединений к провайдерам, общие для процесса
+http_pools = HTTPPoolRegistry(lambda: get_llm_settings().get_http_pool_config())
+
+
+class _LazySettings:
+    """Дескриптор, возвращающий настройки LLM при первом обращении"""
+
+    def __get__(self, instance, owner) -> LLMSettings:
+        return get_llm_settings()
+
+
+def _gigachat_factory(
+    provider: LLMProvider,
+    loop: Optional[asyncio.AbstractEventLoop],
+    settings: Dict[str, Any],
+) -> "GigaChat":
+    from gigachat import GigaChat
+
+    client = GigaChat(**settings)
+
+    # Подставляем общие пулы вместо httpx клиентов SDK, чтобы соединения
+    # жили между запросами. gigachat 0.2 хранит клиентов в атрибутах
+    # _client_instance/_aclient_instance за свойствами _client/_aclient,
+    # более ранние версии - в cached_property _client/_aclient
+    http_kwargs = {
+        "base_url": settings["base_url"],
+        "verify": settings.get("verify_ssl_certs", True),
+        "timeout": settings["timeout"],
+    }
+    pooled = {
+        "_client": lambda: http_pools.sync_client(provider.value, **http_kwargs),
+        "_aclient": lambda: http_pools.async_client(
+            provider.value, loop=loop, **http_kwargs
+        ),
+    }
+    for attribute, pool_factory in pooled.items():
+        if hasattr(client, f"{attribute}_instance"):
+            setattr(client, f"{attribute}_instance", pool_factory())
+        elif isinstance(getattr(type(client), attribute, None), cached_property):
+            client.__dict__[attribute] = pool_factory()
+        else:
+            logger.warning("HTTP пул не подключен к клиенту GigaChat: %s", attribute)
+    return client
+
+
+def _chat_openai_factory(
+    provider: LLMProvider,
+    loop: Optional[asyncio.AbstractEventLoop],
+    settings: Dict[str, Any],
+) -> "ChatOpenAI":
+    from langchain_openai import ChatOpenAI
+
+    http_kwargs = {"timeout": settings["timeout"]}
+    return ChatOpenAI(
+        # Итоговый расход токенов приходит последним фрагментом потока
+        **{"stream_usage": True, **settings},
+        http_client=http_pools.sync_client(provider.value, **http_kwargs),
+        http_async_client=http_pools.async_client(
+            provider.value, loop=loop, **http_kwargs
+        ),
+    )
+
+
+def _fake_factory(
+    provider: LLMProvider,
+    loop: Optional[asyncio.AbstractEventLoop],
+    settings: Dict[str, Any],
+) -> "FakeLLM":
+    from ai_agent.fake_provider import FakeLLM
+
+    return FakeLLM(**settings)
+
+
+class ProviderClientRegistry:
+    """
+    Долгоживущий реестр клиентов провайдеров в рамках процесса.
+
+    Асинхронные пулы httpx привязаны к event loop, поэтому клиенты
+    кешируются на пару (event loop, провайдер); вне loop - на провайдера.
+    Для пула ключей у каждого ключа свой клиент (и свой токен доступа),
+    для легкой модели провайдера - отдельный клиент.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sync_clients: Dict[Tuple[LLMProvider, int, ModelRoute], Any] = {}
+        # event loop -> {(провайдер, ключ, модель): клиент}
+        self._loop_clients = weakref.WeakKeyDictionary()
+
+    def get(
+        self,
+        provider: LLMProvider,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        credential: int = 0,
+        route: ModelRoute = ModelRoute.STANDARD,
+    ) -> "ChatOpenAI | GigaChat | FakeLLM":
+        """Возвращает клиента провайдера, создавая его при первом обращении"""
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+
+        with self._lock:
+            clients = (
+                self._loop_clients.setdefault(loop, {}) if loop else self._sync_clients
+            )
+            key = (provider, credential, ModelRoute(route))
+            client = clients.get(key)
+            if client is None:
+                client = LLMClient.create_client(
+                    provider, loop=loop, credential=credential, route=route
+                )
+                clients[key] = client
+            return client
+
+    def clear(self) -> None:
+        """Сбрасывает закешированных клиентов"""
+        with self._lock:
+            self._sync_clients.clear()
+            self._loop_clients.clear()
+
+
+provider_clients = ProviderClientRegistry()
+
 
 @dataclass(frozen=True)
 class LLMClient:
     """
     Клиент для работы с LLM.
     Переключение между провайдерами осуществляется через llm_settings.
+    SDK провайдеров импортируются только при создании клиента.
     """
 
-    _current_provider: LLMProvider = llm_settings.active_provider
-    settings = llm_settings
+    _current_provider: Optional[LLMProvider] = None
+    settings = _LazySettings()
+    breakers = circuit_breakers
+    limiters = concurrency_limiters
+    credentials = credential_pools
+    registry = provider_clients
+
+    factories = {
+        LLMProvider.GIGACHAT: _gigachat_factory,
+        LLMProvider.OPENAI: _chat_openai_factory,
+        LLMProvider.DEEPSEEK: _chat_openai_factory,
+        LLMProvider.FAKE: _fake_factory,
+    }
 
     @classmethod
-    def create_client(cls) -> ChatOpenAI | GigaChat:
+    def create_client(
+        cls,
+        provider: Optional[LLMProvider] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        credential: int = 0,
+        route: ModelRoute = ModelRoute.STANDARD,
+    ) -> "ChatOpenAI | GigaChat | FakeLLM":
         """
-        Возвращает экземпляр клиента для текущего провайдера.
+        Возвращает новый экземпляр клиента для указанного или текущего провайдера.
+
+        Args:
+            provider: Провайдер (по умолчанию активный из настроек)
+            loop: Event loop, к которому привязывается асинхронный пул
+            credential: Индекс ключа провайдера в пуле ключей
+            route: Основная или легкая модель провайдера
         """
+        provider = provider or cls._current_provider or cls.settings.active_provider
 
-        if not cls._current_provider:
-            raise ValueError(f"Unsupported provider: {cls._current_provider}")
+        if not provider:
+            raise ValueError(f"Unsupported provider: {provider}")
+        provider = LLMProvider(provider)
 
-        provider_config = cls.settings.get_provider_config(cls._current_provider)
+        provider_config = cls.settings.get_provider_config(
+            provider, credential=credential, route=route
+        )
         common_settings = cls.settings.get_common_config()
         total_provider_settings = {**provider_config, **common_settings}
 
-        logger.info("total_provider_settings: %s", total_provider_settings)
+        logger.info(
+            "Создание клиента для провайдера: %s (ключ %d, модель %s)",
+            provider.value,
+            credential,
+            ModelRoute(route).value,
+        )
+
+        return cls.factories[provider](provider, loop, total_provider_settings)
+
+    @classmethod
+    def get_client(
+        cls,
+        provider: Optional[LLMProvider] = None,
+        credential: int = 0,
+        route: ModelRoute = ModelRoute.STANDARD,
+    ) -> "ChatOpenAI | GigaChat | FakeLLM":
+        """
+        Возвращает долгоживущий клиент провайдера из реестра процесса.
+
+        Args:
+            provider: Провайдер (по умолчанию активный из настроек)
+            credential: Индекс ключа провайдера в пуле ключей
+            route: Основная или легкая модель провайдера
+        """
+        provider = provider or cls._current_provider or cls.settings.active_provider
+        return cls.registry.get(
+            LLMProvider(provider), credential=credential, route=route
+        )
 
-        clients = {
-            "gigachat": GigaChat(**total_provider_settings),
-            # "openai": ChatOpenAI(**total_provider_settings),
-            # "deepseek": ChatOpenAI(**total_provider_settings),
-        }
-        return clients[cls._current_provider]
+    @classmethod
+    def credential_pool(cls, provider: LLMProvider) -> Optional[CredentialPool]:
+        """
+        Возвращает пул ключей провайдера или None, если ключ один
+        (одиночный ключ не охлаждается: 429 обрабатывают повторы и лимитер).
+        """
+        size = len(cls.settings.get_credentials(provider))
+        if size < 2:
+            return None
+        return cls.credentials.get(provider.value, size)
+
+    @classmethod
+    def routing_policy(cls, provider: Optional[LLMProvider]) -> Optional[RoutingPolicy]:
+        """
+        Возвращает политику выбора модели провайдера по сложности запроса
+        или None, если маршрутизация выключена или легкая модель не задана.
+        """
+        if (
+            provider is None
+            or not cls.settings.routing_enabled
+            or not cls.settings.get_light_overrides(provider)
+        ):
+            return None
+        return get_routing_policy()
+
+    @classmethod
+    def provider_chain(cls) -> List[LLMProvider]:
+        """
+        Возвращает упорядоченную цепочку провайдеров из настроек.
+        """
+        chain = cls.settings.get_provider_chain()
+        for provider in chain:
+            cls.breakers.get(provider.value)
+        return chain
 
 
 llm_client = LLMClient()
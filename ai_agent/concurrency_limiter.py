@@ -0,0 +1,324 @@
+"""
+Модуль с адаптивным ограничением одновременных вызовов провайдеров (AIMD).
+
+Лимит растет аддитивно, пока вызовы успешны и быстры, и уменьшается
+мультипликативно при 429 и таймаутах. Вызовы сверх лимита ждут в очереди
+по полосам приоритета и пациентам (ai_agent.scheduler); при переполнении
+очереди провайдер считается недоступным и цепочка переходит к следующему.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from .circuit_breaker import ProviderUnavailableError
+from .metrics import metrics
+from .scheduler import FairQueue, Lane, RequestClass, current_request, lane_capacity
+
+
+class LimiterQueueFullError(ProviderUnavailableError):
+    """Очередь ожидания лимитера провайдера переполнена"""
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Признак HTTP 429 от провайдера.
+
+    SDK провайдеров не имеют общего базового класса ошибок, поэтому
+    статус ищется в атрибутах ошибки и ее ответа.
+    """
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None)
+        if status is None:
+            status = getattr(source, "status", None)
+        if status == 429:
+            return True
+    return "RateLimit" in type(error).__name__
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Признак перегрузки провайдера: HTTP 429 или таймаут"""
+    if isinstance(error, TimeoutError):
+        return True
+    return is_rate_limit_error(error) or "Timeout" in type(error).__name__
+
+
+@dataclass(eq=False)
+class _Waiter:
+    """Вызов в очереди; future разрешается в его event loop"""
+
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future = field(repr=False)
+    request: RequestClass
+    enqueued_at: float
+    granted: bool = False
+
+
+class AdaptiveLimiter:
+    """
+    Потокобезопасный AIMD лимитер одновременных вызовов провайдера.
+
+    Работает с вызовами из разных event loop (фоновый loop процесса
+    и ASGI): состояние защищено threading.Lock, ожидающие будятся
+    через call_soon_threadsafe.
+
+    Метрики (label provider): ai_agent_concurrency_limit,
+    ai_agent_concurrency_in_flight, ai_agent_concurrency_queue_depth,
+    ai_agent_concurrency_decreases_total (label reason),
+    ai_agent_concurrency_rejected_total; по полосам (label lane):
+    ai_agent_scheduler_in_flight, ai_agent_scheduler_queue_depth,
+    гистограмма ожидания слота ai_agent_scheduler_wait_seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_threshold: float = 10.0,
+        max_queue: int = 100,
+        background_share: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.max_queue = max_queue
+        self.background_share = background_share
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._lane_in_flight = {lane: 0 for lane in Lane}
+        self._waiters = FairQueue()
+        self._decreased_at = float("-inf")
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        """Текущее число разрешенных одновременных вызовов"""
+        with self._lock:
+            return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+    async def acquire(self) -> Lane:
+        """
+        Занимает слот вызова, ожидая в очереди при исчерпании лимита.
+        Полоса и пациент вызова берутся из текущего request_scope().
+
+        Returns:
+            Полоса вызова (передается в release)
+        Raises:
+            LimiterQueueFullError: Если очередь ожидания переполнена
+        """
+        request = current_request()
+        lane = request.lane
+        with self._lock:
+            if not self._waiters.blocks(lane) and self._has_room(lane):
+                self._take(lane, waited=0.0)
+                self._publish()
+                return lane
+            if len(self._waiters) >= self.max_queue:
+                metrics.inc("ai_agent_concurrency_rejected_total", provider=self.name)
+                raise LimiterQueueFullError(
+                    f"Concurrency queue for {self.name} is full ({self.max_queue})"
+                )
+            loop = asyncio.get_running_loop()
+            waiter = _Waiter(loop, loop.create_future(), request, self._clock())
+            self._waiters.push(waiter, request)
+            self._publish()
+
+        try:
+            await waiter.future
+        except BaseException:
+            with self._lock:
+                if waiter.granted:
+                    # Слот выдан одновременно с отменой - возвращаем его
+                    self._in_flight -= 1
+                    self._lane_in_flight[lane] -= 1
+                    self._wake_waiters()
+                else:
+                    self._waiters.remove(waiter)
+                self._publish()
+            raise
+        return lane
+
+    def release(
+        self,
+        started: float,
+        error: Optional[BaseException] = None,
+        cancelled: bool = False,
+        lane: Lane = Lane.INTERACTIVE,
+    ) -> None:
+        """
+        Освобождает слот и корректирует лимит по результату вызова.
+
+        Args:
+            started: Время начала вызова (по часам лимитера)
+            error: Ошибка вызова (None - успех)
+            cancelled: Вызов отменен без результата (лимит не меняется)
+            lane: Полоса вызова (результат acquire)
+        """
+        latency = self._clock() - started
+        with self._lock:
+            saturated = self._in_flight * 2 >= self._limit
+            self._in_flight -= 1
+            self._lane_in_flight[lane] -= 1
+            if cancelled:
+                # Отмененный вызов ничего не говорит о состоянии провайдера
+                self._wake_waiters()
+                self._publish()
+                return
+            if error is None:
+                if latency <= self.latency_threshold and saturated:
+                    self._limit = min(
+                        self.max_limit, self._limit + self.increase / self._limit
+                    )
+            elif is_overload_error(error) and started >= self._decreased_at:
+                # Одна волна 429 уменьшает лимит один раз: ошибки вызовов,
+                # начатых до предыдущего уменьшения, не учитываются
+                self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                self._decreased_at = self._clock()
+                metrics.inc(
+                    "ai_agent_concurrency_decreases_total",
+                    provider=self.name,
+                    reason="timeout" if isinstance(error, TimeoutError) else "429",
+                )
+            self._wake_waiters()
+            self._publish()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Контекст вызова провайдера в пределах лимита"""
+        lane = await self.acquire()
+        started = self._clock()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            self.release(started, cancelled=True, lane=lane)
+            raise
+        except BaseException as e:
+            self.release(started, error=e, lane=lane)
+            raise
+        self.release(started, lane=lane)
+
+    def _has_room(self, lane: Lane) -> bool:
+        """Можно ли занять слот в полосе (фоновая - не больше своей доли)"""
+        limit = int(self._limit)
+        capacity = lane_capacity(lane, limit, self.background_share)
+        return self._in_flight < limit and self._lane_in_flight[lane] < capacity
+
+    def _take(self, lane: Lane, waited: float) -> None:
+        self._in_flight += 1
+        self._lane_in_flight[lane] += 1
+        metrics.observe(
+            "ai_agent_scheduler_wait_seconds",
+            waited,
+            provider=self.name,
+            lane=lane.value,
+        )
+
+    def _wake_waiters(self) -> None:
+        while True:
+            waiter = self._waiters.pop(self._has_room)
+            if waiter is None:
+                return
+            waiter.granted = True
+            self._take(waiter.request.lane, self._clock() - waiter.enqueued_at)
+            waiter.loop.call_soon_threadsafe(_grant, waiter.future)
+
+    def _publish(self) -> None:
+        metrics.set_gauge(
+            "ai_agent_concurrency_limit", self._limit, provider=self.name
+        )
+        metrics.set_gauge(
+            "ai_agent_concurrency_in_flight", self._in_flight, provider=self.name
+        )
+        metrics.set_gauge(
+            "ai_agent_concurrency_queue_depth", len(self._waiters), provider=self.name
+        )
+        for lane in Lane:
+            metrics.set_gauge(
+                "ai_agent_scheduler_in_flight",
+                self._lane_in_flight[lane],
+                provider=self.name,
+                lane=lane.value,
+            )
+            metrics.set_gauge(
+                "ai_agent_scheduler_queue_depth",
+                self._waiters.depth(lane),
+                provider=self.name,
+                lane=lane.value,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Состояние лимитера для интроспекции"""
+        with self._lock:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "lanes": {
+                    lane.value: {
+                        "in_flight": self._lane_in_flight[lane],
+                        "queue_depth": self._waiters.depth(lane),
+                    }
+                    for lane in Lane
+                },
+            }
+
+
+class AdaptiveLimiterRegistry:
+    """Реестр лимитеров по провайдерам, общий для потоков воркера"""
+
+    def __init__(self, config_factory: Callable[[], Dict[str, Any]] = dict) -> None:
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._config_factory = config_factory
+
+    def get(self, name: str) -> AdaptiveLimiter:
+        """Возвращает лимитер провайдера, создавая его при первом обращении"""
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = AdaptiveLimiter(name, **self._config_factory())
+                self._limiters[name] = limiter
+            return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние всех лимитеров"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.snapshot() for name, limiter in limiters.items()}
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Сбрасывает лимитер провайдера или все лимитеры"""
+        with self._lock:
+            if name is None:
+                self._limiters.clear()
+            else:
+                self._limiters.pop(name, None)
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -1,8 +1,10 @@
 """Модуль содержит конфигурационные настройки для работы с LLM."""
 
-from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field, SecretStr, validator, model_validator
-from typing import Optional, Dict, Any
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
+from pydantic import Field, SecretStr, validator, model_validator, field_validator
+from typing import Annotated, Optional, Dict, Any, List
 from enum import Enum
 
 
@@ -12,6 +14,37 @@ class LLMProvider(str, Enum):
     OPENAI = "openai"
     GIGACHAT = "gigachat"
     DEEPSEEK = "deepseek"
+    FAKE = "fake"  # локальный фейковый провайдер без сети
+
+
+class FakeLatencyDistribution(str, Enum):
+    """Распределение задержки фейкового провайдера"""
+
+    CONSTANT = "constant"
+    UNIFORM = "uniform"
+    NORMAL = "normal"
+    LOGNORMAL = "lognormal"
+
+
+class MultiImageMode(str, Enum):
+    """Режим анализа нескольких изображений"""
+
+    PER_IMAGE = "per_image"  # отдельный запрос на каждое изображение
+    SINGLE_REQUEST = "single_request"  # все изображения в одном запросе
+
+
+class NutritionSource(str, Enum):
+    """Источник КБЖУ блюд"""
+
+    LLM = "llm"  # КБЖУ рассчитывает модель
+    LOCAL = "local"  # модель называет блюда и вес, КБЖУ из локальной таблицы
+
+
+class ModelRoute(str, Enum):
+    """Модель провайдера, выбранная по сложности запроса"""
+
+    LIGHT = "light"  # быстрая дешевая модель для простых запросов
+    STANDARD = "standard"  # основная модель провайдера
 
 
 class LLMSettings(BaseSettings):
@@ -31,6 +64,13 @@ class LLMSettings(BaseSettings):
         validation_alias="ACTIVE_LLM_PROVIDER",
     )
 
+    # Цепочка провайдеров для fallback (через запятую: gigachat,openai)
+    provider_chain: Annotated[List[LLMProvider], NoDecode] = Field(
+        default_factory=list,
+        description="Упорядоченная цепочка провайдеров (по умолчанию активный)",
+        validation_alias="LLM_PROVIDER_CHAIN",
+    )
+
     # OpenAI
     openai_api_key: Optional[SecretStr] = Field(
         None, description="OpenAI API ключ", validation_alias="OPENAI_API_KEY"
@@ -66,19 +106,51 @@ class LLMSettings(BaseSettings):
         validation_alias="GIGACHAT_BASE_URL",
     )
 
-    # DeepSeek
+    # DeepSeek (свои переменные: OPENAI_* относятся только к OpenAI)
     deepseek_api_key: Optional[SecretStr] = Field(
-        None, description="OpenAI API ключ", validation_alias="OPENAI_API_KEY"
+        None, description="DeepSeek API ключ", validation_alias="DEEPSEEK_API_KEY"
     )
     deepseek_base_url: str = Field(
         "https://api.deepseek.com",
-        description="OpenAI base URL",
-        validation_alias="OPENAI_BASE_URL",
+        description="DeepSeek base URL",
+        validation_alias="DEEPSEEK_BASE_URL",
     )
     deepseek_model: str = Field(
         "deepseek-chat",
-        description="OpenAI модель по умолчанию",
-        validation_alias="OPENAI_MODEL",
+        description="DeepSeek модель по умолчанию",
+        validation_alias="DEEPSEEK_MODEL",
+    )
+
+    # Пулы ключей через запятую (вместо или вместе с одиночным ключом):
+    # вызовы распределяются по наименее загруженному ключу
+    openai_api_keys: Annotated[List[SecretStr], NoDecode] = Field(
+        default_factory=list,
+        description="Пул API ключей OpenAI",
+        validation_alias="OPENAI_API_KEYS",
+    )
+    gigachat_credentials_pool: Annotated[List[SecretStr], NoDecode] = Field(
+        default_factory=list,
+        description="Пул авторизационных данных GigaChat",
+        validation_alias="GIGACHAT_CREDENTIALS_POOL",
+    )
+    deepseek_api_keys: Annotated[List[SecretStr], NoDecode] = Field(
+        default_factory=list,
+        description="Пул API ключей DeepSeek",
+        validation_alias="DEEPSEEK_API_KEYS",
+    )
+
+    credential_cooldown: float = Field(
+        30.0,
+        description="Охлаждение ключа после 429 в секундах (растет вдвое)",
+        validation_alias="LLM_CREDENTIAL_COOLDOWN",
+        gt=0.0,
+    )
+
+    credential_cooldown_max: float = Field(
+        300.0,
+        description="Максимальное охлаждение ключа в секундах",
+        validation_alias="LLM_CREDENTIAL_COOLDOWN_MAX",
+        gt=0.0,
     )
 
     # Общие настройки
@@ -98,6 +170,43 @@ class LLMSettings(BaseSettings):
         le=10,
     )
 
+    # Дедлайн запроса анализа фото
+    request_deadline: float = Field(
+        25.0,
+        description="Общий бюджет запроса по фото в секундах (анализ и запись в БД)",
+        validation_alias="LLM_REQUEST_DEADLINE",
+        gt=0.0,
+    )
+
+    deadline_upload_share: float = Field(
+        0.3,
+        description="Доля оставшегося бюджета на загрузку фото провайдеру",
+        validation_alias="LLM_DEADLINE_UPLOAD_SHARE",
+        gt=0.0,
+        le=1.0,
+    )
+
+    deadline_db_reserve: float = Field(
+        1.0,
+        description="Часть бюджета в секундах, оставляемая на запись в БД",
+        validation_alias="LLM_DEADLINE_DB_RESERVE",
+        ge=0.0,
+    )
+
+    retry_min_remaining: float = Field(
+        2.0,
+        description="Минимальный остаток бюджета в секундах для повтора запроса",
+        validation_alias="LLM_RETRY_MIN_REMAINING",
+        ge=0.0,
+    )
+
+    retry_backoff: float = Field(
+        0.2,
+        description="Базовая пауза перед повтором в секундах (растет вдвое)",
+        validation_alias="LLM_RETRY_BACKOFF",
+        ge=0.0,
+    )
+
     temperature: float = Field(
         0.3,
         description="Температура для генерации",
@@ -114,35 +223,680 @@ class LLMSettings(BaseSettings):
         le=4096,
     )
 
+    # Хеджирование запросов
+    hedging_enabled: bool = Field(
+        False,
+        description="Дублировать запрос во второй провайдер при долгом ответе",
+        validation_alias="LLM_HEDGING_ENABLED",
+    )
+
+    hedging_provider: LLMProvider = Field(
+        LLMProvider.OPENAI,
+        description="Провайдер для хеджированного запроса (OpenAI/DeepSeek)",
+        validation_alias="LLM_HEDGING_PROVIDER",
+    )
+
+    hedging_delay_percentile: float = Field(
+        95.0,
+        description="Перцентиль задержки основного провайдера для запуска хеджа",
+        validation_alias="LLM_HEDGING_DELAY_PERCENTILE",
+        gt=0.0,
+        lt=100.0,
+    )
+
+    hedging_initial_delay: float = Field(
+        10.0,
+        description="Задержка хеджа в секундах, пока недостаточно замеров",
+        validation_alias="LLM_HEDGING_INITIAL_DELAY",
+        ge=0.0,
+    )
+
+    hedging_min_delay: float = Field(
+        0.5,
+        description="Минимальная задержка хеджа в секундах",
+        validation_alias="LLM_HEDGING_MIN_DELAY",
+        ge=0.0,
+    )
+
+    hedging_min_samples: int = Field(
+        20,
+        description="Минимум замеров для расчета перцентиля",
+        validation_alias="LLM_HEDGING_MIN_SAMPLES",
+        ge=1,
+    )
+
+    hedging_request_cost: float = Field(
+        0.0,
+        description="Оценочная стоимость одного хеджированного запроса",
+        validation_alias="LLM_HEDGING_REQUEST_COST",
+        ge=0.0,
+    )
+
+    # Circuit breaker провайдеров
+    breaker_failure_rate: float = Field(
+        0.5,
+        description="Доля ошибок и медленных вызовов для размыкания",
+        validation_alias="LLM_BREAKER_FAILURE_RATE",
+        gt=0.0,
+        le=1.0,
+    )
+
+    breaker_min_calls: int = Field(
+        5,
+        description="Минимум вызовов в окне для оценки доли ошибок",
+        validation_alias="LLM_BREAKER_MIN_CALLS",
+        ge=1,
+    )
+
+    breaker_window_size: int = Field(
+        20,
+        description="Размер скользящего окна вызовов",
+        validation_alias="LLM_BREAKER_WINDOW_SIZE",
+        ge=1,
+    )
+
+    breaker_slow_call_seconds: float = Field(
+        20.0,
+        description="Вызов дольше этого порога считается неуспешным",
+        validation_alias="LLM_BREAKER_SLOW_CALL_SECONDS",
+        gt=0.0,
+    )
+
+    breaker_open_seconds: float = Field(
+        30.0,
+        description="Время в состоянии open до пробного вызова",
+        validation_alias="LLM_BREAKER_OPEN_SECONDS",
+        gt=0.0,
+    )
+
+    breaker_half_open_calls: int = Field(
+        1,
+        description="Количество пробных вызовов в состоянии half-open",
+        validation_alias="LLM_BREAKER_HALF_OPEN_CALLS",
+        ge=1,
+    )
+
+    # Адаптивный лимит одновременных вызовов провайдера (AIMD)
+    concurrency_initial_limit: int = Field(
+        4,
+        description="Начальный лимит одновременных вызовов провайдера",
+        validation_alias="LLM_CONCURRENCY_INITIAL_LIMIT",
+        ge=1,
+    )
+
+    concurrency_min_limit: int = Field(
+        1,
+        description="Минимальный лимит одновременных вызовов",
+        validation_alias="LLM_CONCURRENCY_MIN_LIMIT",
+        ge=1,
+    )
+
+    concurrency_max_limit: int = Field(
+        64,
+        description="Максимальный лимит одновременных вызовов",
+        validation_alias="LLM_CONCURRENCY_MAX_LIMIT",
+        ge=1,
+    )
+
+    concurrency_increase: float = Field(
+        1.0,
+        description="Аддитивный рост лимита за окно из limit успешных вызовов",
+        validation_alias="LLM_CONCURRENCY_INCREASE",
+        gt=0.0,
+    )
+
+    concurrency_decrease_factor: float = Field(
+        0.5,
+        description="Множитель лимита при 429 или таймауте",
+        validation_alias="LLM_CONCURRENCY_DECREASE_FACTOR",
+        gt=0.0,
+        lt=1.0,
+    )
+
+    concurrency_latency_threshold: float = Field(
+        10.0,
+        description="Вызов дольше этого порога в секундах не увеличивает лимит",
+        validation_alias="LLM_CONCURRENCY_LATENCY_THRESHOLD",
+        gt=0.0,
+    )
+
+    concurrency_max_queue: int = Field(
+        100,
+        description="Максимум вызовов в очереди ожидания провайдера",
+        validation_alias="LLM_CONCURRENCY_MAX_QUEUE",
+        ge=0,
+    )
+
+    # Планировщик вызовов: полосы приоритета и справедливая очередь пациентов
+    scheduler_background_share: float = Field(
+        0.5,
+        description="Доля лимита вызовов провайдера, доступная фоновой полосе",
+        validation_alias="LLM_SCHEDULER_BACKGROUND_SHARE",
+        gt=0.0,
+        le=1.0,
+    )
+
+    # HTTP пулы соединений к провайдерам
+    http_max_connections: int = Field(
+        20,
+        description="Максимум соединений в пуле провайдера",
+        validation_alias="LLM_HTTP_MAX_CONNECTIONS",
+        ge=1,
+    )
+
+    http_max_keepalive_connections: int = Field(
+        10,
+        description="Максимум keep-alive соединений в пуле провайдера",
+        validation_alias="LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS",
+        ge=0,
+    )
+
+    http_keepalive_expiry: float = Field(
+        60.0,
+        description="Время жизни простаивающего keep-alive соединения в секундах",
+        validation_alias="LLM_HTTP_KEEPALIVE_EXPIRY",
+        ge=0.0,
+    )
+
+    http2_enabled: bool = Field(
+        False,
+        description="Использовать HTTP/2 (требуется пакет h2)",
+        validation_alias="LLM_HTTP2_ENABLED",
+    )
+
+    # Объединение одновременных одинаковых запросов
+    single_flight_enabled: bool = Field(
+        True,
+        description="Объединять одновременные анализы одинаковых изображений",
+        validation_alias="LLM_SINGLE_FLIGHT_ENABLED",
+    )
+
+    single_flight_cache_lock: bool = Field(
+        False,
+        description="Блокировать одинаковые запросы между процессами через кэш",
+        validation_alias="LLM_SINGLE_FLIGHT_CACHE_LOCK",
+    )
+
+    single_flight_lock_timeout: float = Field(
+        30.0,
+        description="Время жизни блокировки в кэше в секундах",
+        validation_alias="LLM_SINGLE_FLIGHT_LOCK_TIMEOUT",
+        gt=0.0,
+    )
+
+    single_flight_result_ttl: float = Field(
+        10.0,
+        description="Время хранения результата в кэше для ожидающих процессов",
+        validation_alias="LLM_SINGLE_FLIGHT_RESULT_TTL",
+        gt=0.0,
+    )
+
+    single_flight_poll_interval: float = Field(
+        0.1,
+        description="Интервал опроса кэша ожидающим процессом в секундах",
+        validation_alias="LLM_SINGLE_FLIGHT_POLL_INTERVAL",
+        gt=0.0,
+    )
+
+    # Локальная проверка фото перед анализом (подбор порогов -
+    # benchmarks/tune_prescreen.py)
+    prescreen_enabled: bool = Field(
+        True,
+        description="Отклонять непригодные фото до вызова провайдера",
+        validation_alias="LLM_PRESCREEN_ENABLED",
+    )
+
+    prescreen_size: int = Field(
+        256,
+        description="Длинная сторона уменьшенной копии фото для проверки",
+        validation_alias="LLM_PRESCREEN_SIZE",
+        ge=32,
+    )
+
+    prescreen_min_sharpness: float = Field(
+        8.0,
+        description="Минимальная дисперсия лапласиана (ниже - размытое фото)",
+        validation_alias="LLM_PRESCREEN_MIN_SHARPNESS",
+        ge=0.0,
+    )
+
+    prescreen_min_brightness: float = Field(
+        15.0,
+        description="Минимальная средняя яркость 0..255 (ниже - черный кадр)",
+        validation_alias="LLM_PRESCREEN_MIN_BRIGHTNESS",
+        ge=0.0,
+        le=255.0,
+    )
+
+    prescreen_max_brightness: float = Field(
+        245.0,
+        description="Максимальная средняя яркость 0..255 (выше - засвеченный кадр)",
+        validation_alias="LLM_PRESCREEN_MAX_BRIGHTNESS",
+        ge=0.0,
+        le=255.0,
+    )
+
+    prescreen_min_entropy: float = Field(
+        3.0,
+        description="Минимальная энтропия яркости в битах (ниже - пустой кадр)",
+        validation_alias="LLM_PRESCREEN_MIN_ENTROPY",
+        ge=0.0,
+        le=8.0,
+    )
+
+    prescreen_max_peak_ratio: float = Field(
+        0.5,
+        description="Максимальная доля одного уровня яркости (выше - скриншот)",
+        validation_alias="LLM_PRESCREEN_MAX_PEAK_RATIO",
+        gt=0.0,
+        le=1.0,
+    )
+
+    # Повторное использование файлов, загруженных в GigaChat
+    gigachat_file_cache_enabled: bool = Field(
+        True,
+        description="Не загружать повторно в GigaChat уже загруженные изображения",
+        validation_alias="LLM_GIGACHAT_FILE_CACHE_ENABLED",
+    )
+
+    # Должен быть меньше срока хранения файлов в GigaChat
+    gigachat_file_ttl: float = Field(
+        3600.0,
+        description="Срок повторного использования файла в секундах",
+        validation_alias="LLM_GIGACHAT_FILE_TTL",
+        gt=0.0,
+    )
+
+    gigachat_file_cache_size: int = Field(
+        1000,
+        description="Максимум файлов в кэше процесса",
+        validation_alias="LLM_GIGACHAT_FILE_CACHE_SIZE",
+        ge=1,
+    )
+
+    gigachat_file_sweep_interval: float = Field(
+        60.0,
+        description="Интервал фонового удаления истекших файлов в секундах",
+        validation_alias="LLM_GIGACHAT_FILE_SWEEP_INTERVAL",
+        gt=0.0,
+    )
+
+    gigachat_file_sweep_batch: int = Field(
+        20,
+        description="Количество файлов, удаляемых одновременно",
+        validation_alias="LLM_GIGACHAT_FILE_SWEEP_BATCH",
+        ge=1,
+    )
+
+    # Анализ нескольких изображений
+    multi_image_mode: MultiImageMode = Field(
+        MultiImageMode.PER_IMAGE,
+        description="Запрос на каждое изображение или все изображения в одном",
+        validation_alias="LLM_MULTI_IMAGE_MODE",
+    )
+
+    multi_image_concurrency: int = Field(
+        4,
+        description="Максимум одновременных запросов при анализе нескольких фото",
+        validation_alias="LLM_MULTI_IMAGE_CONCURRENCY",
+        ge=1,
+    )
+
+    # Через запятую: gigachat,openai (по умолчанию мозаика выключена)
+    mosaic_providers: Annotated[List[LLMProvider], NoDecode] = Field(
+        default_factory=list,
+        description="Провайдеры, которым несколько фото запроса уходят одной мозаикой",
+        validation_alias="LLM_MOSAIC_PROVIDERS",
+    )
+
+    mosaic_tile_size: int = Field(
+        768,
+        description="Сторона ячейки мозаики в пикселях",
+        validation_alias="LLM_MOSAIC_TILE_SIZE",
+        ge=128,
+    )
+
+    mosaic_quality: int = Field(
+        85,
+        description="Качество JPEG мозаики",
+        validation_alias="LLM_MOSAIC_QUALITY",
+        ge=1,
+        le=95,
+    )
+
+    # Структурированный вывод: блюда приходят аргументами вызова функции.
+    # Выключен по умолчанию: вызов функции вместе с файлами фото
+    # поддерживают не все модели провайдеров - включать после проверки
+    structured_output_enabled: bool = Field(
+        False,
+        description="Запрашивать блюда через function calling по схеме DishCreateIn",
+        validation_alias="LLM_STRUCTURED_OUTPUT_ENABLED",
+    )
+
+    # Через запятую; strict схему поддерживают не все OpenAI-совместимые API
+    structured_output_strict_providers: Annotated[List[LLMProvider], NoDecode] = Field(
+        default_factory=lambda: [LLMProvider.OPENAI],
+        description="Провайдеры, проверяющие аргументы по схеме (strict)",
+        validation_alias="LLM_STRUCTURED_OUTPUT_STRICT_PROVIDERS",
+    )
+
+    # Маршрутизация по сложности запроса: простые запросы - легкой модели
+    routing_enabled: bool = Field(
+        False,
+        description="Отправлять простые запросы легкой модели провайдера",
+        validation_alias="LLM_ROUTING_ENABLED",
+    )
+
+    openai_light_model: Optional[str] = Field(
+        None,
+        description="Легкая модель OpenAI для простых запросов",
+        validation_alias="OPENAI_LIGHT_MODEL",
+    )
+
+    gigachat_light_model: Optional[str] = Field(
+        None,
+        description="Легкая модель GigaChat для простых запросов",
+        validation_alias="GIGACHAT_LIGHT_MODEL",
+    )
+
+    deepseek_light_model: Optional[str] = Field(
+        None,
+        description="Легкая модель DeepSeek для простых запросов",
+        validation_alias="DEEPSEEK_LIGHT_MODEL",
+    )
+
+    # Для фейкового провайдера легкая модель - та же заглушка с меньшей задержкой
+    fake_light_latency_mean: Optional[float] = Field(
+        None,
+        description="Средняя задержка легкой модели фейкового провайдера",
+        validation_alias="LLM_FAKE_LIGHT_LATENCY_MEAN",
+        ge=0.0,
+    )
+
+    routing_max_images: int = Field(
+        1,
+        description="Максимум фото простого запроса",
+        validation_alias="LLM_ROUTING_MAX_IMAGES",
+        ge=1,
+    )
+
+    routing_max_image_bytes: int = Field(
+        2_000_000,
+        description="Максимальный суммарный размер фото простого запроса в байтах",
+        validation_alias="LLM_ROUTING_MAX_IMAGE_BYTES",
+        ge=1,
+    )
+
+    # Энтропия яркости как оценка числа блюд в кадре (по умолчанию не считается)
+    routing_max_entropy: Optional[float] = Field(
+        None,
+        description="Максимальная энтропия яркости фото простого запроса в битах",
+        validation_alias="LLM_ROUTING_MAX_ENTROPY",
+        ge=0.0,
+        le=8.0,
+    )
+
+    routing_max_text_items: int = Field(
+        2,
+        description="Максимум продуктов в текстовом описании простого запроса",
+        validation_alias="LLM_ROUTING_MAX_TEXT_ITEMS",
+        ge=1,
+    )
+
+    # Локальная таблица пищевой ценности
+    nutrition_source: NutritionSource = Field(
+        NutritionSource.LLM,
+        description="Кто рассчитывает КБЖУ: модель или локальная таблица",
+        validation_alias="LLM_NUTRITION_SOURCE",
+    )
+
+    nutrient_dataset_path: Optional[str] = Field(
+        None,
+        description="CSV таблица КБЖУ на 100 г (по умолчанию встроенная)",
+        validation_alias="LLM_NUTRIENT_DATASET_PATH",
+    )
+
+    nutrient_match_threshold: float = Field(
+        0.6,
+        description="Минимальная схожесть названия блюда с таблицей",
+        validation_alias="LLM_NUTRIENT_MATCH_THRESHOLD",
+        ge=0.0,
+        le=1.0,
+    )
+
+    # Фейковый провайдер и кассеты
+    fake_latency_distribution: FakeLatencyDistribution = Field(
+        FakeLatencyDistribution.CONSTANT,
+        description="Распределение задержки фейкового провайдера",
+        validation_alias="LLM_FAKE_LATENCY_DISTRIBUTION",
+    )
+
+    fake_latency_mean: float = Field(
+        1.0,
+        description="Средняя задержка фейкового провайдера в секундах",
+        validation_alias="LLM_FAKE_LATENCY_MEAN",
+        ge=0.0,
+    )
+
+    fake_latency_stddev: float = Field(
+        0.0,
+        description="Стандартное отклонение задержки фейкового провайдера",
+        validation_alias="LLM_FAKE_LATENCY_STDDEV",
+        ge=0.0,
+    )
+
+    fake_failure_rate: float = Field(
+        0.0,
+        description="Доля ошибок фейкового провайдера",
+        validation_alias="LLM_FAKE_FAILURE_RATE",
+        ge=0.0,
+        le=1.0,
+    )
+
+    fake_seed: Optional[int] = Field(
+        0,
+        description="Seed задержек и ошибок фейкового провайдера",
+        validation_alias="LLM_FAKE_SEED",
+    )
+
+    cassette_dir: Optional[str] = Field(
+        None,
+        description="Каталог кассет с ответами провайдеров",
+        validation_alias="LLM_CASSETTE_DIR",
+    )
+
+    cassette_record: bool = Field(
+        False,
+        description="Записывать ответы реальных провайдеров в кассеты",
+        validation_alias="LLM_CASSETTE_RECORD",
+    )
+
     # Настройки модели Pydantic
 
+    @field_validator(
+        "provider_chain",
+        "mosaic_providers",
+        "structured_output_strict_providers",
+        mode="before",
+    )
+    @classmethod
+    def split_provider_chain(cls, value: Any) -> Any:
+        """Разбирает список провайдеров из строки через запятую"""
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return value
+
+    @field_validator(
+        "openai_api_keys",
+        "gigachat_credentials_pool",
+        "deepseek_api_keys",
+        mode="before",
+    )
+    @classmethod
+    def split_credentials(cls, value: Any) -> Any:
+        """Разбирает пул ключей из строки через запятую"""
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return value
+
     @model_validator(mode="after")
     def validate_active_provider(self) -> "LLMSettings":
-        """Проверяет наличие ключей для активного провайдера"""
-        provider = self.active_provider
+        """Проверяет наличие ключей для активного провайдера и цепочки"""
+        providers = set(self.get_provider_chain())
+        if self.hedging_enabled:
+            providers.add(self.hedging_provider)
+
+        # Ключ провайдера - одиночный или пул
+        missing = {
+            provider for provider in providers if not self.get_credentials(provider)
+        }
+        if LLMProvider.OPENAI in missing:
+            raise ValueError(
+                "OPENAI_API_KEY is required when OPENAI is in the provider chain"
+            )
+
+        if LLMProvider.GIGACHAT in missing:
+            raise ValueError(
+                "GIGACHAT_CREDENTIALS is required when GIGACHAT is in the provider chain"
+            )
 
-        if provider == LLMProvider.OPENAI and not self.openai_api_key:
+        if LLMProvider.DEEPSEEK in missing:
             raise ValueError(
-                "OPENAI_API_KEY is required when active_provider is OPENAI"
+                "DEEPSEEK_API_KEY is required when DEEPSEEK is in the provider chain"
             )
 
-        if provider == LLMProvider.GIGACHAT and not self.gigachat_credentials:
+        if self.cassette_record and not self.cassette_dir:
+            raise ValueError("LLM_CASSETTE_DIR is required when LLM_CASSETTE_RECORD")
+
+        if self.concurrency_min_limit > self.concurrency_max_limit:
             raise ValueError(
-                "GIGACHAT_CREDENTIALS is required when active_provider is GIGACHAT"
+                "LLM_CONCURRENCY_MIN_LIMIT must not exceed LLM_CONCURRENCY_MAX_LIMIT"
             )
 
-        if provider == LLMProvider.DEEPSEEK and not self.deepseek_api_key:
+        if self.hedging_enabled and self.hedging_provider == LLMProvider.GIGACHAT:
             raise ValueError(
-                "DEEPSEEK_API_KEY is required when active_provider is DEEPSEEK"
+                "LLM_HEDGING_PROVIDER must be an OpenAI compatible provider"
             )
 
         return self
 
+    def get_provider_chain(self) -> List[LLMProvider]:
+        """
+        Возвращает упорядоченную цепочку провайдеров без повторов.
+        Если цепочка не задана, используется только активный провайдер.
+        """
+        chain = self.provider_chain or [self.active_provider]
+        return list(dict.fromkeys(chain))
+
+    def get_breaker_config(self) -> Dict[str, Any]:
+        """Возвращает настройки circuit breaker"""
+        return {
+            "failure_rate": self.breaker_failure_rate,
+            "min_calls": self.breaker_min_calls,
+            "window_size": self.breaker_window_size,
+            "slow_call_seconds": self.breaker_slow_call_seconds,
+            "open_seconds": self.breaker_open_seconds,
+            "half_open_calls": self.breaker_half_open_calls,
+        }
+
+    def get_concurrency_config(self) -> Dict[str, Any]:
+        """Возвращает настройки адаптивного лимита вызовов"""
+        return {
+            "initial_limit": self.concurrency_initial_limit,
+            "min_limit": self.concurrency_min_limit,
+            "max_limit": self.concurrency_max_limit,
+            "increase": self.concurrency_increase,
+            "decrease_factor": self.concurrency_decrease_factor,
+            "latency_threshold": self.concurrency_latency_threshold,
+            "max_queue": self.concurrency_max_queue,
+            "background_share": self.scheduler_background_share,
+        }
+
+    def get_credential_pool_config(self) -> Dict[str, Any]:
+        """Возвращает настройки охлаждения ключей провайдеров"""
+        return {
+            "cooldown": self.credential_cooldown,
+            "max_cooldown": self.credential_cooldown_max,
+        }
+
+    def get_prescreen_config(self) -> Dict[str, Any]:
+        """Возвращает пороги локальной проверки фото"""
+        return {
+            "size": self.prescreen_size,
+            "min_sharpness": self.prescreen_min_sharpness,
+            "min_brightness": self.prescreen_min_brightness,
+            "max_brightness": self.prescreen_max_brightness,
+            "min_entropy": self.prescreen_min_entropy,
+            "max_peak_ratio": self.prescreen_max_peak_ratio,
+        }
+
+    def get_routing_config(self) -> Dict[str, Any]:
+        """Возвращает пороги простого запроса для маршрутизации"""
+        return {
+            "max_images": self.routing_max_images,
+            "max_image_bytes": self.routing_max_image_bytes,
+            "max_entropy": self.routing_max_entropy,
+            "max_text_items": self.routing_max_text_items,
+            "stats_size": self.prescreen_size,
+        }
+
+    def get_light_overrides(self, provider: LLMProvider) -> Dict[str, Any]:
+        """
+        Возвращает отличия легкой модели провайдера от основной
+        (пустой словарь - легкая модель не задана).
+        """
+        if provider == LLMProvider.FAKE:
+            key, value = "latency_mean", self.fake_light_latency_mean
+        else:
+            key = "model"
+            value = {
+                LLMProvider.OPENAI: self.openai_light_model,
+                LLMProvider.GIGACHAT: self.gigachat_light_model,
+                LLMProvider.DEEPSEEK: self.deepseek_light_model,
+            }[provider]
+        return {key: value} if value is not None else {}
+
+    def get_http_pool_config(self) -> Dict[str, Any]:
+        """Возвращает настройки HTTP пулов соединений"""
+        return {
+            "max_connections": self.http_max_connections,
+            "max_keepalive_connections": self.http_max_keepalive_connections,
+            "keepalive_expiry": self.http_keepalive_expiry,
+            "http2": self.http2_enabled,
+        }
+
+    def get_credentials(self, provider: LLMProvider) -> List[str]:
+        """
+        Возвращает ключи провайдера: одиночный ключ и пул без повторов.
+        Для провайдеров без ключей (fake) - пустой список.
+        """
+        sources = {
+            LLMProvider.OPENAI: (self.openai_api_key, self.openai_api_keys),
+            LLMProvider.GIGACHAT: (
+                self.gigachat_credentials,
+                self.gigachat_credentials_pool,
+            ),
+            LLMProvider.DEEPSEEK: (self.deepseek_api_key, self.deepseek_api_keys),
+        }
+        if provider not in sources:
+            return []
+        single, pool = sources[provider]
+        secrets = [single, *pool] if single else pool
+        return list(dict.fromkeys(secret.get_secret_value() for secret in secrets))
+
     def get_provider_config(
-        self, provider: Optional[LLMProvider] = None
+        self,
+        provider: Optional[LLMProvider] = None,
+        credential: int = 0,
+        route: ModelRoute = ModelRoute.STANDARD,
     ) -> Dict[str, Any]:
         """
         Возвращает конфигурацию для указанного провайдера.
+
+        Args:
+            provider: Провайдер (по умолчанию активный)
+            credential: Индекс ключа в get_credentials (для пула ключей)
+            route: Основная или легкая модель провайдера
         """
         provider = provider or self.active_provider
 
@@ -176,18 +930,47 @@ class LLMSettings(BaseSettings):
                 "base_url": self.deepseek_base_url,
                 "model": self.deepseek_model,
             },
+            LLMProvider.FAKE: {
+                "latency_distribution": self.fake_latency_distribution,
+                "latency_mean": self.fake_latency_mean,
+                "latency_stddev": self.fake_latency_stddev,
+                "failure_rate": self.fake_failure_rate,
+                "seed": self.fake_seed,
+                "cassette_dir": self.cassette_dir,
+            },
         }
 
-        return configs[provider]
+        config = configs[provider]
+        credentials = self.get_credentials(provider)
+        if credentials:
+            key = "credentials" if provider == LLMProvider.GIGACHAT else "api_key"
+            config[key] = credentials[credential]
+        if route == ModelRoute.LIGHT:
+            config.update(self.get_light_overrides(provider))
+        return config
 
     def get_common_config(self) -> Dict[str, Any]:
         """Возвращает общие настройки"""
         return {
             "timeout": self.default_timeout,
-            "max_retries": self.default_max_retries,
+            # Повторы выполняет FoodAnalysisService с учетом дедлайна запроса
+            "max_retries": 0,
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
         }
 
 
-llm_settings = LLMSettings()
+@lru_cache(maxsize=None)
+def get_llm_settings() -> LLMSettings:
+    """
+    Возвращает настройки LLM, создавая их при первом обращении.
+    Чтение .env и проверка ключей не выполняются при импорте модуля.
+    """
+    return LLMSettings()
+
+
+def __getattr__(name: str) -> Any:
+    # Обратная совместимость: ai_agent.config.llm_settings создается лениво
+    if name == "llm_settings":
+        return get_llm_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
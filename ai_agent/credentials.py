@@ -0,0 +1,239 @@
+"""
+Модуль с пулами ключей провайдеров.
+
+Лимиты провайдера (запросы и токены в минуту) считаются на ключ, поэтому
+несколько ключей одного провайдера умножают пропускную способность.
+У каждого ключа свой клиент (и свой токен доступа GigaChat) в реестре
+клиентов; вызов получает наименее загруженный ключ, не находящийся
+на охлаждении. Ключ, получивший 429, охлаждается: пауза растет вдвое
+при повторных 429 (не меньше Retry-After ответа), успешный вызов
+ее сбрасывает. Если все ключи на охлаждении, провайдер считается
+недоступным и цепочка переходит к следующему.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .circuit_breaker import ProviderUnavailableError
+from .concurrency_limiter import is_rate_limit_error
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CredentialsCoolingDownError(ProviderUnavailableError):
+    """Все ключи провайдера на охлаждении после 429"""
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Пауза из заголовка Retry-After ответа с ошибкой (в секундах).
+
+    Заголовки ищутся, как и статус в is_rate_limit_error, в самой ошибке
+    (GigaChat ResponseError) и в ее ответе (OpenAI и httpx).
+    """
+    for source in (error, getattr(error, "response", None)):
+        headers = getattr(source, "headers", None)
+        if headers:
+            break
+    else:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class _Credential:
+    """Состояние ключа в пуле"""
+
+    in_flight: int = 0
+    cooldown_until: float = float("-inf")
+    strikes: int = 0  # 429 подряд
+
+
+class CredentialPool:
+    """
+    Потокобезопасный пул ключей одного провайдера.
+
+    Ключи идентифицируются индексом в настройках; сами значения в пуле,
+    логах и метриках не появляются.
+
+    Метрики (label provider): ai_agent_credential_in_flight (label credential),
+    ai_agent_credential_cooldowns_total (label credential),
+    ai_agent_credentials_available, ai_agent_credentials_exhausted_total.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if size < 1:
+            raise ValueError("Credential pool must not be empty")
+        self.name = name
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._credentials = [_Credential() for _ in range(size)]
+        self._next = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._credentials)
+
+    def acquire(self) -> int:
+        """
+        Выбирает наименее загруженный ключ не на охлаждении
+        (при равной загрузке - по кругу).
+
+        Returns:
+            Индекс ключа
+        Raises:
+            CredentialsCoolingDownError: Если все ключи на охлаждении
+        """
+        with self._lock:
+            now = self._clock()
+            healthy = [
+                index
+                for index, credential in enumerate(self._credentials)
+                if credential.cooldown_until <= now
+            ]
+            if not healthy:
+                metrics.inc("ai_agent_credentials_exhausted_total", provider=self.name)
+                raise CredentialsCoolingDownError(
+                    f"All {self.size} credentials for {self.name} are cooling down"
+                )
+            start = self._next
+            index = min(
+                healthy,
+                key=lambda i: (self._credentials[i].in_flight, (i - start) % self.size),
+            )
+            self._next = (index + 1) % self.size
+            self._credentials[index].in_flight += 1
+            self._publish(now)
+            return index
+
+    def release(self, index: int, error: Optional[BaseException] = None) -> None:
+        """
+        Освобождает ключ; при 429 ставит его на охлаждение.
+
+        Args:
+            index: Индекс ключа (результат acquire)
+            error: Ошибка вызова (None - успех или отмена)
+        """
+        with self._lock:
+            now = self._clock()
+            credential = self._credentials[index]
+            credential.in_flight -= 1
+            if error is not None and is_rate_limit_error(error):
+                if credential.cooldown_until <= now:
+                    # Одна волна 429 по ключу - одно удвоение паузы
+                    credential.strikes += 1
+                    metrics.inc(
+                        "ai_agent_credential_cooldowns_total",
+                        provider=self.name,
+                        credential=str(index),
+                    )
+                delay = min(
+                    self.max_cooldown, self.cooldown * 2 ** (credential.strikes - 1)
+                )
+                delay = max(delay, retry_after(error) or 0.0)
+                credential.cooldown_until = max(credential.cooldown_until, now + delay)
+                logger.warning(
+                    "Ключ %d провайдера %s на охлаждении %.0f с",
+                    index,
+                    self.name,
+                    credential.cooldown_until - now,
+                )
+            elif error is None:
+                credential.strikes = 0
+            self._publish(now)
+
+    @contextmanager
+    def lease(self) -> Iterator[int]:
+        """Контекст вызова с выбранным ключом"""
+        index = self.acquire()
+        try:
+            yield index
+        except Exception as e:
+            self.release(index, error=e)
+            raise
+        except BaseException:
+            # Отмена ничего не говорит о лимитах ключа
+            self.release(index)
+            raise
+        self.release(index)
+
+    def _publish(self, now: float) -> None:
+        available = 0
+        for index, credential in enumerate(self._credentials):
+            available += credential.cooldown_until <= now
+            metrics.set_gauge(
+                "ai_agent_credential_in_flight",
+                credential.in_flight,
+                provider=self.name,
+                credential=str(index),
+            )
+        metrics.set_gauge(
+            "ai_agent_credentials_available", available, provider=self.name
+        )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Состояние ключей для интроспекции"""
+        with self._lock:
+            now = self._clock()
+            return [
+                {
+                    "credential": index,
+                    "in_flight": credential.in_flight,
+                    "cooldown_remaining": max(0.0, credential.cooldown_until - now),
+                    "strikes": credential.strikes,
+                }
+                for index, credential in enumerate(self._credentials)
+            ]
+
+
+class CredentialPoolRegistry:
+    """Реестр пулов ключей по провайдерам, общий для потоков воркера"""
+
+    def __init__(self, config_factory: Callable[[], Dict[str, Any]] = dict) -> None:
+        self._lock = threading.Lock()
+        self._pools: Dict[str, CredentialPool] = {}
+        self._config_factory = config_factory
+
+    def get(self, name: str, size: int) -> CredentialPool:
+        """
+        Возвращает пул провайдера, создавая его при первом обращении
+        или при изменении числа ключей.
+        """
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None or pool.size != size:
+                pool = CredentialPool(name, size, **self._config_factory())
+                self._pools[name] = pool
+            return pool
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Состояние всех пулов"""
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.snapshot() for name, pool in pools.items()}
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Сбрасывает пул провайдера или все пулы"""
+        with self._lock:
+            if name is None:
+                self._pools.clear()
+            else:
+                self._pools.pop(name, None)
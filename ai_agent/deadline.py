@@ -0,0 +1,140 @@
+"""
+Модуль с дедлайном запроса, общим для всех этапов анализа.
+
+Дедлайн создается один раз на входе (view / MealService) и передается
+через contextvar: этапы (подготовка, загрузка, запрос к модели, разбор,
+запись в БД) получают долю оставшегося бюджета и отменяются сразу после
+его исчерпания.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from .metrics import metrics
+
+T = TypeVar("T")
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar(
+    "ai_agent_deadline", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Бюджет запроса исчерпан на указанном этапе"""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Deadline exceeded at stage: {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Абсолютный дедлайн запроса по монотонным часам.
+
+    Метрики: ai_agent_deadline_exceeded_total (label stage).
+    """
+
+    def __init__(
+        self, timeout: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self.expires_at = clock() + timeout
+
+    @staticmethod
+    def current() -> Optional["Deadline"]:
+        """Дедлайн текущего контекста или None"""
+        return _current_deadline.get()
+
+    @contextmanager
+    def scope(self) -> Iterator["Deadline"]:
+        """Делает дедлайн текущим для вложенных вызовов и задач"""
+        token = _current_deadline.set(self)
+        try:
+            yield self
+        finally:
+            _current_deadline.reset(token)
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """Дочерний дедлайн, оставляющий seconds на последующие этапы"""
+        child = Deadline(0.0, clock=self._clock)
+        child.expires_at = self.expires_at - seconds
+        return child
+
+    def remaining(self) -> float:
+        """Оставшийся бюджет в секундах"""
+        return max(0.0, self.expires_at - self._clock())
+
+    def budget(self, share: float = 1.0) -> float:
+        """Доля оставшегося бюджета для этапа"""
+        return self.remaining() * share
+
+    def check(self, stage: str) -> None:
+        """
+        Проверяет, что бюджет не исчерпан.
+
+        Raises:
+            DeadlineExceeded: Если дедлайн прошел
+        """
+        if self.remaining() <= 0:
+            metrics.inc("ai_agent_deadline_exceeded_total", stage=stage)
+            raise DeadlineExceeded(stage)
+
+    async def run(self, awaitable: Awaitable[T], stage: str, share: float = 1.0) -> T:
+        """
+        Выполняет этап в пределах доли оставшегося бюджета.
+
+        Raises:
+            DeadlineExceeded: Если этап не уложился в бюджет
+        """
+        try:
+            self.check(stage)
+        except DeadlineExceeded:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.budget(share))
+        except DeadlineExceeded:
+            # Вложенный этап исчерпал свою долю бюджета раньше
+            raise
+        except asyncio.TimeoutError:
+            metrics.inc("ai_agent_deadline_exceeded_total", stage=stage)
+            raise DeadlineExceeded(stage) from None
+
+    async def iterate(self, iterator: AsyncIterator[T], stage: str) -> AsyncIterator[T]:
+        """
+        Проксирует асинхронный поток, ограничивая ожидание каждого элемента
+        оставшимся бюджетом. При исчерпании бюджета поток закрывается.
+
+        Raises:
+            DeadlineExceeded: Если дедлайн прошел до конца потока
+        """
+        try:
+            while True:
+                try:
+                    item = await self.run(anext(iterator), stage)
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+async def run_stage(awaitable: Awaitable[T], stage: str, share: float = 1.0) -> T:
+    """Выполняет этап в бюджете текущего дедлайна (без дедлайна - как есть)"""
+    deadline = Deadline.current()
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(awaitable, stage, share)
+
+
+def check_deadline(stage: str) -> None:
+    """Проверяет текущий дедлайн, если он задан"""
+    deadline = Deadline.current()
+    if deadline is not None:
+        deadline.check(stage)
@@ -0,0 +1,200 @@
+"""
+Модуль с локальным фейковым провайдером LLM для нагрузочных тестов и CI.
+
+Провайдер не ходит в сеть: ответ берется из кассеты, записанной с реального
+провайдера (ключ - SHA-256 изображений), или генерируется детерминированно
+по тому же ключу. Задержка и доля ошибок задаются в настройках.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .images import ImageDigests, ImageSource
+
+logger = logging.getLogger(__name__)
+
+# Блюда для ответа без кассеты
+DEFAULT_DISHES = [
+    {
+        "name": "Гречка отварная",
+        "weight": 200,
+        "calories": 220,
+        "protein": 8.4,
+        "fat": 2.2,
+        "carbohydrates": 42.6,
+    },
+    {
+        "name": "Куриная грудка отварная",
+        "weight": 150,
+        "calories": 206,
+        "protein": 44.7,
+        "fat": 2.7,
+        "carbohydrates": 0.8,
+    },
+    {
+        "name": "Салат из свежих овощей",
+        "weight": 120,
+        "calories": 48,
+        "protein": 1.4,
+        "fat": 2.4,
+        "carbohydrates": 5.4,
+    },
+    {
+        "name": "Хлеб ржаной",
+        "weight": 40,
+        "calories": 84,
+        "protein": 2.6,
+        "fat": 0.5,
+        "carbohydrates": 16.0,
+    },
+    {
+        "name": "Чай без сахара",
+        "weight": 250,
+        "calories": 3,
+        "protein": 0.0,
+        "fat": 0.0,
+        "carbohydrates": 0.8,
+    },
+]
+
+
+class FakeProviderError(ConnectionError):
+    """Имитированная ошибка провайдера"""
+
+
+class CassetteStore:
+    """
+    Кассеты с ответами провайдеров: один JSON файл на набор изображений.
+
+    Формат: {"digest", "provider", "response", "latency", "recorded_at"}.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.json"
+
+    def load(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Возвращает кассету по дайджесту изображений или None"""
+        with self._lock:
+            if digest in self._cache:
+                return self._cache[digest]
+        path = self.path(digest)
+        cassette = (
+            json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+        )
+        with self._lock:
+            self._cache[digest] = cassette
+        return cassette
+
+    def save(self, digest: str, response: str, provider: str, latency: float) -> None:
+        """Записывает ответ провайдера в кассету"""
+        cassette = {
+            "digest": digest,
+            "provider": provider,
+            "response": response,
+            "latency": latency,
+            "recorded_at": time.time(),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(digest)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(cassette, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(path)
+        with self._lock:
+            self._cache[digest] = cassette
+        logger.info("Записана кассета %s (%s)", digest, provider)
+
+
+class FakeLLM:
+    """
+    Фейковый клиент LLM с настраиваемой задержкой и долей ошибок.
+
+    Распределения задержки: constant, uniform (mean ± stddev),
+    normal, lognormal (mean и stddev самой задержки).
+    """
+
+    def __init__(
+        self,
+        latency_distribution: str = "constant",
+        latency_mean: float = 1.0,
+        latency_stddev: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = 0,
+        cassette_dir: Optional[str] = None,
+        chunk_size: int = 32,
+        **_: Any,
+    ) -> None:
+        self.latency_distribution = latency_distribution
+        self.latency_mean = latency_mean
+        self.latency_stddev = latency_stddev
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.cassettes = CassetteStore(cassette_dir) if cassette_dir else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Задержка очередного ответа в секундах"""
+        mean, stddev = self.latency_mean, self.latency_stddev
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                latency = self._random.uniform(mean - stddev, mean + stddev)
+            elif self.latency_distribution == "normal":
+                latency = self._random.gauss(mean, stddev)
+            elif self.latency_distribution == "lognormal" and mean > 0:
+                sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+                mu = math.log(mean) - sigma**2 / 2
+                latency = self._random.lognormvariate(mu, sigma)
+            else:
+                latency = mean
+        return max(0.0, latency)
+
+    def should_fail(self) -> bool:
+        """Разыгрывает ошибку провайдера"""
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def response_for(self, digest: str) -> str:
+        """Ответ из кассеты или детерминированный ответ по дайджесту"""
+        cassette = self.cassettes.load(digest) if self.cassettes else None
+        if cassette is not None:
+            return cassette["response"]
+
+        rng = random.Random(digest)
+        dishes = rng.sample(DEFAULT_DISHES, rng.randint(1, 3))
+        return json.dumps(dishes, ensure_ascii=False)
+
+    async def astream(self, images: List[ImageSource]) -> AsyncIterator[str]:
+        """
+        Стримит ответ для изображений по фрагментам.
+
+        Raises:
+            FakeProviderError: С вероятностью failure_rate
+        """
+        digest = await ImageDigests.current().digest(images)
+        latency = self.sample_latency()
+        fail = self.should_fail()
+
+        await asyncio.sleep(latency)
+        if fail:
+            raise FakeProviderError("Simulated provider failure")
+
+        response = self.response_for(digest)
+        for offset in range(0, len(response), self.chunk_size):
+            yield response[offset : offset + self.chunk_size]
+            await asyncio.sleep(0)
+
+    async def ainvoke(self, images: List[ImageSource]) -> str:
+        """Возвращает ответ целиком"""
+        return "".join([chunk async for chunk in self.astream(images)])
@@ -2,20 +2,63 @@
 Модуль с сервисом для анализа фотографий еды и расчета КБЖУ.
 """
 
-import base64
+import asyncio
 import logging
 import json
-import re
-from pprint import pprint
-from typing import Any, List, Union
-
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from gigachat import GigaChat, Messages, Chat
+import time
+from contextlib import asynccontextmanager, nullcontext
+from functools import lru_cache
+from typing import Any, AsyncIterator, List, Optional
 
 from apps.food_diary.schemas import DishCreateIn
-from . import LLMClient
-from .prompts import food_analise_system_prompt, food_analise_system_prompt_mini
+from .client import LLMClient
+from .circuit_breaker import ProviderUnavailableError
+from .config import (
+    LLMProvider,
+    ModelRoute,
+    MultiImageMode,
+    NutritionSource,
+    get_llm_settings,
+)
+from .deadline import Deadline, DeadlineExceeded, check_deadline, run_stage
+from .fake_provider import CassetteStore, FakeLLM
+from .gigachat_files import GigaChatFileCache
+from .hedging import RequestHedger
+from .images import (
+    ImageDigests,
+    ImageSource,
+    image_size,
+    image_to_data_url,
+    image_upload_file,
+    is_image_url,
+)
+from .json_stream import DishStreamParser, parse_dishes
+from .meal_text import parse_meal_text
+from .metrics import metrics
+from .mosaic import build_mosaic, can_build_mosaic, mosaic_prompt
+from .nutrients import get_nutrient_index
+from .prompts import (
+    food_analise_system_prompt,
+    food_analise_system_prompt_mini,
+    food_names_prompt,
+    food_text_prompt,
+)
+from .scheduler import Lane, current_request, request_scope
+from .single_flight import CacheLock, SingleFlight
+from .structured_output import (
+    DishesArguments,
+    StructuredOutput,
+    dishes_schema,
+    gigachat_function_arguments,
+    tool_call_arguments,
+)
+from .telemetry import (
+    call_telemetry,
+    current_call,
+    model_name,
+    record_parse,
+    record_usage,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,176 +70,886 @@ class FoodAnalysisService:
 
     prompt = food_analise_system_prompt_mini
 
-    def __init__(self, llm_client=None):
-        """Инициализирует сервис с LLM клиентом."""
+    def __init__(
+        self,
+        llm_client=None,
+        hedge_client=None,
+        nutrition_source: Optional[NutritionSource] = None,
+    ):
+        """
+        Инициализирует сервис с LLM клиентом.
+
+        Args:
+            llm_client: Клиент основного провайдера
+                (по умолчанию цепочка провайдеров из LLM_PROVIDER_CHAIN)
+            hedge_client: Клиент для хеджированных запросов
+                (по умолчанию LLM_HEDGING_PROVIDER при LLM_HEDGING_ENABLED)
+            nutrition_source: Источник КБЖУ (по умолчанию LLM_NUTRITION_SOURCE)
+        """
         if llm_client is None:
-            self._client = LLMClient.create_client()
+            # Клиенты берутся из реестра процесса в момент вызова
+            self._client = None
+            self._providers = [
+                (provider, None) for provider in LLMClient.provider_chain()
+            ]
         else:
             self._client = llm_client
+            self._providers = [(None, llm_client)]
+
+        llm_settings = get_llm_settings()
+        self.nutrition_source = NutritionSource(
+            nutrition_source or llm_settings.nutrition_source
+        )
+        if self.nutrition_source == NutritionSource.LOCAL:
+            # Модель только называет блюда и вес, КБЖУ считается локально
+            self.prompt = food_names_prompt
+            self._nutrients = get_nutrient_index()
+        else:
+            self._nutrients = None
+
+        # Запись ответов реальных провайдеров для фейкового провайдера
+        self._cassettes = (
+            CassetteStore(llm_settings.cassette_dir)
+            if llm_settings.cassette_record
+            else None
+        )
+
+        # Одновременные анализы одних и тех же фото выполняются один раз
+        self._single_flight = (
+            SingleFlight(
+                CacheLock(
+                    lock_timeout=llm_settings.single_flight_lock_timeout,
+                    result_ttl=llm_settings.single_flight_result_ttl,
+                    poll_interval=llm_settings.single_flight_poll_interval,
+                )
+                if llm_settings.single_flight_cache_lock
+                else None
+            )
+            if llm_settings.single_flight_enabled
+            else None
+        )
+
+        # ID файлов, уже загруженных в GigaChat, по содержимому изображений;
+        # кэш на каждый ключ пула - файлы видны только своей учетной записи
+        self._gigachat_files: dict[int, GigaChatFileCache] = {}
+        self._gigachat_files_config = (
+            {
+                "ttl": llm_settings.gigachat_file_ttl,
+                "max_entries": llm_settings.gigachat_file_cache_size,
+                "sweep_interval": llm_settings.gigachat_file_sweep_interval,
+                "sweep_batch": llm_settings.gigachat_file_sweep_batch,
+            }
+            if llm_settings.gigachat_file_cache_enabled
+            else None
+        )
+
+        # Несколько фото запроса уходят этим провайдерам одной мозаикой
+        self._mosaic_providers = set(llm_settings.mosaic_providers)
+        self._mosaic_tile_size = llm_settings.mosaic_tile_size
+        self._mosaic_quality = llm_settings.mosaic_quality
+
+        # Блюда запрашиваются вызовом функции со схемой по DishCreateIn
+        self._dishes_schema = (
+            dishes_schema(
+                DishCreateIn,
+                fields=("name", "weight") if self._nutrients is not None else None,
+            )
+            if llm_settings.structured_output_enabled
+            else None
+        )
+        self._strict_providers = set(llm_settings.structured_output_strict_providers)
+
+        self._hedge_provider: Optional[LLMProvider] = None
+        if hedge_client is None and llm_settings.hedging_enabled:
+            self._hedge_provider = llm_settings.hedging_provider
+        self._hedge_client = hedge_client
+        self._hedger = (
+            RequestHedger(
+                delay_percentile=llm_settings.hedging_delay_percentile,
+                initial_delay=llm_settings.hedging_initial_delay,
+                min_delay=llm_settings.hedging_min_delay,
+                min_samples=llm_settings.hedging_min_samples,
+                request_cost=llm_settings.hedging_request_cost,
+            )
+            if hedge_client is not None or self._hedge_provider is not None
+            else None
+        )
         logger.info(
-            "Инициализирован FoodAnalysisService с клиентом: %s",
-            self._client.__class__.__name__,
+            "Инициализирован FoodAnalysisService с провайдерами: %s",
+            [
+                provider or client.__class__.__name__
+                for provider, client in self._providers
+            ],
         )
 
-    async def analyze_food_image(self, images_bytes: List[bytes]) -> List[DishCreateIn]:
+    async def analyze_food_image(
+        self, images_bytes: List[ImageSource]
+    ) -> List[DishCreateIn]:
         """
         Анализирует изображение еды и возвращает список блюд с КБЖУ.
 
         Args:
-            images_bytes: Список изображений в виде байтов
+            images_bytes: Список изображений (байты, URL или загруженные файлы)
         Returns:
             List[DishCreateIn] с данными о КБЖУ
         """
         try:
-            response = await self._ainvoke(images_bytes=images_bytes)
-            print("FoodAnalysisService.analyze_food_image")
-            pprint(response)
-            dishes_data = self._extract_json_from_response(response)
-
-            return [
-                DishCreateIn(
-                    name=dish_data.get("name", "Неизвестное блюдо"),
-                    weight=float(dish_data.get("weight", 0)),
-                    calories=int(dish_data.get("calories", 0)),
-                    protein=float(dish_data.get("protein", 0)),
-                    fat=float(dish_data.get("fat", 0)),
-                    carbohydrates=float(dish_data.get("carbohydrates", 0)),
-                )
-                for dish_data in dishes_data
-            ]
+            # Фото хешируются один раз на запрос (ключ, кэш файлов, кассеты)
+            with ImageDigests().scope():
+                if self._single_flight is not None:
+                    dishes_data = await self._single_flight.run(
+                        await self._flight_key(images_bytes),
+                        lambda: self._analyze_dishes_data(images_bytes),
+                    )
+                else:
+                    dishes_data = await self._analyze_dishes_data(images_bytes)
+
+            return [self._dish_from_data(dish_data) for dish_data in dishes_data]
 
         except Exception as e:
             logger.error("Ошибка при анализе изображения: %s", str(e))
             raise
 
-    async def _ainvoke(
-        self,
-        images_bytes: List[bytes],
-    ) -> str | list[Any]:
+    async def _analyze_dishes_data(
+        self, images_bytes: List[ImageSource]
+    ) -> List[dict[str, Any]]:
+        """Запрашивает блюда у провайдеров (с хеджированием, если включено)"""
+        try:
+            if self._hedger is None:
+                return await self._collect(self._astream_with_fallback(images_bytes))
+
+            dishes_data, winner = await self._hedger.run(
+                lambda: self._collect(self._astream_with_fallback(images_bytes)),
+                lambda: self._collect(
+                    self._astream_dishes(
+                        self._hedge_provider, self._hedge_client, images_bytes
+                    )
+                ),
+            )
+            logger.info("Ответ получен от провайдера: %s", winner)
+            return dishes_data
+        except json.JSONDecodeError:
+            logger.warning("Не удалось распарсить JSON, возвращаем заглушку")
+            return [self._unrecognized_dish_data()]
+
+    async def _flight_key(self, images_bytes: List[ImageSource]) -> str:
+        """Ключ single-flight: содержимое изображений и режим КБЖУ"""
+        digest = await ImageDigests.current().digest(images_bytes)
+        return f"{self.nutrition_source.value}:{digest}"
+
+    async def astream_food_image(
+        self, images_bytes: List[ImageSource]
+    ) -> AsyncIterator[DishCreateIn]:
         """
-        Отправляет изображения в LLM и возвращает сырой ответ.
+        Анализирует изображение еды, отдавая блюда по мере генерации ответа.
 
         Args:
-            images_bytes: Список изображений в виде байтов
+            images_bytes: Список изображений (байты, URL или загруженные файлы)
+        Yields:
+            DishCreateIn каждого блюда, как только его объект закрыт в ответе
+
+        Raises:
+            json.JSONDecodeError: Если ответ модели не содержит JSON
+        """
+        with ImageDigests().scope():
+            async for dish_data in self._astream_with_fallback(images_bytes):
+                yield self._dish_from_data(dish_data)
+
+    async def analyze_food_text(self, text: str) -> List[DishCreateIn]:
+        """
+        Анализирует текстовое описание еды ("200 г гречки, куриная грудка 150г").
+
+        Фрагменты с весом и продуктом из локальной таблицы КБЖУ считаются
+        без модели; в модель одним запросом уходят только остальные.
+
+        Args:
+            text: Описание приема пищи
         Returns:
-            Ответ модели
+            List[DishCreateIn] в порядке разобранных, затем распознанных моделью
+
+        Метрики: ai_agent_text_fragments_total (label result: local/llm).
         """
+        parsed = parse_meal_text(text, self._nutrients or get_nutrient_index())
+        dishes = [self._dish_from_data(dish_data) for dish_data in parsed.dishes]
+        metrics.inc("ai_agent_text_fragments_total", len(parsed.dishes), result="local")
+        if not parsed.unresolved:
+            return dishes
+
+        metrics.inc(
+            "ai_agent_text_fragments_total", len(parsed.unresolved), result="llm"
+        )
         try:
-            if isinstance(self._client, ChatOpenAI):
-                content = self._content_for_openai_deepseek(images_bytes)
-                message = HumanMessage(content=content)
-                response = await self._client.ainvoke([message])
-                result = response.content
+            dishes_data = await self._collect(
+                self._astream_with_fallback([], text=", ".join(parsed.unresolved))
+            )
+        except json.JSONDecodeError:
+            logger.warning("Не удалось распарсить JSON для текста: %s", text)
+            dishes_data = [] if dishes else [self._unrecognized_dish_data()]
+        return dishes + [self._dish_from_data(dish_data) for dish_data in dishes_data]
+
+    async def analyze_multiple_food_images(
+        self,
+        images: List[ImageSource],
+        mode: Optional[MultiImageMode] = None,
+        concurrency: Optional[int] = None,
+        lane: Lane = Lane.BACKGROUND,
+    ) -> List[DishCreateIn]:
+        """
+        Анализирует несколько изображений с ограниченной конкурентностью.
+
+        Ошибка анализа одной группы не прерывает остальные: вместо ее блюд
+        возвращается заглушка "Ошибка анализа N". Порядок результатов
+        соответствует порядку изображений.
+
+        Args:
+            images: Список изображений
+            mode: PER_IMAGE - запрос на каждое изображение,
+                SINGLE_REQUEST - все изображения в одном запросе
+                (по умолчанию LLM_MULTI_IMAGE_MODE)
+            concurrency: Максимум одновременных запросов
+                (по умолчанию LLM_MULTI_IMAGE_CONCURRENCY)
+            lane: Полоса планировщика для вызовов провайдера (по умолчанию
+                background: пакетный анализ уступает слоты загрузкам
+                пользователей); арендатор и вес - из текущего запроса
+        Returns:
+            List[DishCreateIn] блюд всех изображений
+        """
+        if not images:
+            return []
+
+        llm_settings = get_llm_settings()
+        mode = MultiImageMode(mode or llm_settings.multi_image_mode)
+        semaphore = asyncio.Semaphore(
+            concurrency or llm_settings.multi_image_concurrency
+        )
+
+        if mode == MultiImageMode.SINGLE_REQUEST:
+            groups = [list(images)]
+        else:
+            groups = [[image] for image in images]
+
+        async def analyze_group(number: int, group: List[ImageSource]):
+            async with semaphore:
+                try:
+                    return await self.analyze_food_image(group)
+                except Exception as e:
+                    logger.warning("Ошибка анализа группы %d: %s", number, e)
+                    return [self._failed_dish(number)]
+
+        request = current_request()
+        with request_scope(request.tenant, lane=lane, weight=request.weight):
+            results = await asyncio.gather(
+                *(
+                    analyze_group(number, group)
+                    for number, group in enumerate(groups, 1)
+                )
+            )
+        return [dish for dishes in results for dish in dishes]
+
+    @staticmethod
+    def _failed_dish(number: int) -> DishCreateIn:
+        """Заглушка блюда для изображения, которое не удалось проанализировать"""
+        return DishCreateIn(
+            name=f"Ошибка анализа {number}",
+            weight=0,
+            calories=0,
+            protein=0,
+            fat=0,
+            carbohydrates=0,
+        )
+
+    @staticmethod
+    async def _collect(dishes: AsyncIterator[dict[str, Any]]) -> List[dict[str, Any]]:
+        """
+        Дочитывает поток блюд до конца.
+        Невалидный JSON считается ошибкой попытки (для хеджирования).
+
+        Args:
+            dishes: Поток словарей с данными о блюдах
+        Returns:
+            Список словарей с данными о блюдах
+        """
+        return [dish async for dish in dishes]
+
+    async def _astream_with_fallback(
+        self, images_bytes: List[ImageSource], text: Optional[str] = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Стримит блюда по цепочке провайдеров.
+        Провайдеры с разомкнутым breaker пропускаются без ожидания.
+        Повтор запроса и переход к следующему провайдеру возможны, пока
+        не отдано ни одно блюдо; повтор - только если бюджет дедлайна позволяет.
+
+        Args:
+            images_bytes: Список изображений
+            text: Текстовое описание вместо изображений
+        Yields:
+            Словари с данными о блюдах первого успешного провайдера
+
+        Raises:
+            ProviderUnavailableError: Если все провайдеры разомкнуты
+        """
+        attempts = get_llm_settings().default_max_retries + 1
+        last_error: Optional[Exception] = None
+        for provider, client in self._providers:
+            for attempt in range(attempts):
+                emitted = False
+                try:
+                    async for dish in self._astream_dishes(
+                        provider, client, images_bytes, text=text, attempt=attempt
+                    ):
+                        emitted = True
+                        yield dish
+                    return
+                except ProviderUnavailableError as e:
+                    logger.info("Провайдер пропущен: %s", e)
+                    break
+                except (json.JSONDecodeError, DeadlineExceeded):
+                    raise
+                except Exception as e:
+                    if emitted:
+                        raise
+                    logger.warning(
+                        "Ошибка провайдера %s (попытка %d): %s",
+                        provider,
+                        attempt + 1,
+                        e,
+                    )
+                    last_error = e
+                    if not await self._wait_before_retry(attempt, attempts):
+                        break
+
+        if last_error is not None:
+            raise last_error
+        raise ProviderUnavailableError("All LLM providers are unavailable")
 
-            if isinstance(self._client, GigaChat):
-                self._client.get_token()
+    @staticmethod
+    async def _wait_before_retry(attempt: int, attempts: int) -> bool:
+        """
+        Выжидает паузу перед повтором, если на повтор остается бюджет.
 
-                uploaded_files_ids = self._upload_photo_to_gigachat(
-                    images_bytes=images_bytes
+        Args:
+            attempt: Номер неуспешной попытки (с 0)
+            attempts: Всего попыток на провайдера
+        Returns:
+            True, если повтор разрешен
+        """
+        if attempt + 1 >= attempts:
+            return False
+
+        llm_settings = get_llm_settings()
+        delay = llm_settings.retry_backoff * 2**attempt
+        deadline = Deadline.current()
+        if (
+            deadline is not None
+            and deadline.remaining() - delay < llm_settings.retry_min_remaining
+        ):
+            metrics.inc("ai_agent_retries_skipped_total")
+            return False
+
+        metrics.inc("ai_agent_retries_total")
+        await asyncio.sleep(delay)
+        return True
+
+    async def _astream_dishes(
+        self,
+        provider: Optional[LLMProvider],
+        client,
+        images_bytes: List[ImageSource],
+        text: Optional[str] = None,
+        attempt: int = 0,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Стримит ответ провайдера через инкрементальный парсер.
+        Вызов провайдера идет через его circuit breaker и учитывается
+        в телеметрии (ai_agent.telemetry). Провайдерам из LLM_MOSAIC_PROVIDERS
+        несколько фото отправляются одной мозаикой. При LLM_STRUCTURED_OUTPUT_ENABLED
+        блюда приходят аргументами вызова функции (ai_agent.structured_output).
+        При LLM_ROUTING_ENABLED простые запросы уходят легкой модели
+        провайдера (ai_agent.routing).
+
+        Args:
+            provider: Провайдер (None - клиент передан явно, без breaker)
+            client: Клиент провайдера (по умолчанию из реестра процесса)
+            images_bytes: Список изображений
+            text: Текстовое описание вместо изображений
+            attempt: Номер попытки у этого провайдера (с 0)
+        Yields:
+            Словари с данными о блюдах по мере закрытия их объектов
+
+        Raises:
+            ProviderUnavailableError: Если breaker провайдера разомкнут
+            json.JSONDecodeError: Если ответ не содержит JSON
+        """
+        parser = DishStreamParser()
+        recorded: Optional[List[str]] = None
+        provider_name = provider.value if provider else client.__class__.__name__
+        with call_telemetry(
+            provider_name, images=len(images_bytes), retry=attempt
+        ) as call:
+            # Сложность оценивается по исходным фото, до сборки мозаики
+            route = (
+                await self._route(provider, images_bytes, text, attempt)
+                if client is None
+                else None
+            )
+            if route is not None:
+                call.route = route.value
+
+            prompt = None
+            if (
+                text is None
+                and provider in self._mosaic_providers
+                and can_build_mosaic(images_bytes)
+            ):
+                prompt = mosaic_prompt(self.prompt, len(images_bytes))
+                images_bytes = [await self._build_mosaic(images_bytes)]
+
+            async with self._provider_call(provider) as credential:
+                client = client or LLMClient.get_client(
+                    provider, credential, route=route or ModelRoute.STANDARD
+                )
+                call.model = model_name(client)
+                if self._cassettes is not None and not isinstance(client, FakeLLM):
+                    recorded = []
+                chunks = self._astream(
+                    images_bytes=images_bytes,
+                    client=client,
+                    text=text,
+                    prompt=prompt,
+                    structured=self._structured_output(provider),
+                    credential=credential or 0,
+                )
+                deadline = Deadline.current()
+                if deadline is not None:
+                    # Подготовка, загрузка и ответ модели - в пределах дедлайна
+                    chunks = deadline.iterate(chunks, stage="chat")
+
+                started = time.monotonic()
+                async for chunk in chunks:
+                    if recorded is not None:
+                        recorded.append(chunk)
+                    for dish in parser.feed(chunk):
+                        yield dish
+
+            if recorded is not None:
+                self._cassettes.save(
+                    await ImageDigests.current().digest(
+                        images_bytes if text is None else [text]
+                    ),
+                    "".join(recorded),
+                    provider=provider_name,
+                    latency=time.monotonic() - started,
                 )
+            # Невалидный JSON - не ошибка провайдера для breaker
+            try:
+                parser.finish()
+            except json.JSONDecodeError:
+                record_parse("invalid")
+                raise
+            record_parse("ok")
+
+    @staticmethod
+    async def _route(
+        provider: Optional[LLMProvider],
+        images_bytes: List[ImageSource],
+        text: Optional[str],
+        attempt: int,
+    ) -> Optional[ModelRoute]:
+        """
+        Выбирает модель провайдера по сложности запроса.
+        None - маршрутизация выключена или у провайдера нет легкой модели.
+        """
+        policy = LLMClient.routing_policy(provider)
+        if policy is None:
+            return None
+        if policy.decodes_images and text is None:
+            # Оценка энтропии декодирует фото - не в event loop
+            decision = await run_stage(
+                asyncio.to_thread(policy.decide, images_bytes, text, attempt),
+                "preprocess",
+            )
+        else:
+            decision = policy.decide(images_bytes, text, attempt)
+        return decision.route
+
+    def _structured_output(
+        self, provider: Optional[LLMProvider]
+    ) -> Optional[StructuredOutput]:
+        """Схема вызова функции для провайдера или None (ответ текстом)"""
+        if self._dishes_schema is None:
+            return None
+        return StructuredOutput(
+            self._dishes_schema, strict=provider in self._strict_providers
+        )
+
+    async def _build_mosaic(self, images_bytes: List[ImageSource]) -> bytes:
+        """Собирает мозаику в потоке, чтобы не блокировать event loop"""
+        started = time.monotonic()
+        mosaic = await run_stage(
+            asyncio.to_thread(
+                build_mosaic,
+                images_bytes,
+                tile_size=self._mosaic_tile_size,
+                quality=self._mosaic_quality,
+            ),
+            "preprocess",
+        )
+        metrics.observe("ai_agent_mosaic_build_seconds", time.monotonic() - started)
+        metrics.inc("ai_agent_mosaic_images_total", len(images_bytes))
+        return mosaic
+
+    @asynccontextmanager
+    async def _provider_call(self, provider: Optional[LLMProvider]):
+        """
+        Учитывает вызов провайдера в его circuit breaker и адаптивном лимите
+        одновременных вызовов (сверх лимита вызов ждет в очереди) и выбирает
+        ключ из пула ключей провайдера (ai_agent.credentials).
+
+        Args:
+            provider: Провайдер (None - без breaker, общий лимит "default")
+        Yields:
+            Индекс ключа провайдера (None для provider=None)
+
+        Raises:
+            ProviderUnavailableError: Если breaker провайдера разомкнут,
+                очередь лимитера переполнена или все ключи на охлаждении
+        """
+        limiter = LLMClient.limiters.get(provider.value if provider else "default")
+        if provider is None:
+            async with limiter.slot():
+                yield None
+            return
+
+        breaker = LLMClient.breakers.get(provider.value)
+        if not breaker.allow_request():
+            raise ProviderUnavailableError(
+                f"Circuit breaker for {provider.value} is {breaker.state.value}"
+            )
+
+        pool = LLMClient.credential_pool(provider)
+        entered = False
+        try:
+            async with limiter.slot():
+                with pool.lease() if pool is not None else nullcontext(0) as key:
+                    entered = True
+                    started = time.monotonic()
+                    try:
+                        yield key
+                    except (asyncio.CancelledError, GeneratorExit, DeadlineExceeded):
+                        # Вызов отменен, поток брошен или исчерпан бюджет запроса
+                        breaker.release()
+                        raise
+                    except Exception:
+                        breaker.record_failure(time.monotonic() - started)
+                        raise
+
+                    breaker.record_success(time.monotonic() - started)
+        except BaseException:
+            if not entered:
+                # Вызов не дошел до провайдера: отмена в очереди, переполнение
+                # или все ключи на охлаждении
+                breaker.release()
+            raise
 
-                payload = self._payload_for_gigachat(uploaded_files_ids)
+    async def _ainvoke(
+        self,
+        images_bytes: List[ImageSource],
+        client=None,
+    ) -> str:
+        """
+        Отправляет изображения в LLM и возвращает сырой ответ целиком.
 
-                response = self._client.chat(payload=payload)
-                print("_ainvoke._client.chat", response)
+        Args:
+            images_bytes: Список изображений (байты, URL или загруженные файлы)
+            client: Клиент провайдера (по умолчанию основной)
+        Returns:
+            Ответ модели
+        """
+        client = client or self._client or LLMClient.get_client()
+        with call_telemetry(
+            client.__class__.__name__,
+            model=model_name(client),
+            images=len(images_bytes),
+        ):
+            async with self._provider_call(None):
+                chunks = self._astream(
+                    images_bytes,
+                    client=client,
+                    structured=self._structured_output(None),
+                )
+                return "".join([chunk async for chunk in chunks])
 
-                response = self._client.chat(payload)
+    async def _astream(
+        self,
+        images_bytes: List[ImageSource],
+        client=None,
+        text: Optional[str] = None,
+        prompt: Optional[str] = None,
+        structured: Optional[StructuredOutput] = None,
+        credential: int = 0,
+    ) -> AsyncIterator[str]:
+        """
+        Отправляет изображения в LLM и стримит ответ по токенам.
 
-                result = [ch.message.content for ch in response.choices]
-                print("_ainvoke.result", result)
+        Args:
+            images_bytes: Список изображений (байты, URL или загруженные файлы)
+            client: Клиент провайдера (по умолчанию основной)
+            text: Текстовое описание еды (запрос без изображений)
+            prompt: Промпт вместо self.prompt (например, для мозаики)
+            structured: Схема вызова функции (None - ответ текстом)
+            credential: Индекс ключа клиента в пуле ключей провайдера
+        Yields:
+            Фрагменты ответа модели
+        """
+        client = client or self._client or LLMClient.get_client()
+        if isinstance(client, FakeLLM):
+            # Фейковый провайдер работает без SDK и сети
+            async for chunk in client.astream(images_bytes if text is None else [text]):
+                yield chunk
+            logger.info("Обработано изображений: %d", len(images_bytes))
+            return
+
+        from gigachat import GigaChat
+        from langchain_core.messages import HumanMessage
+        from langchain_openai import ChatOpenAI
+
+        if text is not None:
+            # Текстовый запрос: без подготовки и загрузки изображений
+            prompt = food_text_prompt.format(text=text)
+            if isinstance(client, ChatOpenAI):
+                message = HumanMessage(content=prompt)
+                async for chunk in self._astream_chat_openai(
+                    client, message, structured
+                ):
+                    yield chunk
+            elif isinstance(client, GigaChat):
+                payload = {"messages": [{"role": "user", "content": prompt}]}
+                async for chunk in self._astream_gigachat(client, payload, structured):
+                    yield chunk
             else:
                 raise Exception(f"No active LLM Provider")
+            return
+
+        if isinstance(client, ChatOpenAI):
+            started = time.monotonic()
+            content = self._content_for_openai_deepseek(images_bytes, prompt=prompt)
+            check_deadline("preprocess")
+            call = current_call()
+            if call is not None:
+                # Изображения уходят в запросе как data URL
+                call.add_upload(
+                    sum(image_size(i) for i in images_bytes if not is_image_url(i)),
+                    time.monotonic() - started,
+                )
+            message = HumanMessage(content=content)
+            async for chunk in self._astream_chat_openai(client, message, structured):
+                yield chunk
+
+        elif isinstance(client, GigaChat):
+            upload_share = get_llm_settings().deadline_upload_share
+            await run_stage(client.aget_token(), "auth", share=upload_share)
+
+            uploaded_files_ids = await run_stage(
+                self._upload_photo_to_gigachat(
+                    images_bytes=images_bytes, client=client, credential=credential
+                ),
+                "upload",
+                share=upload_share,
+            )
 
-            logger.info("Обработано изображений: %d", len(images_bytes))
+            payload = self._payload_for_gigachat(uploaded_files_ids, prompt=prompt)
 
-        except Exception as e:
-            raise
+            async for chunk in self._astream_gigachat(client, payload, structured):
+                yield chunk
+        else:
+            raise Exception(f"No active LLM Provider")
+
+        logger.info("Обработано изображений: %d", len(images_bytes))
+
+    @staticmethod
+    async def _astream_chat_openai(
+        client, message, structured: Optional[StructuredOutput]
+    ) -> AsyncIterator[str]:
+        """
+        Стримит ответ ChatOpenAI (OpenAI, DeepSeek) на одно сообщение.
+        Со схемой модель обязана вызвать функцию: отдаются фрагменты ее
+        аргументов без открывающей скобки обертки {"dishes": [...]}.
+        """
+        if structured is None:
+            async for chunk in client.astream([message]):
+                record_usage(chunk)
+                if chunk.content:
+                    yield chunk.content
+            return
+
+        arguments = DishesArguments()
+        async for chunk in client.astream([message], **structured.openai_kwargs()):
+            record_usage(chunk)
+            fragment = arguments.feed(tool_call_arguments(chunk))
+            if fragment:
+                yield fragment
 
-        return result
+    @staticmethod
+    async def _astream_gigachat(
+        client, payload: dict[str, Any], structured: Optional[StructuredOutput]
+    ) -> AsyncIterator[str]:
+        """
+        Стримит ответ GigaChat на payload.
+        Со схемой модель вызывает функцию, и отдается массив блюд из ее
+        аргументов (GigaChat присылает их целиком в последнем фрагменте).
+        """
+        if structured is not None:
+            payload = {**payload, **structured.gigachat_payload()}
+        async for chunk in client.astream(payload):
+            record_usage(chunk)
+            for choice in chunk.choices:
+                fragment = (
+                    gigachat_function_arguments(choice.delta) or choice.delta.content
+                )
+                if fragment:
+                    yield fragment
+
+    def _dish_from_data(self, dish_data: dict[str, Any]) -> DishCreateIn:
+        """
+        Преобразует словарь из ответа модели в DishCreateIn.
+        В режиме локальной таблицы КБЖУ рассчитывается по названию и весу;
+        для ненайденных блюд остаются значения модели (если есть).
+        """
+        if self._nutrients is not None:
+            dish_data = self._with_local_nutrients(dish_data)
+        return DishCreateIn(
+            name=dish_data.get("name", "Неизвестное блюдо"),
+            weight=float(dish_data.get("weight", 0)),
+            calories=int(dish_data.get("calories", 0)),
+            protein=float(dish_data.get("protein", 0)),
+            fat=float(dish_data.get("fat", 0)),
+            carbohydrates=float(dish_data.get("carbohydrates", 0)),
+        )
 
     def _content_for_openai_deepseek(
-        self, images: List[Union[str, bytes]]
-    ) -> list[dict[str, str]]:
+        self, images: List[ImageSource], prompt: Optional[str] = None
+    ) -> list[dict[str, Any]]:
         """
         Формирует контент для OpenAI Vision с изображениями.
 
         Args:
-            images: Список изображений (URL или байты)
+            images: Список изображений (URL, base64 строка, байты или файлы)
+            prompt: Промпт (по умолчанию self.prompt)
 
         Returns:
             Контент для отправки в OpenAI
         """
-        content = [{"type": "text", "text": self.prompt}]
+        content = [{"type": "text", "text": prompt or self.prompt}]
 
         for img in images:
-            if isinstance(img, str) and img.startswith(("http://", "https://")):
-                content.append({"type": "image_url", "image_url": {"url": img}})
-            else:
-                if isinstance(img, bytes):
-                    base64_img = base64.b64encode(img).decode("utf-8")
-                else:
-                    base64_img = img
-
-                content.append(
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_img}"},
-                    }
-                )
+            url = img if is_image_url(img) else image_to_data_url(img)
+            content.append({"type": "image_url", "image_url": {"url": url}})
         return content
 
     def _payload_for_gigachat(
-        self, images_ids: List[str]
+        self, images_ids: List[str], prompt: Optional[str] = None
     ) -> dict[str, list[dict[str, str]]]:
         """
         Формирует контент для Gigachat с изображениями.
 
         Args:
             images_ids: Список ID изображений
+            prompt: Промпт (по умолчанию self.prompt)
 
         Returns:
             Контент для отправки в Gigachat
         """
         payload = {
-            "messages": [{"role": "user", "content": self.prompt}],
+            "messages": [{"role": "user", "content": prompt or self.prompt}],
         }
-        print("_content_for_gigachat.images_ids", images_ids)
         for img_id in images_ids:
             payload["messages"].append(
                 {"role": "user", "type": "file", "file_id": img_id}
             )
-
-        print("_payload_for_gigachat.payload")
-        pprint(payload)
-
-        payload_via_chat = Chat(
-            messages=[
-                Messages(role="user", content=self.prompt),
-                *[
-                    Messages(role="user", type="file", file_id=file_id)
-                    for file_id in images_ids
-                ],
-            ],
-        )
-
+        logger.debug("Payload GigaChat: %d файлов", len(images_ids))
         return payload
 
-    def _upload_photo_to_gigachat(self, images_bytes) -> List[str]:
+    async def _upload_photo_to_gigachat(
+        self, images_bytes: List[ImageSource], client=None, credential: int = 0
+    ) -> List[str]:
         """
-        Загружает и сохраняет фотографии в хранилище Gigachat
+        Загружает и сохраняет фотографии в хранилище Gigachat.
+        Файлы передаются потоково, без чтения целиком в память;
+        объем и время загрузки учитываются в телеметрии вызова.
+        Уже загруженные изображения (по SHA-256 содержимого) не загружаются
+        повторно, пока не истек срок записи в кэше файлов.
 
         Args:
-             images_bytes: Список изображений в виде байтов
+             images_bytes: Список изображений (байты или загруженные файлы)
+             client: Клиент GigaChat (по умолчанию основной)
+             credential: Индекс ключа клиента (кэш файлов - на каждый ключ)
 
         Returns:
-            saved_ids: List[int] Список ID сохраненных фотографий
+            saved_ids: List[str] Список ID сохраненных фотографий
         """
+        client = client or self._client
         saved_ids = []
-        for image_bytes in images_bytes:
-            uploaded_file = self._client.upload_file(file=image_bytes)
-            saved_ids.append(uploaded_file.id_)
+        call = current_call()
+        files = self._gigachat_file_cache(credential)
+        for index, image in enumerate(images_bytes):
+            digest = (
+                await ImageDigests.current().digest([image])
+                if files is not None
+                else None
+            )
+            file_id = files.get(digest) if files is not None else None
+            if file_id is None:
+                started = time.monotonic()
+                uploaded_file = await client.aupload_file(
+                    file=image_upload_file(image, index=index)
+                )
+                if call is not None:
+                    call.add_upload(image_size(image), time.monotonic() - started)
+                file_id = uploaded_file.id_
+                if files is not None:
+                    files.put(digest, file_id)
+            saved_ids.append(file_id)
+        if files is not None:
+            files.ensure_sweeper(client)
         return saved_ids
 
+    def _gigachat_file_cache(self, credential: int) -> Optional[GigaChatFileCache]:
+        """Кэш загруженных файлов ключа GigaChat (None - кэш выключен)"""
+        if self._gigachat_files_config is None:
+            return None
+        files = self._gigachat_files.get(credential)
+        if files is None:
+            files = self._gigachat_files.setdefault(
+                credential,
+                GigaChatFileCache(
+                    **self._gigachat_files_config, credential=str(credential)
+                ),
+            )
+        return files
+
+    def _with_local_nutrients(self, dish_data: dict[str, Any]) -> dict[str, Any]:
+        """Подставляет КБЖУ из локальной таблицы по названию и весу блюда"""
+        name = dish_data.get("name", "")
+        match = self._nutrients.lookup(name)
+        if match is None:
+            logger.warning("Блюдо не найдено в таблице КБЖУ: %s", name)
+            return dish_data
+        weight = float(dish_data.get("weight", 0))
+        return {**dish_data, **match.record.for_weight(weight)}
+
+    @staticmethod
+    def _unrecognized_dish_data() -> dict[str, Any]:
+        """Заглушка блюда для ответа без JSON"""
+        return {
+            "name": "Не удалось распознать",
+            "weight": 0,
+            "calories": 0,
+            "protein": 0,
+            "fat": 0,
+            "carbohydrates": 0,
+        }
+
     @staticmethod
     def _extract_json_from_response(response: str) -> List[dict[str, Any]]:
         """
@@ -208,31 +961,40 @@ class FoodAnalysisService:
         Returns:
             Список словарей с данными
         """
-        json_match = re.search(r"\[.*\]", response, re.DOTALL)
-
-        if json_match:
-            json_str = json_match.group()
-        else:
-            json_match = re.search(r"\{.*\}", response, re.DOTALL)
-            if json_match:
-                json_str = f"[{json_match.group()}]"
-            else:
-                json_str = response
-
         try:
-            return json.loads(json_str)
+            dishes_data = FoodAnalysisService._parse_json_from_response(response)
         except json.JSONDecodeError:
-            logger.warning("Не удалось распарсить JSON, возвращаем пустой список")
-            return [
-                {
-                    "name": "Не удалось распознать",
-                    "weight": 0,
-                    "calories": 0,
-                    "protein": 0,
-                    "fat": 0,
-                    "carbohydrates": 0,
-                }
-            ]
+            logger.warning("Не удалось распарсить JSON, возвращаем заглушку")
+            record_parse("fallback")
+            return [FoodAnalysisService._unrecognized_dish_data()]
+        record_parse("ok")
+        return dishes_data
+
+    @staticmethod
+    def _parse_json_from_response(response: str) -> List[dict[str, Any]]:
+        """
+        Разбирает JSON из ответа модели без подстановки значения по умолчанию.
+
+        Args:
+            response: Ответ модели
+
+        Returns:
+            Список словарей с данными
+
+        Raises:
+            json.JSONDecodeError: Если JSON не найден или невалиден
+        """
+        return parse_dishes(response)
+
+
+@lru_cache(maxsize=None)
+def get_food_analysis_service() -> FoodAnalysisService:
+    """Возвращает сервис анализа, создавая его (и клиентов) при первом вызове"""
+    return FoodAnalysisService()
 
 
-food_analysis_service = FoodAnalysisService()
+def __getattr__(name: str) -> Any:
+    # Обратная совместимость: синглтон создается при первом обращении
+    if name == "food_analysis_service":
+        return get_food_analysis_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
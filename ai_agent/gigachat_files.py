@@ -0,0 +1,184 @@
+"""
+Модуль с кэшем файлов, загруженных в хранилище GigaChat.
+
+Одинаковые изображения (повторный анализ, ретрай, повтор у того же
+провайдера) не загружаются заново: по SHA-256 содержимого берется ID
+уже загруженного файла. Запись живет ttl секунд - меньше срока хранения
+файлов у провайдера, после чего файл удаляется из хранилища фоновой
+задачей пачками. Кэш живет в рамках процесса воркера; файлы доступны
+только загрузившей их учетной записи, поэтому при пуле ключей у каждого
+ключа свой кэш.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    """ID файла в хранилище и момент, после которого он не используется"""
+
+    file_id: str
+    expires_at: float
+
+
+class GigaChatFileCache:
+    """
+    Потокобезопасный кэш "дайджест изображения -> ID файла GigaChat".
+
+    Истекшие и вытесненные записи не отдаются и ставятся в очередь
+    на удаление; файл удаляется не раньше чем через delete_grace секунд,
+    чтобы не оборвать запрос, взявший ID незадолго до истечения.
+
+    Метрики: ai_agent_gigachat_files_total (label result: hit/miss),
+    ai_agent_gigachat_files_deleted_total (label result: ok/error),
+    gauge ai_agent_gigachat_files_cached (label credential, если задан).
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        max_entries: int = 1000,
+        sweep_interval: float = 60.0,
+        sweep_batch: int = 20,
+        delete_grace: float = 120.0,
+        credential: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self.delete_grace = delete_grace
+        self._labels = {} if credential is None else {"credential": credential}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Файлы на удаление: (момент, начиная с которого можно удалять, ID)
+        self._expired: List[tuple[float, str]] = []
+        # event loop -> задача фонового удаления
+        self._sweepers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    def get(self, digest: str) -> Optional[str]:
+        """ID загруженного файла или None, если записи нет или она истекла"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry.expires_at <= now:
+                self._expire(digest, entry)
+                entry = None
+            self._publish()
+        metrics.inc(
+            "ai_agent_gigachat_files_total", result="miss" if entry is None else "hit"
+        )
+        return None if entry is None else entry.file_id
+
+    def put(self, digest: str, file_id: str) -> None:
+        """Сохраняет ID файла; сверх max_entries вытесняются самые старые"""
+        with self._lock:
+            previous = self._entries.get(digest)
+            if previous is not None and previous.file_id != file_id:
+                self._expire(digest, previous)
+            self._entries[digest] = _Entry(file_id, self._clock() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                oldest, entry = next(iter(self._entries.items()))
+                self._expire(oldest, entry)
+            self._publish()
+
+    def pop_expired(self, limit: Optional[int] = None) -> List[str]:
+        """
+        Забирает ID файлов, которые пора удалить из хранилища.
+
+        Args:
+            limit: Максимум ID (по умолчанию все)
+        """
+        now = self._clock()
+        with self._lock:
+            for digest, entry in list(self._entries.items()):
+                if entry.expires_at <= now:
+                    self._expire(digest, entry)
+            ready = [item for item in self._expired if item[0] <= now]
+            ready = ready[:limit] if limit is not None else ready
+            for item in ready:
+                self._expired.remove(item)
+            self._publish()
+        return [file_id for _, file_id in ready]
+
+    async def sweep(self, client: Any) -> int:
+        """
+        Удаляет истекшие файлы из хранилища GigaChat пачками по sweep_batch.
+        Файлы, которые не удалось удалить, не возвращаются в очередь:
+        провайдер удалит их сам по истечении срока хранения.
+
+        Args:
+            client: Клиент GigaChat
+        Returns:
+            Количество удаленных файлов
+        """
+        deleted = 0
+        while True:
+            batch = self.pop_expired(self.sweep_batch)
+            if not batch:
+                return deleted
+            results = await asyncio.gather(
+                *(client.adelete_file(file_id) for file_id in batch),
+                return_exceptions=True,
+            )
+            for file_id, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.warning("Не удалось удалить файл %s: %s", file_id, result)
+                    metrics.inc("ai_agent_gigachat_files_deleted_total", result="error")
+                else:
+                    deleted += 1
+                    metrics.inc("ai_agent_gigachat_files_deleted_total", result="ok")
+
+    def ensure_sweeper(self, client: Any) -> None:
+        """Запускает фоновое удаление в текущем event loop, если оно не запущено"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._sweepers.get(loop)
+            if task is not None and not task.done():
+                return
+            for stale in [key for key in self._sweepers if key.is_closed()]:
+                del self._sweepers[stale]
+            self._sweepers[loop] = loop.create_task(
+                self._sweep_forever(client), name="ai-agent-gigachat-files-sweeper"
+            )
+
+    async def _sweep_forever(self, client: Any) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep(client)
+            except Exception as e:
+                logger.warning("Ошибка фонового удаления файлов GigaChat: %s", e)
+
+    def clear(self) -> None:
+        """Сбрасывает кэш и очередь удаления (для тестов)"""
+        with self._lock:
+            self._entries.clear()
+            self._expired.clear()
+            for loop, task in self._sweepers.items():
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(task.cancel)
+            self._sweepers.clear()
+            self._publish()
+
+    def _expire(self, digest: str, entry: _Entry) -> None:
+        del self._entries[digest]
+        self._expired.append((entry.expires_at + self.delete_grace, entry.file_id))
+
+    def _publish(self) -> None:
+        metrics.set_gauge(
+            "ai_agent_gigachat_files_cached", len(self._entries), **self._labels
+        )
@@ -0,0 +1,163 @@
+"""
+Модуль с хеджированием запросов к LLM для контроля хвостовых задержек.
+
+Если основной провайдер не ответил за перцентиль своей задержки,
+тот же запрос отправляется во второй провайдер. Побеждает первый
+валидный ответ, проигравший запрос отменяется.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+
+class LatencyTracker:
+    """Скользящее окно задержек для расчета перцентилей"""
+
+    def __init__(self, window_size: int = 500) -> None:
+        self._samples: deque[float] = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        """Добавляет замер задержки"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Возвращает перцентиль задержки (nearest-rank).
+
+        Args:
+            percent: Перцентиль от 0 до 100
+
+        Returns:
+            Задержка в секундах или None, если замеров нет
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, round(percent / 100 * len(samples)) - 1))
+        return samples[rank]
+
+
+class RequestHedger:
+    """
+    Запускает основной запрос и, при превышении задержки, хеджированный.
+
+    Метрики: ai_agent_hedge_requests_total, ai_agent_hedge_fired_total,
+    ai_agent_hedge_wins_total, ai_agent_hedge_added_cost_total,
+    ai_agent_hedge_rate, ai_agent_hedge_win_rate, ai_agent_hedge_delay_seconds.
+    """
+
+    def __init__(
+        self,
+        delay_percentile: float,
+        initial_delay: float,
+        min_delay: float = 0.0,
+        min_samples: int = 20,
+        request_cost: float = 0.0,
+        tracker: Optional[LatencyTracker] = None,
+    ) -> None:
+        self.delay_percentile = delay_percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.request_cost = request_cost
+        self.tracker = tracker or LatencyTracker()
+
+    def current_delay(self) -> float:
+        """Задержка перед запуском хеджа"""
+        if len(self.tracker) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, self.tracker.percentile(self.delay_percentile))
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        secondary: Callable[[], Awaitable[T]],
+    ) -> Tuple[T, str]:
+        """
+        Выполняет запрос с хеджированием.
+
+        Args:
+            primary: Фабрика корутины основного провайдера
+            secondary: Фабрика корутины хеджированного провайдера
+
+        Returns:
+            Кортеж (результат, PRIMARY или SECONDARY)
+
+        Raises:
+            Exception: Ошибка последней попытки, если обе попытки неуспешны
+        """
+        delay = self.current_delay()
+        metrics.inc("ai_agent_hedge_requests_total")
+        metrics.set_gauge("ai_agent_hedge_delay_seconds", delay)
+
+        started = time.monotonic()
+        tasks = {asyncio.ensure_future(primary()): PRIMARY}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                task = done.pop()
+                if task.exception() is None:
+                    self.tracker.observe(time.monotonic() - started)
+                    return task.result(), PRIMARY
+                logger.warning("Основной провайдер вернул ошибку: %s", task.exception())
+
+            metrics.inc("ai_agent_hedge_fired_total")
+            metrics.inc("ai_agent_hedge_added_cost_total", self.request_cost)
+            tasks[asyncio.ensure_future(secondary())] = SECONDARY
+
+            pending = {task for task in tasks if not task.done()}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    winner = tasks[task]
+                    if winner == SECONDARY:
+                        metrics.inc("ai_agent_hedge_wins_total")
+                    else:
+                        self.tracker.observe(time.monotonic() - started)
+                    return task.result(), winner
+
+            raise error or RuntimeError("Hedged request failed")
+
+        finally:
+            for task, name in tasks.items():
+                if not task.done():
+                    if name == PRIMARY:
+                        # Задержка основного провайдера не меньше прошедшего времени
+                        self.tracker.observe(time.monotonic() - started)
+                    task.cancel()
+            self._update_rates()
+
+    @staticmethod
+    def _update_rates() -> None:
+        """Пересчитывает доли хеджированных и выигранных хеджем запросов"""
+        total = metrics.get("ai_agent_hedge_requests_total")
+        fired = metrics.get("ai_agent_hedge_fired_total")
+        wins = metrics.get("ai_agent_hedge_wins_total")
+        metrics.set_gauge("ai_agent_hedge_rate", fired / total if total else 0.0)
+        metrics.set_gauge("ai_agent_hedge_win_rate", wins / fired if fired else 0.0)
@@ -0,0 +1,181 @@
+"""
+Модуль с долгоживущими HTTP пулами соединений к провайдерам LLM.
+
+Синхронный httpx.Client создается один на провайдера и процесс
+(потокобезопасен). Асинхронный httpx.AsyncClient привязан к event loop,
+поэтому создается один на провайдера и event loop.
+Повторное использование соединений учитывается в метриках.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# События httpcore trace, означающие новое соединение и TLS рукопожатие
+CONNECT_EVENT = "connection.connect_tcp.complete"
+TLS_EVENT = "connection.start_tls.complete"
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class HTTPPoolRegistry:
+    """
+    Реестр HTTP клиентов с keep-alive пулами соединений.
+
+    Метрики (label pool): ai_agent_http_requests_total,
+    ai_agent_http_connections_total, ai_agent_http_tls_handshakes_total,
+    ai_agent_http_connection_reuse_ratio.
+    """
+
+    def __init__(self, config_factory: Callable[[], Dict[str, Any]] = dict) -> None:
+        self._config_factory = config_factory
+        self._lock = threading.Lock()
+        self._sync_clients: Dict[str, "httpx.Client"] = {}
+        # event loop -> {имя пула: httpx.AsyncClient}
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def sync_client(self, name: str, **client_kwargs: Any) -> "httpx.Client":
+        """
+        Возвращает общий синхронный клиент провайдера.
+
+        Args:
+            name: Имя пула (провайдер)
+            client_kwargs: Дополнительные параметры httpx (verify, timeout)
+        """
+        import httpx
+
+        with self._lock:
+            client = self._sync_clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    **self._client_kwargs(name, client_kwargs),
+                    event_hooks={"request": [self._sync_request_hook(name)]},
+                )
+                self._sync_clients[name] = client
+            return client
+
+    def async_client(
+        self,
+        name: str,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        **client_kwargs: Any,
+    ) -> "httpx.AsyncClient":
+        """
+        Возвращает асинхронный клиент провайдера для event loop.
+
+        Args:
+            name: Имя пула (провайдер)
+            loop: Event loop (по умолчанию текущий запущенный)
+            client_kwargs: Дополнительные параметры httpx (verify, timeout)
+        """
+        import httpx
+
+        loop = loop or _running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {}) if loop else {}
+            client = clients.get(name)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    **self._client_kwargs(name, client_kwargs),
+                    event_hooks={"request": [self._async_request_hook(name)]},
+                )
+                clients[name] = client
+            return client
+
+    def _client_kwargs(self, name: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        import httpx
+
+        config = self._config_factory()
+        http2 = config.get("http2", False)
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 для пула %s недоступен: не установлен пакет h2", name)
+            http2 = False
+
+        return {
+            "limits": httpx.Limits(
+                max_connections=config.get("max_connections"),
+                max_keepalive_connections=config.get("max_keepalive_connections"),
+                keepalive_expiry=config.get("keepalive_expiry", 5.0),
+            ),
+            "http2": http2,
+            **overrides,
+        }
+
+    @staticmethod
+    def _record_request(name: str) -> None:
+        metrics.inc("ai_agent_http_requests_total", pool=name)
+        HTTPPoolRegistry._update_reuse_ratio(name)
+
+    @staticmethod
+    def _record_event(name: str, event_name: str) -> None:
+        if event_name == CONNECT_EVENT:
+            metrics.inc("ai_agent_http_connections_total", pool=name)
+            HTTPPoolRegistry._update_reuse_ratio(name)
+        elif event_name == TLS_EVENT:
+            metrics.inc("ai_agent_http_tls_handshakes_total", pool=name)
+
+    @staticmethod
+    def _update_reuse_ratio(name: str) -> None:
+        requests = metrics.get("ai_agent_http_requests_total", pool=name)
+        connections = metrics.get("ai_agent_http_connections_total", pool=name)
+        ratio = max(0.0, 1 - connections / requests) if requests else 0.0
+        metrics.set_gauge("ai_agent_http_connection_reuse_ratio", ratio, pool=name)
+
+    def _sync_request_hook(self, name: str) -> Callable:
+        def trace(event_name: str, info: Dict[str, Any]) -> None:
+            self._record_event(name, event_name)
+
+        def hook(request: "httpx.Request") -> None:
+            self._record_request(name)
+            request.extensions["trace"] = trace
+
+        return hook
+
+    def _async_request_hook(self, name: str) -> Callable:
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            self._record_event(name, event_name)
+
+        async def hook(request: "httpx.Request") -> None:
+            self._record_request(name)
+            request.extensions["trace"] = trace
+
+        return hook
+
+    def stats(self) -> Dict[str, Any]:
+        """Количество открытых клиентов по типам"""
+        with self._lock:
+            return {
+                "sync_clients": sorted(self._sync_clients),
+                "async_loops": len(self._async_clients),
+            }
+
+    def close(self) -> None:
+        """Закрывает синхронные клиенты (асинхронные закрываются вместе с loop)"""
+        with self._lock:
+            clients = list(self._sync_clients.values())
+            self._sync_clients.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Закрывает асинхронные клиенты текущего event loop"""
+        loop = _running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {}) if loop else {}
+        for client in clients.values():
+            await client.aclose()
@@ -0,0 +1,253 @@
+"""
+Модуль с утилитами для потоковой работы с изображениями.
+
+Фото из Django (TemporaryUploadedFile / InMemoryUploadedFile) читаются
+через memory-mapping или буфер BytesIO без промежуточных копий,
+а base64 кодируется по чанкам сразу в итоговый буфер.
+"""
+
+import asyncio
+import binascii
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+ImageSource = Union[bytes, bytearray, memoryview, str, IO[bytes]]
+
+_current_digests: ContextVar[Optional["ImageDigests"]] = ContextVar(
+    "ai_agent_image_digests", default=None
+)
+
+# Размер чанка кратен 3, чтобы каждый кусок кодировался в base64 без паддинга
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+DEFAULT_MIME_TYPE = "image/jpeg"
+
+
+def is_image_url(image: ImageSource) -> bool:
+    """Проверяет, передан ли URL изображения"""
+    return isinstance(image, str) and image.startswith(("http://", "https://"))
+
+
+def image_mime_type(image: ImageSource) -> str:
+    """Возвращает MIME тип изображения (для UploadedFile берется content_type)"""
+    return getattr(image, "content_type", None) or DEFAULT_MIME_TYPE
+
+
+def image_size(image: ImageSource) -> int:
+    """Возвращает размер изображения в байтах без чтения содержимого"""
+    if isinstance(image, (bytes, bytearray)):
+        return len(image)
+    if isinstance(image, memoryview):
+        return image.nbytes
+    if isinstance(image, str):
+        return len(image)
+    size = getattr(image, "size", None)
+    if size is not None:
+        return size
+    with image_buffer(image) as buffer:
+        return buffer.nbytes
+
+
+def _raw_file(image: IO[bytes]) -> IO[bytes]:
+    """Django UploadedFile оборачивает реальный файловый объект в атрибуте file"""
+    return getattr(image, "file", None) or image
+
+
+@contextmanager
+def image_buffer(image: ImageSource) -> Iterator[memoryview]:
+    """
+    Открывает изображение как memoryview без копирования содержимого.
+
+    Args:
+        image: байты или файловый объект (в т.ч. Django UploadedFile)
+
+    Yields:
+        memoryview на содержимое изображения
+    """
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        yield memoryview(image)
+        return
+
+    raw = _raw_file(image)
+
+    if isinstance(raw, io.BytesIO):
+        view = raw.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+        return
+
+    try:
+        fileno = raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+
+    if fileno is None or os.fstat(fileno).st_size == 0:
+        # mmap не работает с пустыми файлами и объектами без дескриптора
+        raw.seek(0)
+        yield memoryview(raw.read())
+        return
+
+    mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        view.release()
+        mapped.close()
+
+
+def iter_base64_chunks(
+    buffer: memoryview, chunk_size: int = BASE64_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Кодирует буфер в base64 по чанкам.
+
+    Args:
+        buffer: содержимое изображения
+        chunk_size: размер чанка (кратный 3)
+
+    Yields:
+        Закодированные куски base64
+    """
+    if chunk_size % 3:
+        raise ValueError("chunk_size must be a multiple of 3")
+
+    for offset in range(0, buffer.nbytes, chunk_size):
+        yield binascii.b2a_base64(buffer[offset : offset + chunk_size], newline=False)
+
+
+def image_to_data_url(image: ImageSource, chunk_size: int = BASE64_CHUNK_SIZE) -> str:
+    """
+    Формирует data URL изображения для OpenAI Vision.
+
+    Итоговый буфер выделяется один раз под точный размер,
+    base64 пишется в него по чанкам, строка создается одним декодированием.
+
+    Args:
+        image: байты, base64 строка или файловый объект
+        chunk_size: размер чанка для кодирования
+
+    Returns:
+        Строка вида data:<mime>;base64,<...>
+    """
+    prefix = f"data:{image_mime_type(image)};base64,".encode("ascii")
+
+    if isinstance(image, str):
+        # Уже base64 строка
+        return prefix.decode("ascii") + image
+
+    with image_buffer(image) as buffer:
+        encoded_size = 4 * ((buffer.nbytes + 2) // 3)
+        data_url = bytearray(len(prefix) + encoded_size)
+        data_url[: len(prefix)] = prefix
+
+        position = len(prefix)
+        for chunk in iter_base64_chunks(buffer, chunk_size):
+            data_url[position : position + len(chunk)] = chunk
+            position += len(chunk)
+
+    return data_url.decode("ascii")
+
+
+def image_upload_file(
+    image: ImageSource, index: int = 0
+) -> Tuple[str, Union[bytes, IO[bytes]], str]:
+    """
+    Формирует файл для multipart загрузки (GigaChat upload_file).
+
+    Файловые объекты передаются как есть, httpx читает их потоково.
+
+    Args:
+        image: байты или файловый объект
+        index: порядковый номер для имени файла по умолчанию
+
+    Returns:
+        Кортеж (имя файла, содержимое, MIME тип)
+    """
+    mime_type = image_mime_type(image)
+    default_name = f"image_{index}.{mime_type.rsplit('/', 1)[-1]}"
+
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return default_name, bytes(image), mime_type
+
+    raw = _raw_file(image)
+    raw.seek(0)
+    name = getattr(image, "name", None) or default_name
+    return str(name).rsplit("/", 1)[-1], raw, mime_type
+
+
+def images_digest(images: Iterable[ImageSource]) -> str:
+    """
+    Вычисляет SHA-256 набора изображений без копирования содержимого.
+
+    URL и base64 строки хешируются как текст.
+
+    Args:
+        images: Список изображений
+
+    Returns:
+        Hex дайджест
+    """
+    digest = hashlib.sha256()
+    for image in images:
+        if isinstance(image, str):
+            data = image.encode("utf-8")
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+            continue
+        with image_buffer(image) as buffer:
+            digest.update(buffer.nbytes.to_bytes(8, "big"))
+            digest.update(buffer)
+    return digest.hexdigest()
+
+
+class ImageDigests:
+    """
+    Дайджесты изображений одного запроса.
+
+    SHA-256 - синхронный проход по всему содержимому, поэтому каждый набор
+    изображений хешируется один раз и в потоке, вне event loop; ключ
+    single-flight, кэш файлов GigaChat и кассеты получают готовый дайджест.
+    Наборы различаются по идентичности объектов изображений (ссылки на них
+    хранятся до конца запроса).
+    """
+
+    def __init__(self) -> None:
+        self._digests: Dict[Tuple[int, ...], Tuple[tuple, str]] = {}
+
+    @staticmethod
+    def current() -> "ImageDigests":
+        """Дайджесты текущего запроса (вне запроса - новые, без переиспользования)"""
+        digests = _current_digests.get()
+        return digests if digests is not None else ImageDigests()
+
+    @contextmanager
+    def scope(self) -> Iterator["ImageDigests"]:
+        """Делает дайджесты текущими для вложенных вызовов и задач"""
+        token = _current_digests.set(self)
+        try:
+            yield self
+        finally:
+            _current_digests.reset(token)
+
+    async def digest(self, images: Sequence[ImageSource]) -> str:
+        """SHA-256 набора изображений (как images_digest), один раз на набор"""
+        images = tuple(images)
+        key = tuple(id(image) for image in images)
+        cached = self._digests.get(key)
+        if cached is not None:
+            return cached[1]
+        if all(isinstance(image, str) for image in images):
+            # Текст и URL хешируются быстро
+            digest = images_digest(images)
+        else:
+            digest = await asyncio.to_thread(images_digest, images)
+        self._digests[key] = (images, digest)
+        return digest
@@ -0,0 +1,135 @@
+"""
+Модуль с инкрементальным парсером JSON ответа модели.
+
+Парсер получает текст по мере стриминга и отдает каждое блюдо, как только
+пришла закрывающая скобка его объекта. Markdown ограждения, текст вокруг
+JSON и висячие запятые (как в примере промпта) игнорируются.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = frozenset(" \t\r\n")
+
+
+class DishStreamParser:
+    """
+    Инкрементальный парсер объектов верхнего уровня из потока текста.
+
+    Объектом верхнего уровня считается любой {...} вне другого объекта:
+    и элементы массива, и одиночный объект без массива.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._saw_array = False
+        self._errors = 0
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Добавляет фрагмент текста.
+
+        Args:
+            chunk: Очередной фрагмент ответа модели
+        Returns:
+            Объекты, закрытые в этом фрагменте
+        """
+        dishes = []
+        buffer = self._buffer
+        for char in chunk:
+            if self._depth == 0:
+                # Вне объекта: текст, ограждения и скобки массива пропускаются
+                if char == "{":
+                    self._depth = 1
+                    buffer.append(char)
+                elif char == "[":
+                    self._saw_array = True
+                continue
+
+            if self._in_string:
+                buffer.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{" or char == "[":
+                self._depth += 1
+            elif char == "}" or char == "]":
+                self._strip_trailing_comma()
+                self._depth -= 1
+            buffer.append(char)
+
+            if self._depth == 0:
+                dish = self._load("".join(buffer))
+                buffer.clear()
+                if dish is not None:
+                    dishes.append(dish)
+
+        self.emitted += len(dishes)
+        return dishes
+
+    def finish(self) -> None:
+        """
+        Проверяет, что ответ содержал JSON.
+
+        Raises:
+            json.JSONDecodeError: Если не найдено ни одного объекта
+                и ни одного корректного (пустого) массива
+        """
+        if self.emitted:
+            return
+        if self._saw_array and not self._errors and self._depth == 0:
+            return
+        raise json.JSONDecodeError(
+            "No JSON objects in response", "".join(self._buffer), 0
+        )
+
+    def _strip_trailing_comma(self) -> None:
+        """Удаляет висячую запятую перед закрывающей скобкой"""
+        buffer = self._buffer
+        while buffer and buffer[-1] in WHITESPACE:
+            buffer.pop()
+        if buffer and buffer[-1] == ",":
+            buffer.pop()
+
+    def _load(self, text: str) -> Any:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as e:
+            self._errors += 1
+            logger.warning("Пропущен невалидный объект в ответе модели: %s", e)
+            return None
+        return value if isinstance(value, dict) else None
+
+
+def parse_dishes(chunks: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Разбирает ответ модели целиком.
+
+    Args:
+        chunks: Ответ модели (строка или фрагменты)
+    Returns:
+        Список словарей с данными о блюдах
+
+    Raises:
+        json.JSONDecodeError: Если JSON не найден
+    """
+    parser = DishStreamParser()
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    dishes = [dish for chunk in chunks for dish in parser.feed(chunk)]
+    parser.finish()
+    return dishes
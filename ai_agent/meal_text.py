@@ -0,0 +1,131 @@
+"""
+Модуль с быстрым разбором текстового описания приема пищи без LLM.
+
+Описание вида "200 г гречки, куриная грудка 150г" делится на фрагменты
+"количество + продукт"; продукт ищется в локальной таблице КБЖУ.
+Фрагменты без веса в граммах/мл или без совпадения в таблице остаются
+неразобранными и отправляются в модель.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .nutrients import NutrientIndex, NutrientMatch, normalize_name
+
+# Запятая-разделитель, но не десятичная ("1,5 кг")
+_SEPARATORS = re.compile(r"(?<!\d),|,(?!\d)|[;\n+]|\s+и\s+", re.IGNORECASE)
+
+# Единицы, переводимые в граммы умножением на 1000 (плотность жидкостей 1 г/мл)
+_THOUSANDS = ("кг", "килограмм", "kg", "л", "литр", "l")
+
+_QUANTITY = re.compile(
+    r"(?P<amount>\d+(?:[.,]\d+)?)\s*"
+    r"(?P<unit>килограмм\w*|миллилитр\w*|грамм\w*|литр\w*|кг|гр|мл|г|л|kg|ml|g|l)"
+    r"(?!\w)\.?",
+    re.IGNORECASE,
+)
+
+# Слова, не относящиеся к названию продукта
+_FILLER = re.compile(
+    r"\b(?:примерно|около|где-то|порция|порции|тарелка|съел[аи]?|выпил[аи]?)\b",
+    re.IGNORECASE,
+)
+
+# Служебные слова, не обязательные для совпадения с таблицей
+_STOP_WORDS = {"с", "со", "из", "на", "в", "во", "по"}
+
+
+@dataclass
+class MealTextParse:
+    """Результат разбора описания: найденные блюда и остаток для модели"""
+
+    dishes: List[Dict[str, Any]] = field(default_factory=list)
+    unresolved: List[str] = field(default_factory=list)
+
+
+def split_fragments(text: str) -> List[str]:
+    """Делит описание на фрагменты по запятым, точкам с запятой и союзам"""
+    return [
+        fragment.strip(" .")
+        for fragment in _SEPARATORS.split(text)
+        if fragment.strip(" .")
+    ]
+
+
+def parse_fragment(fragment: str) -> Optional[Tuple[str, float]]:
+    """
+    Извлекает продукт и вес в граммах из фрагмента.
+
+    Returns:
+        (название, вес) или None, если вес не указан в г/кг/мл/л
+        или во фрагменте несколько количеств
+    """
+    quantities = list(_QUANTITY.finditer(fragment))
+    if len(quantities) != 1:
+        return None
+
+    quantity = quantities[0]
+    unit = quantity.group("unit").lower()
+    weight = float(quantity.group("amount").replace(",", "."))
+    if unit.startswith(_THOUSANDS):
+        weight *= 1000
+
+    name = fragment[: quantity.start()] + " " + fragment[quantity.end() :]
+    name = " ".join(_FILLER.sub(" ", name).split()).strip(" -:")
+    if not name or weight <= 0:
+        return None
+    return name, weight
+
+
+def _stem(word: str) -> str:
+    """Грубая основа слова для сравнения падежных форм ("гречки" - "гречка")"""
+    return word[: max(3, len(word) - 2)]
+
+
+def is_confident_match(name: str, match: NutrientMatch) -> bool:
+    """
+    Проверяет, что совпадение с таблицей достаточно для записи без модели.
+
+    Нечеткий поиск допускает похожие, но другие продукты ("кофе с молоком"
+    и "омлет с молоком"), поэтому каждое значимое слово запроса должно
+    найтись в названии из таблицы, а "без" - совпадать с обеих сторон.
+    """
+    key_words = normalize_name(match.key).split()
+    words = normalize_name(name).split()
+    if ("без" in key_words) != ("без" in words):
+        return False
+    return all(
+        any(key_word.startswith(_stem(word)) for key_word in key_words)
+        for word in words
+        if word not in _STOP_WORDS
+    )
+
+
+def parse_meal_text(text: str, index: NutrientIndex) -> MealTextParse:
+    """
+    Разбирает описание приема пищи по локальной таблице КБЖУ.
+
+    Args:
+        text: Описание, например "200 г гречки, куриная грудка 150г"
+        index: Индекс таблицы пищевой ценности
+    Returns:
+        MealTextParse с блюдами (name, weight и КБЖУ) и неразобранными фрагментами
+    """
+    result = MealTextParse()
+    for fragment in split_fragments(text):
+        parsed = parse_fragment(fragment)
+        match = index.lookup(parsed[0]) if parsed else None
+        if match is None or not is_confident_match(parsed[0], match):
+            result.unresolved.append(fragment)
+            continue
+
+        _, weight = parsed
+        result.dishes.append(
+            {
+                "name": match.record.name,
+                "weight": weight,
+                **match.record.for_weight(weight),
+            }
+        )
+    return result
@@ -0,0 +1,171 @@
+"""
+Модуль с простым in-process реестром метрик ai_agent.
+"""
+
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+# Границы бакетов гистограмм по умолчанию
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(2**power for power in range(14, 26, 2))  # 16 КБ .. 32 МБ
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _metric_key(name: str, labels: Dict[str, str]) -> str:
+    """Формирует ключ метрики в стиле Prometheus: name{label="value"}"""
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными бакетами (не потокобезопасна сама по себе)"""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе бакета"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, object]:
+        cumulative, seen = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            cumulative[str(bound)] = seen
+        cumulative["+Inf"] = self.count
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class MetricsRegistry:
+    """
+    Потокобезопасный реестр счетчиков, gauge-метрик и гистограмм.
+    Метрики живут в рамках процесса воркера.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Увеличивает счетчик"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """Устанавливает значение gauge-метрики"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> None:
+        """Добавляет наблюдение в гистограмму (бакеты задаются первым вызовом)"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def get(self, name: str, **labels: str) -> float:
+        """Возвращает текущее значение счетчика или gauge-метрики"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            if key in self._gauges:
+                return self._gauges[key]
+            return self._counters.get(key, 0.0)
+
+    def histogram(self, name: str, **labels: str) -> Dict[str, object]:
+        """Возвращает снимок гистограммы (пустой, если наблюдений не было)"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                return {"buckets": {}, "sum": 0.0, "count": 0}
+            return histogram.snapshot()
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Возвращает копию всех метрик"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {
+                    _metric_key(name, dict(labels)): histogram.snapshot()
+                    for (name, labels), histogram in self._histograms.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Возвращает метрики в текстовом формате Prometheus"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                (key, histogram.snapshot())
+                for key, histogram in self._histograms.items()
+            )
+
+        lines: List[str] = []
+        typed = set()
+
+        def declare(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for kind, items in (("counter", counters), ("gauge", gauges)):
+            for key, value in items:
+                declare(key.split("{", 1)[0], kind)
+                lines.append(f"{key} {value}")
+
+        for (name, labels), snapshot in histograms:
+            declare(name, "histogram")
+            labels = dict(labels)
+            for bound, count in snapshot["buckets"].items():
+                bucket_key = _metric_key(f"{name}_bucket", {**labels, "le": bound})
+                lines.append(f"{bucket_key} {count}")
+            lines.append(f"{_metric_key(f'{name}_sum', labels)} {snapshot['sum']}")
+            lines.append(f"{_metric_key(f'{name}_count', labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Сбрасывает все метрики (для тестов)"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,86 @@
+"""
+Модуль со сборкой мозаики из нескольких фото приема пищи.
+
+Фото уменьшаются и раскладываются по сетке с номерами в углу ячеек,
+мозаика кодируется в один JPEG: провайдер получает одно изображение
+вместо нескольких (одна загрузка в GigaChat, один image_url в OpenAI).
+Pillow импортируется только при сборке мозаики.
+"""
+
+import io
+import math
+from typing import Sequence
+
+from .images import ImageSource, image_buffer
+
+MOSAIC_BACKGROUND = (255, 255, 255)
+LABEL_COLOR = (255, 255, 255)
+LABEL_BACKGROUND = (0, 0, 0)
+
+
+def can_build_mosaic(images: Sequence[ImageSource]) -> bool:
+    """Мозаика собирается из 2+ изображений, переданных байтами или файлами"""
+    return len(images) > 1 and not any(isinstance(image, str) for image in images)
+
+
+def mosaic_grid(count: int) -> tuple[int, int]:
+    """Колонки и строки сетки, близкой к квадратной"""
+    columns = math.ceil(math.sqrt(count))
+    return columns, math.ceil(count / columns)
+
+
+def build_mosaic(
+    images: Sequence[ImageSource], tile_size: int = 768, quality: int = 85
+) -> bytes:
+    """
+    Собирает пронумерованную мозаику из изображений.
+
+    Args:
+        images: Изображения (байты или файловые объекты) в порядке номеров
+        tile_size: Сторона квадратной ячейки в пикселях
+        quality: Качество JPEG
+    Returns:
+        JPEG мозаики
+    """
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+    columns, rows = mosaic_grid(len(images))
+    size = (columns * tile_size, rows * tile_size)
+    mosaic = Image.new("RGB", size, MOSAIC_BACKGROUND)
+    draw = ImageDraw.Draw(mosaic)
+    label_size = max(16, tile_size // 12)
+    font = ImageFont.load_default(size=label_size)
+
+    for number, image in enumerate(images, 1):
+        with image_buffer(image) as buffer, Image.open(io.BytesIO(buffer)) as photo:
+            # Ориентация из EXIF: фото с телефона часто повернуты
+            photo = ImageOps.exif_transpose(photo).convert("RGB")
+            photo.thumbnail((tile_size, tile_size), Image.Resampling.LANCZOS)
+
+        row, column = divmod(number - 1, columns)
+        left = column * tile_size + (tile_size - photo.width) // 2
+        top = row * tile_size + (tile_size - photo.height) // 2
+        mosaic.paste(photo, (left, top))
+
+        padding = label_size // 4
+        position = (left + padding, top + padding)
+        box = draw.textbbox(position, str(number), font=font)
+        draw.rectangle(
+            (box[0] - padding, box[1] - padding, box[2] + padding, box[3] + padding),
+            fill=LABEL_BACKGROUND,
+        )
+        draw.text(position, str(number), fill=LABEL_COLOR, font=font)
+
+    output = io.BytesIO()
+    mosaic.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def mosaic_prompt(prompt: str, count: int) -> str:
+    """Дополняет промпт описанием мозаики"""
+    return (
+        f"{prompt}\n"
+        f"Изображение - сетка из {count} пронумерованных фото одного приема пищи. "
+        "Перечисли блюда со всех фото; одно и то же блюдо на разных фото "
+        "учитывай один раз.\n"
+    )
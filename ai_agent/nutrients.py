@@ -0,0 +1,185 @@
+"""
+Модуль с локальной таблицей пищевой ценности продуктов.
+
+Таблица (значения на 100 г) загружается из CSV в память один раз на процесс.
+Названия блюд от модели сопоставляются с таблицей нечетко: сначала точное
+совпадение по названию или синониму, затем кандидаты по общим триграммам.
+"""
+
+import csv
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import get_llm_settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = Path(__file__).resolve().parent / "data" / "nutrients.csv"
+
+# Сколько кандидатов по триграммам проверяется точной метрикой
+CANDIDATES_LIMIT = 20
+
+_NON_WORD = re.compile(r"[^\w%.]+")
+
+
+def normalize_name(name: str) -> str:
+    """Приводит название к виду для сопоставления: регистр, ё, пунктуация"""
+    return _NON_WORD.sub(" ", name.lower().replace("ё", "е")).strip()
+
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class NutrientRecord:
+    """Пищевая ценность продукта на 100 г"""
+
+    name: str
+    calories: float
+    protein: float
+    fat: float
+    carbohydrates: float
+
+    def for_weight(self, weight: float) -> Dict[str, float]:
+        """КБЖУ порции заданного веса в граммах"""
+        factor = weight / 100
+        return {
+            "calories": round(self.calories * factor),
+            "protein": round(self.protein * factor, 1),
+            "fat": round(self.fat * factor, 1),
+            "carbohydrates": round(self.carbohydrates * factor, 1),
+        }
+
+
+@dataclass(frozen=True)
+class NutrientMatch:
+    """Результат сопоставления названия с таблицей"""
+
+    record: NutrientRecord
+    key: str
+    score: float
+
+
+class NutrientIndex:
+    """
+    In-memory индекс таблицы пищевой ценности.
+
+    Метрики: ai_agent_nutrient_lookups_total (label result: hit/miss).
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Tuple[str, NutrientRecord]],
+        threshold: float = 0.6,
+    ) -> None:
+        """
+        Args:
+            entries: Пары (название или синоним, запись)
+            threshold: Минимальная схожесть для нечеткого совпадения (0..1)
+        """
+        self.threshold = threshold
+        self._records: Dict[str, NutrientRecord] = {}
+        self._keys: List[str] = []
+        self._key_trigrams: List[Set[str]] = []
+        self._trigram_index: Dict[str, List[int]] = defaultdict(list)
+
+        for name, record in entries:
+            key = normalize_name(name)
+            if not key or key in self._records:
+                continue
+            self._records[key] = record
+            trigrams = _trigrams(key)
+            for trigram in trigrams:
+                self._trigram_index[trigram].append(len(self._keys))
+            self._keys.append(key)
+            self._key_trigrams.append(trigrams)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def from_csv(cls, path: Path = DATASET_PATH, threshold: float = 0.6):
+        """
+        Загружает таблицу из CSV.
+
+        Колонки: name, aliases (через |), calories, protein, fat, carbohydrates.
+        """
+        entries = []
+        with open(path, encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(file):
+                record = NutrientRecord(
+                    name=row["name"],
+                    calories=float(row["calories"]),
+                    protein=float(row["protein"]),
+                    fat=float(row["fat"]),
+                    carbohydrates=float(row["carbohydrates"]),
+                )
+                aliases = [alias for alias in row["aliases"].split("|") if alias]
+                entries.extend((name, record) for name in [row["name"], *aliases])
+        index = cls(entries, threshold=threshold)
+        logger.info("Загружена таблица пищевой ценности: %d названий", len(index))
+        return index
+
+    def lookup(self, name: str) -> Optional[NutrientMatch]:
+        """
+        Находит запись, наиболее похожую на название.
+
+        Args:
+            name: Название блюда от модели
+        Returns:
+            NutrientMatch или None, если схожесть ниже порога
+        """
+        match = self._lookup(normalize_name(name))
+        metrics.inc(
+            "ai_agent_nutrient_lookups_total", result="hit" if match else "miss"
+        )
+        return match
+
+    def _lookup(self, query: str) -> Optional[NutrientMatch]:
+        if not query:
+            return None
+        record = self._records.get(query)
+        if record is not None:
+            return NutrientMatch(record=record, key=query, score=1.0)
+
+        query_trigrams = _trigrams(query)
+        overlaps: Dict[int, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for position in self._trigram_index.get(trigram, ()):
+                overlaps[position] += 1
+
+        candidates = sorted(overlaps, key=overlaps.get, reverse=True)
+        best: Optional[NutrientMatch] = None
+        for position in candidates[:CANDIDATES_LIMIT]:
+            key = self._keys[position]
+            dice = (
+                2
+                * overlaps[position]
+                / (len(query_trigrams) + len(self._key_trigrams[position]))
+            )
+            score = max(dice, SequenceMatcher(None, query, key).ratio())
+            if best is None or score > best.score:
+                best = NutrientMatch(record=self._records[key], key=key, score=score)
+
+        if best is None or best.score < self.threshold:
+            return None
+        return best
+
+
+@lru_cache(maxsize=None)
+def get_nutrient_index() -> NutrientIndex:
+    """Возвращает индекс таблицы из настроек, загружая его при первом вызове"""
+    llm_settings = get_llm_settings()
+    return NutrientIndex.from_csv(
+        Path(llm_settings.nutrient_dataset_path or DATASET_PATH),
+        threshold=llm_settings.nutrient_match_threshold,
+    )
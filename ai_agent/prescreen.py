@@ -0,0 +1,159 @@
+"""
+Модуль с быстрой локальной проверкой фото перед анализом в LLM.
+
+Фото уменьшается до нескольких сотен пикселей в оттенках серого
+(для JPEG - сразу при декодировании), после чего на NumPy считаются:
+    sharpness - дисперсия лапласиана (размытие)
+    brightness - средняя яркость (черные и засвеченные кадры)
+    entropy - энтропия гистограммы яркости в битах (пустые кадры)
+    peak_ratio - доля самого частого уровня яркости (фон скриншотов и графики)
+Фото, заведомо непригодные для распознавания, отклоняются за миллисекунды
+без вызова провайдера. Пороги - LLM_PRESCREEN_*, подбор по выборке -
+benchmarks/tune_prescreen.py.
+"""
+
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .images import ImageSource, image_buffer
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PRESCREEN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+REJECTION_DETAILS = {
+    "unreadable": "Photo could not be decoded",
+    "too_dark": "Photo is too dark",
+    "too_bright": "Photo is overexposed",
+    "blurry": "Photo is too blurry",
+    "low_detail": "Photo has no visible details",
+    "screenshot": "Photo looks like a screenshot or graphic, not a meal photo",
+}
+
+
+@dataclass(frozen=True)
+class PhotoStats:
+    """Признаки качества фото"""
+
+    sharpness: float
+    brightness: float
+    entropy: float
+    peak_ratio: float
+
+
+@dataclass(frozen=True)
+class PhotoRejection:
+    """Причина отклонения фото"""
+
+    code: str
+    stats: Optional[PhotoStats] = None
+
+    @property
+    def detail(self) -> str:
+        return REJECTION_DETAILS[self.code]
+
+
+def photo_stats(image: ImageSource, size: int = 256) -> PhotoStats:
+    """
+    Считает признаки качества на уменьшенной копии фото.
+
+    Args:
+        image: Байты или файловый объект изображения
+        size: Длинная сторона уменьшенной копии в пикселях
+
+    Raises:
+        OSError: Если изображение не декодируется
+    """
+    import numpy as np
+    from PIL import Image
+
+    with image_buffer(image) as buffer, Image.open(io.BytesIO(buffer)) as photo:
+        # JPEG декодируется сразу в уменьшенном масштабе (1/2 .. 1/8)
+        photo.draft("L", (size, size))
+        gray = photo.convert("L")
+        gray.thumbnail((size, size))
+        pixels = np.asarray(gray, dtype=np.float32)
+
+    laplacian = (
+        pixels[1:-1, 2:]
+        + pixels[1:-1, :-2]
+        + pixels[2:, 1:-1]
+        + pixels[:-2, 1:-1]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    histogram = np.bincount(pixels.astype(np.uint8).ravel(), minlength=256)
+    probabilities = histogram[histogram > 0] / pixels.size
+    return PhotoStats(
+        sharpness=float(laplacian.var()),
+        brightness=float(pixels.mean()),
+        entropy=float(-(probabilities * np.log2(probabilities)).sum()),
+        peak_ratio=float(probabilities.max()),
+    )
+
+
+def classify(stats: PhotoStats, thresholds: Dict[str, Any]) -> Optional[str]:
+    """Код причины отклонения по порогам или None, если фото пригодно"""
+    if stats.brightness < thresholds["min_brightness"]:
+        return "too_dark"
+    if stats.brightness > thresholds["max_brightness"]:
+        return "too_bright"
+    if stats.entropy < thresholds["min_entropy"]:
+        return "low_detail"
+    if stats.peak_ratio > thresholds["max_peak_ratio"]:
+        return "screenshot"
+    if stats.sharpness < thresholds["min_sharpness"]:
+        return "blurry"
+    return None
+
+
+def screen_photo(
+    image: ImageSource, thresholds: Optional[Dict[str, Any]] = None
+) -> Optional[PhotoRejection]:
+    """
+    Проверяет, пригодно ли фото для распознавания.
+    URL и base64 строки не проверяются.
+
+    Args:
+        image: Байты или файловый объект изображения
+        thresholds: Пороги (по умолчанию из настроек LLM_PRESCREEN_*;
+            при LLM_PRESCREEN_ENABLED=false проверка не выполняется)
+    Returns:
+        PhotoRejection для непригодного фото или None
+
+    Метрики: ai_agent_prescreen_total (label result: ok или код причины),
+    гистограмма ai_agent_prescreen_seconds.
+    """
+    if isinstance(image, str):
+        return None
+    if thresholds is None:
+        from .config import get_llm_settings
+
+        llm_settings = get_llm_settings()
+        if not llm_settings.prescreen_enabled:
+            return None
+        thresholds = llm_settings.get_prescreen_config()
+
+    started = time.monotonic()
+    try:
+        stats = photo_stats(image, size=thresholds["size"])
+    except (OSError, ValueError) as e:
+        # PIL.UnidentifiedImageError - наследник OSError
+        logger.info("Фото не декодируется: %s", e)
+        stats, code = None, "unreadable"
+    else:
+        code = classify(stats, thresholds)
+    metrics.observe(
+        "ai_agent_prescreen_seconds",
+        time.monotonic() - started,
+        buckets=PRESCREEN_BUCKETS,
+    )
+    metrics.inc("ai_agent_prescreen_total", result=code or "ok")
+
+    if code is None:
+        return None
+    logger.info("Фото отклонено до анализа: %s %s", code, stats)
+    return PhotoRejection(code=code, stats=stats)
@@ -57,3 +57,30 @@ food_analise_system_prompt_mini = """Ты - эксперт по питанию.
         },
         ]
 """
+
+food_names_prompt = """Ты - эксперт по питанию. Определи блюда на изображении и их вес.
+Называй блюда простыми общеупотребительными названиями (например: "гречка отварная", "куриная грудка жареная").
+Составные блюда разбивай на основные компоненты.
+Верни результат строго в формате JSON массива:
+[
+        {
+          "name": "название блюда",
+          "weight": float (г)
+        }
+]
+"""
+
+food_text_prompt = """Ты - эксперт по питанию. Пользователь описал съеденное текстом: {text}
+Определи продукты и блюда, их вес (если вес не указан - стандартная порция) и рассчитай КБЖУ.
+Верни результат строго в формате JSON массива:
+[
+        {{
+          "name": "название блюда",
+          "weight": float (г),
+          "calories": integer (ккал),
+          "protein": float (г),
+          "fat": float (г),
+          "carbohydrates": float (г)
+        }}
+]
+"""
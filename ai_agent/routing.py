@@ -0,0 +1,124 @@
+"""
+Модуль с маршрутизацией запросов между моделями провайдера по сложности.
+
+Простой запрос уходит легкой модели провайдера (OPENAI_LIGHT_MODEL и т.п.),
+остальные - основной. Запрос считается простым, если:
+    - в нем не больше LLM_ROUTING_MAX_IMAGES фото, все фото переданы
+      содержимым (не URL) и их суммарный размер не больше
+      LLM_ROUTING_MAX_IMAGE_BYTES;
+    - энтропия яркости каждого фото не больше LLM_ROUTING_MAX_ENTROPY
+      (если порог задан): в загроможденном кадре обычно несколько блюд;
+    - в текстовом описании не больше LLM_ROUTING_MAX_TEXT_ITEMS продуктов.
+Повторная попытка всегда идет основной модели. Решения учитываются
+в метрике ai_agent_routing_total, задержка по маршрутам - в телеметрии
+вызовов (ai_agent.telemetry).
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from .config import ModelRoute, get_llm_settings
+from .images import ImageSource, image_size, is_image_url
+from .meal_text import split_fragments
+from .metrics import metrics
+from .prescreen import photo_stats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RoutingDecision:
+    """Выбранная модель и причина выбора"""
+
+    route: ModelRoute
+    reason: str
+
+
+class RoutingPolicy:
+    """
+    Правила выбора модели по признакам запроса.
+
+    Метрики: ai_agent_routing_total (labels route и reason: simple, retry,
+    images, url, bytes, entropy, unreadable, text_items).
+    """
+
+    def __init__(
+        self,
+        max_images: int = 1,
+        max_image_bytes: int = 2_000_000,
+        max_entropy: Optional[float] = None,
+        max_text_items: int = 2,
+        stats_size: int = 256,
+    ) -> None:
+        self.max_images = max_images
+        self.max_image_bytes = max_image_bytes
+        self.max_entropy = max_entropy
+        self.max_text_items = max_text_items
+        self.stats_size = stats_size
+
+    @property
+    def decodes_images(self) -> bool:
+        """Декодирует ли решение фото (тогда его стоит вынести из event loop)"""
+        return self.max_entropy is not None
+
+    def decide(
+        self,
+        images: List[ImageSource],
+        text: Optional[str] = None,
+        attempt: int = 0,
+    ) -> RoutingDecision:
+        """
+        Выбирает модель для запроса.
+
+        Args:
+            images: Изображения запроса (до сборки мозаики)
+            text: Текстовое описание вместо изображений
+            attempt: Номер попытки у провайдера (с 0)
+        """
+        reason = self._complexity(images, text, attempt)
+        decision = RoutingDecision(
+            ModelRoute.LIGHT if reason is None else ModelRoute.STANDARD,
+            reason or "simple",
+        )
+        metrics.inc(
+            "ai_agent_routing_total",
+            route=decision.route.value,
+            reason=decision.reason,
+        )
+        logger.debug("Маршрут запроса: %s (%s)", decision.route.value, decision.reason)
+        return decision
+
+    def _complexity(
+        self, images: List[ImageSource], text: Optional[str], attempt: int
+    ) -> Optional[str]:
+        """Причина считать запрос сложным или None для простого"""
+        if attempt:
+            return "retry"
+        if text is not None:
+            if len(split_fragments(text)) > self.max_text_items:
+                return "text_items"
+            return None
+        if len(images) > self.max_images:
+            return "images"
+        if any(is_image_url(image) for image in images):
+            # Размер и содержимое фото по ссылке неизвестны
+            return "url"
+        if sum(image_size(image) for image in images) > self.max_image_bytes:
+            return "bytes"
+        if self.max_entropy is not None:
+            for image in images:
+                try:
+                    stats = photo_stats(image, size=self.stats_size)
+                except (OSError, ValueError):
+                    return "unreadable"
+                if stats.entropy > self.max_entropy:
+                    return "entropy"
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_routing_policy() -> RoutingPolicy:
+    """Возвращает политику маршрутизации из настроек (создается один раз)"""
+    return RoutingPolicy(**get_llm_settings().get_routing_config())
@@ -0,0 +1,155 @@
+"""
+Модуль для запуска асинхронных вызовов ai_agent из синхронного кода.
+
+В каждом процессе воркера работает один фоновый поток с долгоживущим
+event loop. Синхронные view передают в него корутины и ждут результат;
+асинхронные ресурсы (пулы соединений, клиенты провайдеров, токены)
+привязаны к этому loop и живут между запросами.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """
+    Фоновый event loop процесса с потокобезопасной отправкой корутин.
+
+    Loop запускается при первой отправке и перезапускается в дочернем
+    процессе после fork (поток родителя в нем не существует).
+    """
+
+    def __init__(self, name: str = "ai-agent-loop") -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Запущенный loop текущего процесса"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name=self.name, daemon=True)
+        thread.start()
+        ready.wait()
+
+        self._loop, self._thread, self._pid = loop, thread, os.getpid()
+        logger.info("Запущен фоновый event loop %s (pid %d)", self.name, self._pid)
+
+    def in_loop_thread(self) -> bool:
+        """Вызван ли код из потока фонового loop"""
+        thread = self._thread
+        return thread is not None and threading.current_thread() is thread
+
+    def submit(
+        self, coroutine: Coroutine[None, None, T]
+    ) -> "concurrent.futures.Future[T]":
+        """
+        Отправляет корутину в фоновый loop.
+
+        Args:
+            coroutine: Корутина для выполнения
+
+        Returns:
+            concurrent.futures.Future с результатом
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(
+        self, coroutine: Coroutine[None, None, T], timeout: Optional[float] = None
+    ) -> T:
+        """
+        Выполняет корутину в фоновом loop и ждет результат.
+
+        Args:
+            coroutine: Корутина для выполнения
+            timeout: Максимальное ожидание в секундах (корутина отменяется)
+
+        Raises:
+            RuntimeError: При вызове из потока фонового loop (взаимоблокировка)
+            TimeoutError: Если результат не получен за timeout
+        """
+        if self.in_loop_thread():
+            coroutine.close()
+            raise RuntimeError("run_sync cannot be called from the background loop")
+
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Background call did not finish in {timeout}s")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Отменяет незавершенные задачи и останавливает loop"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid() or loop.is_closed():
+                return
+            self._loop = self._thread = None
+
+        async def shutdown() -> None:
+            tasks = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        except Exception as e:
+            logger.warning("Ошибка остановки фонового event loop: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+background_loop = BackgroundLoop()
+atexit.register(background_loop.stop)
+
+
+def submit(coroutine: Coroutine[None, None, T]) -> "concurrent.futures.Future[T]":
+    """Отправляет корутину в фоновый loop процесса без ожидания"""
+    return background_loop.submit(coroutine)
+
+
+def run_sync(coroutine: Coroutine[None, None, T], timeout: Optional[float] = None) -> T:
+    """
+    Выполняет корутину в фоновом event loop процесса.
+
+    Args:
+        coroutine: Корутина для выполнения
+        timeout: Максимальное ожидание в секундах
+
+    Returns:
+        Результат корутины
+    """
+    return background_loop.run(coroutine, timeout=timeout)
@@ -0,0 +1,170 @@
+"""
+Модуль с планированием вызовов провайдеров: полосы приоритета и
+справедливая очередь по пациентам.
+
+Запрос относится к полосе (interactive - загрузка фото пользователем,
+background - пакетный повторный анализ) и к арендатору (пациент или
+пакетное задание клиники). Класс запроса задается на входе через
+request_scope() и передается через contextvar, как дедлайн.
+
+Лимитер провайдера (concurrency_limiter) выдает освободившиеся слоты:
+    - строго по приоритету полос: interactive раньше background;
+    - внутри полосы - по взвешенной справедливой очереди (SCFQ): каждый
+      вызов получает метку finish = max(V, последняя метка арендатора)
+      + 1 / weight, слот выдается вызову с наименьшей меткой, V - метка
+      последнего выданного. Один тяжелый пациент не вытесняет остальных,
+      его вызовы чередуются с вызовами других пациентов.
+Фоновые вызовы занимают не больше доли лимита (LLM_SCHEDULER_BACKGROUND_SHARE),
+чтобы у интерактивных всегда оставался запас без ожидания.
+"""
+
+import heapq
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+
+class Lane(str, Enum):
+    """Полоса приоритета вызова (в порядке убывания приоритета)"""
+
+    INTERACTIVE = "interactive"  # пользователь ждет ответ
+    BACKGROUND = "background"  # пакетный и повторный анализ
+
+
+@dataclass(frozen=True)
+class RequestClass:
+    """Класс запроса для планировщика"""
+
+    lane: Lane = Lane.INTERACTIVE
+    tenant: str = ""
+    weight: float = 1.0
+
+
+DEFAULT_REQUEST = RequestClass()
+
+_current_request: ContextVar[RequestClass] = ContextVar(
+    "ai_agent_request_class", default=DEFAULT_REQUEST
+)
+
+
+def current_request() -> RequestClass:
+    """Класс запроса текущего контекста (по умолчанию interactive)"""
+    return _current_request.get()
+
+
+@contextmanager
+def request_scope(
+    tenant: Any = "", lane: Lane = Lane.INTERACTIVE, weight: float = 1.0
+) -> Iterator[RequestClass]:
+    """
+    Задает класс запроса для вложенных вызовов и задач.
+
+    Args:
+        tenant: Арендатор очереди (ID пациента или задания)
+        lane: Полоса приоритета
+        weight: Вес арендатора внутри полосы (доля слотов под нагрузкой)
+    """
+    if weight <= 0:
+        raise ValueError("weight must be positive")
+    request = RequestClass(lane=Lane(lane), tenant=str(tenant), weight=weight)
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.reset(token)
+
+
+class _LaneQueue:
+    """Очередь одной полосы: SCFQ по арендаторам"""
+
+    def __init__(self) -> None:
+        # (finish, порядковый номер, арендатор, элемент)
+        self.heap: List[Tuple[float, int, str, Any]] = []
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+
+    def push(self, item: Any, tenant: str, weight: float, sequence: int) -> None:
+        start = max(self.virtual_time, self.last_finish.get(tenant, 0.0))
+        finish = self.last_finish[tenant] = start + 1.0 / weight
+        heapq.heappush(self.heap, (finish, sequence, tenant, item))
+
+    def pop(self) -> Any:
+        finish, _, tenant, item = heapq.heappop(self.heap)
+        self.virtual_time = finish
+        if self.last_finish.get(tenant, 0.0) <= finish:
+            # Вызовов арендатора в очереди больше нет
+            del self.last_finish[tenant]
+        return item
+
+    def remove(self, item: Any) -> bool:
+        for index, entry in enumerate(self.heap):
+            if entry[3] is item:
+                break
+        else:
+            return False
+        tenant = entry[2]
+        self.heap[index] = self.heap[-1]
+        self.heap.pop()
+        heapq.heapify(self.heap)
+        if not any(other[2] == tenant for other in self.heap):
+            self.last_finish.pop(tenant, None)
+        return True
+
+
+class FairQueue:
+    """
+    Очередь ожидания слотов: полосы по приоритету, SCFQ внутри полосы.
+    Не потокобезопасна - используется под блокировкой лимитера.
+    """
+
+    def __init__(self) -> None:
+        self._lanes = {lane: _LaneQueue() for lane in Lane}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return sum(len(queue.heap) for queue in self._lanes.values())
+
+    def depth(self, lane: Lane) -> int:
+        """Число ожидающих в полосе"""
+        return len(self._lanes[lane].heap)
+
+    def push(self, item: Any, request: RequestClass) -> None:
+        """Ставит элемент в очередь его полосы"""
+        self._lanes[request.lane].push(
+            item, request.tenant, request.weight, next(self._sequence)
+        )
+
+    def pop(self, eligible: Callable[[Lane], bool] = lambda lane: True) -> Any:
+        """
+        Следующий элемент самой приоритетной непустой полосы из допустимых
+        или None, если таких нет.
+        """
+        for lane in Lane:
+            queue = self._lanes[lane]
+            if queue.heap and eligible(lane):
+                return queue.pop()
+        return None
+
+    def remove(self, item: Any) -> bool:
+        """Убирает элемент из очереди (отмена ожидания)"""
+        return any(queue.remove(item) for queue in self._lanes.values())
+
+    def blocks(self, lane: Lane) -> bool:
+        """Есть ли ожидающие в полосе или полосах выше нее по приоритету"""
+        for other in Lane:
+            if self._lanes[other].heap:
+                return True
+            if other == lane:
+                return False
+        return False
+
+
+def lane_capacity(lane: Lane, limit: int, background_share: float) -> int:
+    """Максимум одновременных вызовов полосы при лимите limit"""
+    if lane == Lane.BACKGROUND:
+        return max(1, int(limit * background_share))
+    return limit
+
@@ -0,0 +1,193 @@
+"""
+Модуль с объединением одновременных одинаковых запросов (single-flight).
+
+Повторная отправка фото (двойной тап, ретрай клиента) не порождает второй
+запрос к провайдеру: вызывающие с тем же ключом ждут один запрос в полете
+и получают его результат. Дополнительно ключ может блокироваться между
+процессами через кэш Django.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    """Запрос в полете и количество ожидающих его вызывающих"""
+
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class CacheLock:
+    """
+    Блокировка ключа между процессами через кэш Django.
+
+    Владелец блокировки выполняет запрос и кладет результат в кэш
+    на result_ttl секунд; остальные процессы опрашивают кэш, пока
+    блокировка жива. Если владелец пропал или кэш недоступен,
+    запрос выполняется локально. Результат должен сериализоваться pickle.
+    """
+
+    prefix = "ai_agent:single_flight"
+
+    def __init__(
+        self,
+        lock_timeout: float = 30.0,
+        result_ttl: float = 10.0,
+        poll_interval: float = 0.1,
+        cache: Any = None,
+    ) -> None:
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._cache = cache
+
+    @property
+    def cache(self) -> Any:
+        if self._cache is None:
+            from django.core.cache import cache
+
+            self._cache = cache
+        return self._cache
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет запрос под блокировкой ключа или ждет результат владельца.
+
+        Args:
+            key: Ключ запроса
+            factory: Фабрика корутины запроса
+        """
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await self.cache.aadd(lock_key, token, self.lock_timeout)
+            if not acquired:
+                result = await self._wait_result(lock_key, result_key)
+                if result is not None:
+                    metrics.inc("ai_agent_single_flight_total", result="remote")
+                    return result
+                acquired = await self.cache.aadd(lock_key, token, self.lock_timeout)
+            elif (result := await self.cache.aget(result_key)) is not None:
+                # Владелец предыдущей блокировки успел положить результат
+                await self._release(lock_key, token)
+                metrics.inc("ai_agent_single_flight_total", result="remote")
+                return result
+        except Exception as e:
+            logger.warning("Кэш недоступен для single-flight: %s", e)
+            return await factory()
+
+        try:
+            result = await factory()
+            if acquired:
+                await self._store(result_key, result)
+            return result
+        finally:
+            if acquired:
+                await self._release(lock_key, token)
+
+    async def _wait_result(self, lock_key: str, result_key: str) -> Optional[Any]:
+        """Ждет результат владельца блокировки, пока она не снята"""
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + self.lock_timeout
+        while loop.time() < expires_at:
+            await asyncio.sleep(self.poll_interval)
+            result = await self.cache.aget(result_key)
+            if result is not None:
+                return result
+            if await self.cache.aget(lock_key) is None:
+                # Владелец завершился с ошибкой или пропал
+                return await self.cache.aget(result_key)
+        return None
+
+    async def _store(self, result_key: str, result: Any) -> None:
+        try:
+            await self.cache.aset(result_key, result, self.result_ttl)
+        except Exception as e:
+            logger.warning("Не удалось сохранить результат single-flight: %s", e)
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            # Блокировка могла истечь и достаться другому процессу
+            if await self.cache.aget(lock_key) == token:
+                await self.cache.adelete(lock_key)
+        except Exception as e:
+            logger.warning("Не удалось снять блокировку single-flight: %s", e)
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом в один.
+
+    Запрос выполняется в отдельной задаче: отмена одного из ожидающих
+    (например, по его дедлайну) не прерывает запрос для остальных.
+    Задача отменяется, только когда ее не ждет ни один вызывающий.
+
+    Метрики: ai_agent_single_flight_total (label result:
+    leader/shared/remote), ai_agent_single_flight_in_flight.
+    """
+
+    def __init__(self, cache_lock: Optional[CacheLock] = None) -> None:
+        self.cache_lock = cache_lock
+        # Задачи привязаны к своему event loop
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет запрос или присоединяется к уже выполняющемуся.
+
+        Args:
+            key: Ключ запроса (например, хэш изображений)
+            factory: Фабрика корутины запроса
+
+        Returns:
+            Общий результат запроса
+
+        Raises:
+            Exception: Ошибка запроса (одинаковая для всех ожидающих)
+        """
+        call_key = (asyncio.get_running_loop(), key)
+        call = self._calls.get(call_key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(self._execute(call_key, factory)))
+            self._calls[call_key] = call
+            metrics.inc("ai_agent_single_flight_total", result="leader")
+        else:
+            metrics.inc("ai_agent_single_flight_total", result="shared")
+        metrics.set_gauge("ai_agent_single_flight_in_flight", len(self._calls))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    async def _execute(
+        self,
+        call_key: Tuple[asyncio.AbstractEventLoop, str],
+        factory: Callable[[], Awaitable[T]],
+    ) -> T:
+        try:
+            if self.cache_lock is not None:
+                return await self.cache_lock.run(call_key[1], factory)
+            return await factory()
+        finally:
+            self._calls.pop(call_key, None)
+            metrics.set_gauge("ai_agent_single_flight_in_flight", len(self._calls))
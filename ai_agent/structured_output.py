@@ -0,0 +1,140 @@
+"""
+Модуль со структурированным выводом блюд через function calling.
+
+Модель вызывает функцию record_dishes с аргументом {"dishes": [...]},
+схема которого строится по DishCreateIn: провайдер возвращает только
+компактный JSON без пояснений. OpenAI проверяет аргументы по схеме
+(strict), DeepSeek и GigaChat - по описанию функции.
+
+Аргументы функции приходят фрагментами так же, как текст ответа, и
+разбираются тем же инкрементальным парсером (json_stream): достаточно
+убрать открывающую скобку обертки, чтобы блюда отдавались по мере
+закрытия их объектов.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+DISHES_FUNCTION_NAME = "record_dishes"
+DISHES_FUNCTION_DESCRIPTION = "Записать блюда, распознанные в приеме пищи"
+
+
+@dataclass(frozen=True)
+class StructuredOutput:
+    """Схема аргументов функции и строгость ее проверки провайдером"""
+
+    schema: Dict[str, Any]
+    strict: bool = False
+
+    def openai_kwargs(self) -> Dict[str, Any]:
+        """Параметры запроса OpenAI-совместимого API (tools + tool_choice)"""
+        function = {
+            "name": DISHES_FUNCTION_NAME,
+            "description": DISHES_FUNCTION_DESCRIPTION,
+            "parameters": self.schema,
+        }
+        if self.strict:
+            function["strict"] = True
+        return {
+            "tools": [{"type": "function", "function": function}],
+            "tool_choice": {
+                "type": "function",
+                "function": {"name": DISHES_FUNCTION_NAME},
+            },
+        }
+
+    def gigachat_payload(self) -> Dict[str, Any]:
+        """Поля запроса GigaChat (functions + function_call)"""
+        return {
+            "functions": [
+                {
+                    "name": DISHES_FUNCTION_NAME,
+                    "description": DISHES_FUNCTION_DESCRIPTION,
+                    "parameters": self.schema,
+                }
+            ],
+            "function_call": {"name": DISHES_FUNCTION_NAME},
+        }
+
+
+def dishes_schema(
+    model: Type[BaseModel], fields: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Строит JSON схему аргументов {"dishes": [...]} по модели блюда.
+
+    Ограничения полей (ge, max_length) не переносятся: strict режим
+    OpenAI поддерживает не все ключевые слова, значения все равно
+    проверяются моделью DishCreateIn при разборе.
+
+    Args:
+        model: Pydantic модель блюда (DishCreateIn)
+        fields: Поля блюда (по умолчанию все поля модели)
+    """
+    source = model.model_json_schema()["properties"]
+    properties = {
+        name: {
+            "type": definition["type"],
+            "description": definition.get("description", name),
+        }
+        for name, definition in source.items()
+        if fields is None or name in fields
+    }
+    return {
+        "type": "object",
+        "properties": {
+            "dishes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(properties),
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["dishes"],
+        "additionalProperties": False,
+    }
+
+
+def tool_call_arguments(chunk: Any) -> str:
+    """Фрагмент аргументов вызова функции из AIMessageChunk langchain"""
+    return "".join(
+        tool_chunk.get("args") or ""
+        for tool_chunk in getattr(chunk, "tool_call_chunks", None) or ()
+    )
+
+
+def gigachat_function_arguments(delta: Any) -> Optional[str]:
+    """
+    Массив блюд из вызова функции в ответе GigaChat.
+    GigaChat присылает аргументы целиком (словарем) в одном фрагменте.
+    """
+    function_call = getattr(delta, "function_call", None)
+    if function_call is None:
+        return None
+    arguments = function_call.arguments or {}
+    if isinstance(arguments, str):
+        arguments = json.loads(arguments)
+    return json.dumps(arguments.get("dishes", []), ensure_ascii=False)
+
+
+class DishesArguments:
+    """
+    Убирает открывающую скобку обертки {"dishes": [...]} из фрагментов
+    аргументов. Остаток ("dishes": [{...}, ...]}) парсер разбирает как
+    обычный массив.
+    """
+
+    def __init__(self) -> None:
+        self._unwrapped = False
+
+    def feed(self, fragment: str) -> str:
+        if not self._unwrapped and "{" in fragment:
+            self._unwrapped = True
+            fragment = fragment.replace("{", "", 1)
+        return fragment
@@ -0,0 +1,207 @@
+"""
+Модуль с телеметрией вызовов LLM.
+
+Каждый вызов провайдера описывается объектом CallTelemetry, доступным
+через contextvar: этапы запроса (загрузка файлов, ответ модели, разбор JSON)
+дописывают в него свои измерения. По завершении вызова измерения попадают
+в гистограммы реестра метрик и в одну структурированную строку лога.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterator, Optional
+
+from .circuit_breaker import ProviderUnavailableError
+from .metrics import (
+    BYTES_BUCKETS,
+    COUNT_BUCKETS,
+    LATENCY_BUCKETS,
+    TOKEN_BUCKETS,
+    metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+_current_call: ContextVar[Optional["CallTelemetry"]] = ContextVar(
+    "ai_agent_call_telemetry", default=None
+)
+
+
+@dataclass
+class CallTelemetry:
+    """Измерения одного вызова провайдера"""
+
+    provider: str
+    model: str = ""
+    images: int = 0
+    bytes_uploaded: int = 0
+    upload_seconds: float = 0.0
+    chat_seconds: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    retry: int = 0
+    parse_result: Optional[str] = None
+    outcome: str = "ok"
+    route: str = ""  # light/standard при маршрутизации по сложности запроса
+
+    def add_upload(self, size: int, seconds: float) -> None:
+        """Учитывает загруженные байты и время загрузки"""
+        self.bytes_uploaded += size
+        self.upload_seconds += seconds
+
+    def set_usage(
+        self, prompt_tokens: Optional[int], completion_tokens: Optional[int]
+    ) -> None:
+        """Сохраняет расход токенов (провайдер присылает итог в конце потока)"""
+        if prompt_tokens is not None:
+            self.prompt_tokens = int(prompt_tokens)
+        if completion_tokens is not None:
+            self.completion_tokens = int(completion_tokens)
+
+    def emit(self) -> None:
+        """Записывает измерения в метрики и лог"""
+        labels = {"provider": self.provider, "model": self.model}
+        metrics.inc("ai_agent_llm_calls_total", outcome=self.outcome, **labels)
+        route_labels = {"provider": self.provider, "route": self.route}
+        if self.route:
+            metrics.inc(
+                "ai_agent_llm_route_calls_total", outcome=self.outcome, **route_labels
+            )
+        logger.info("llm_call", extra={"llm_call": asdict(self)})
+        if self.outcome == "rejected":
+            # Вызов не дошел до провайдера: в гистограммы не попадает
+            return
+        metrics.observe("ai_agent_llm_chat_seconds", self.chat_seconds, **labels)
+        if self.route:
+            metrics.observe(
+                "ai_agent_llm_route_chat_seconds", self.chat_seconds, **route_labels
+            )
+        metrics.observe(
+            "ai_agent_llm_images", self.images, buckets=COUNT_BUCKETS, **labels
+        )
+        metrics.observe(
+            "ai_agent_llm_retries", self.retry, buckets=COUNT_BUCKETS, **labels
+        )
+        if self.bytes_uploaded:
+            metrics.observe(
+                "ai_agent_llm_upload_bytes",
+                self.bytes_uploaded,
+                buckets=BYTES_BUCKETS,
+                **labels,
+            )
+            metrics.observe(
+                "ai_agent_llm_upload_seconds",
+                self.upload_seconds,
+                buckets=LATENCY_BUCKETS,
+                **labels,
+            )
+        for kind, tokens in (
+            ("prompt", self.prompt_tokens),
+            ("completion", self.completion_tokens),
+        ):
+            if tokens is None:
+                continue
+            metrics.inc("ai_agent_llm_tokens_total", tokens, kind=kind, **labels)
+            metrics.observe(
+                "ai_agent_llm_tokens",
+                tokens,
+                buckets=TOKEN_BUCKETS,
+                kind=kind,
+                **labels,
+            )
+
+
+def current_call() -> Optional[CallTelemetry]:
+    """Телеметрия текущего вызова или None"""
+    return _current_call.get()
+
+
+@contextmanager
+def call_telemetry(
+    provider: str,
+    model: str = "",
+    images: int = 0,
+    retry: int = 0,
+    clock: Callable[[], float] = time.monotonic,
+) -> Iterator[CallTelemetry]:
+    """
+    Открывает телеметрию вызова провайдера и делает ее текущей.
+    Время ответа модели - время вызова за вычетом загрузки файлов.
+
+    Метрики: ai_agent_llm_calls_total (label outcome: ok/error/cancelled/
+    rejected), гистограммы ai_agent_llm_chat_seconds, _upload_seconds,
+    _upload_bytes, _images, _retries, _tokens (label kind), счетчик
+    ai_agent_llm_tokens_total; labels provider и model. При маршрутизации
+    по сложности - ai_agent_llm_route_calls_total и гистограмма
+    ai_agent_llm_route_chat_seconds с labels provider и route.
+    """
+    call = CallTelemetry(provider=provider, model=model, images=images, retry=retry)
+    token = _current_call.set(call)
+    started = clock()
+    try:
+        yield call
+    except ProviderUnavailableError:
+        # Breaker разомкнут или очередь лимитера переполнена
+        call.outcome = "rejected"
+        raise
+    except Exception:
+        call.outcome = "error"
+        raise
+    except BaseException:
+        call.outcome = "cancelled"
+        raise
+    finally:
+        call.chat_seconds = max(0.0, clock() - started - call.upload_seconds)
+        try:
+            _current_call.reset(token)
+        except ValueError:
+            # Поток закрыт из другого контекста (например, сборщиком мусора)
+            _current_call.set(None)
+        call.emit()
+
+
+def record_parse(result: str) -> None:
+    """
+    Учитывает результат разбора ответа модели.
+
+    Args:
+        result: ok - валидный JSON, invalid - JSON не найден,
+            fallback - вместо блюд подставлена заглушка
+    """
+    metrics.inc("ai_agent_llm_parse_total", result=result)
+    call = current_call()
+    if call is not None:
+        call.parse_result = result
+
+
+def record_usage(chunk: Any) -> None:
+    """
+    Извлекает расход токенов из фрагмента потока провайдера, если он есть:
+    usage_metadata (langchain) или usage (GigaChat / OpenAI).
+    """
+    call = current_call()
+    if call is None:
+        return
+    usage = getattr(chunk, "usage_metadata", None)
+    if usage:
+        call.set_usage(usage.get("input_tokens"), usage.get("output_tokens"))
+        return
+    usage = getattr(chunk, "usage", None)
+    if usage is not None:
+        call.set_usage(
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+
+def model_name(client: Any) -> str:
+    """Название модели клиента провайдера (пустая строка, если неизвестно)"""
+    for attribute in ("model_name", "model"):
+        value = getattr(client, attribute, None)
+        if isinstance(value, str):
+            return value
+    settings = getattr(client, "_settings", None)
+    return str(getattr(settings, "model", "") or "")
@@ -0,0 +1,102 @@
+import pytest
+
+from ai_agent.circuit_breaker import (
+    BreakerState,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+
+
+class FakeClock:
+    """Управляемые часы для тестов"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Юнит-тесты для CircuitBreaker"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def breaker(self, clock):
+        """Создает breaker с маленьким окном"""
+        return CircuitBreaker(
+            "gigachat",
+            failure_rate=0.5,
+            min_calls=4,
+            window_size=10,
+            slow_call_seconds=5,
+            open_seconds=30,
+            clock=clock,
+        )
+
+    def test_opens_on_error_rate(self, breaker):
+        """Тест размыкания при превышении доли ошибок"""
+        breaker.record_success(1)
+        breaker.record_success(1)
+        breaker.record_failure(1)
+        assert breaker.state == BreakerState.CLOSED
+
+        breaker.record_failure(1)
+
+        assert breaker.state == BreakerState.OPEN
+        assert breaker.allow_request() is False
+
+    def test_slow_calls_count_as_failures(self, breaker):
+        """Тест учета медленных вызовов как ошибок"""
+        for _ in range(4):
+            breaker.record_success(10)
+
+        assert breaker.state == BreakerState.OPEN
+
+    def test_half_open_probe_success_closes(self, breaker, clock):
+        """Тест замыкания после успешного пробного вызова"""
+        for _ in range(4):
+            breaker.record_failure(1)
+        clock.now = 31
+
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False  # только один пробный вызов
+
+        breaker.record_success(1)
+
+        assert breaker.state == BreakerState.CLOSED
+        assert breaker.allow_request() is True
+
+    def test_half_open_probe_failure_reopens(self, breaker, clock):
+        """Тест повторного размыкания после неуспешного пробного вызова"""
+        for _ in range(4):
+            breaker.record_failure(1)
+        clock.now = 31
+        breaker.allow_request()
+
+        breaker.record_failure(1)
+
+        assert breaker.state == BreakerState.OPEN
+
+    def test_release_frees_half_open_slot(self, breaker, clock):
+        """Тест освобождения слота отмененного пробного вызова"""
+        for _ in range(4):
+            breaker.record_failure(1)
+        clock.now = 31
+        breaker.allow_request()
+
+        breaker.release()
+
+        assert breaker.allow_request() is True
+
+    def test_registry_shares_breakers(self):
+        """Тест общего breaker для провайдера"""
+        registry = CircuitBreakerRegistry(lambda: {"min_calls": 1})
+
+        assert registry.get("openai") is registry.get("openai")
+        registry.get("openai").record_failure(1)
+
+        assert registry.snapshot()["openai"]["state"] == "open"
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from ai_agent.circuit_breaker import ProviderUnavailableError
+from ai_agent.concurrency_limiter import (
+    AdaptiveLimiter,
+    LimiterQueueFullError,
+    is_overload_error,
+)
+from ai_agent.metrics import metrics
+
+
+class RateLimitError(Exception):
+    """Ошибка 429 в стиле SDK провайдеров"""
+
+    def __init__(self):
+        super().__init__("Too Many Requests")
+        self.response = type("Response", (), {"status_code": 429})()
+
+
+class TestAdaptiveLimiter:
+    """Юнит-тесты для AIMD лимитера вызовов провайдера"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.fixture
+    def clock(self):
+        """Управляемые часы"""
+
+        class Clock:
+            now = 100.0
+
+            def __call__(self):
+                return self.now
+
+        return Clock()
+
+    @pytest.mark.asyncio
+    async def test_queues_calls_over_limit(self):
+        """Тест ожидания в очереди сверх лимита и пробуждения по FIFO"""
+        limiter = AdaptiveLimiter("fake", initial_limit=1)
+        order = []
+
+        async def call(number):
+            async with limiter.slot():
+                order.append(number)
+                await asyncio.sleep(0.01)
+
+        tasks = [asyncio.ensure_future(call(number)) for number in range(3)]
+        await asyncio.sleep(0.001)
+
+        assert limiter.in_flight == 1
+        assert limiter.queue_depth == 2
+        assert metrics.get("ai_agent_concurrency_queue_depth", provider="fake") == 2
+
+        await asyncio.gather(*tasks)
+
+        assert order == [0, 1, 2]
+        assert limiter.in_flight == 0
+        assert limiter.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_additive_increase(self, clock):
+        """Тест роста лимита при быстрых успешных вызовах под нагрузкой"""
+        limiter = AdaptiveLimiter("fake", initial_limit=2, clock=clock)
+
+        for _ in range(3):
+            slots = limiter.limit
+            for _ in range(slots):
+                await limiter.acquire()
+            for _ in range(slots):
+                limiter.release(clock())
+
+        assert limiter.limit == 3
+        assert metrics.get("ai_agent_concurrency_limit", provider="fake") > 3
+
+    @pytest.mark.asyncio
+    async def test_slow_calls_do_not_increase(self, clock):
+        """Тест отсутствия роста лимита при медленных вызовах"""
+        limiter = AdaptiveLimiter(
+            "fake", initial_limit=2, latency_threshold=1.0, clock=clock
+        )
+
+        for _ in range(4):
+            await limiter.acquire()
+            started = clock()
+            clock.now += 5.0
+            limiter.release(started)
+
+        assert limiter.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_multiplicative_decrease_once_per_wave(self, clock):
+        """Тест уменьшения лимита один раз на волну 429"""
+        limiter = AdaptiveLimiter("fake", initial_limit=8, clock=clock)
+        started = clock()
+        for _ in range(3):
+            await limiter.acquire()
+
+        clock.now += 1.0
+        for _ in range(3):
+            limiter.release(started, error=RateLimitError())
+
+        assert limiter.limit == 4
+        assert (
+            metrics.get(
+                "ai_agent_concurrency_decreases_total", provider="fake", reason="429"
+            )
+            == 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_timeout_decreases_to_min_limit(self, clock):
+        """Тест уменьшения лимита на таймаутах до минимума"""
+        limiter = AdaptiveLimiter("fake", initial_limit=4, min_limit=1, clock=clock)
+
+        for _ in range(5):
+            await limiter.acquire()
+            started = clock()
+            clock.now += 1.0
+            limiter.release(started, error=asyncio.TimeoutError())
+
+        assert limiter.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_other_errors_keep_limit(self, clock):
+        """Тест неизменного лимита при ошибках, не связанных с перегрузкой"""
+        limiter = AdaptiveLimiter("fake", initial_limit=4, clock=clock)
+
+        await limiter.acquire()
+        limiter.release(clock(), error=ValueError("bad request"))
+
+        assert limiter.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_queue_full(self):
+        """Тест отказа при переполненной очереди"""
+        limiter = AdaptiveLimiter("fake", initial_limit=1, max_queue=0)
+        await limiter.acquire()
+
+        with pytest.raises(LimiterQueueFullError) as exc_info:
+            await limiter.acquire()
+
+        assert isinstance(exc_info.value, ProviderUnavailableError)
+        assert metrics.get("ai_agent_concurrency_rejected_total", provider="fake") == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Тест удаления отмененного вызова из очереди"""
+        limiter = AdaptiveLimiter("fake", initial_limit=1)
+        await limiter.acquire()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire(), timeout=0.01)
+
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_releases_slot(self):
+        """Тест освобождения слота отмененного вызова без изменения лимита"""
+        limiter = AdaptiveLimiter("fake", initial_limit=2)
+
+        async def hang():
+            async with limiter.slot():
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(hang())
+        await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert limiter.in_flight == 0
+        assert limiter.limit == 2
+
+    def test_is_overload_error(self):
+        """Тест распознавания 429 и таймаутов"""
+        assert is_overload_error(RateLimitError())
+        assert is_overload_error(asyncio.TimeoutError())
+        assert not is_overload_error(ValueError("bad request"))
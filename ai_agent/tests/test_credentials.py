@@ -0,0 +1,205 @@
+import httpx
+import pytest
+from gigachat.exceptions import RateLimitError as GigaChatRateLimitError
+
+from ai_agent.circuit_breaker import ProviderUnavailableError
+from ai_agent.config import LLMProvider, LLMSettings
+from ai_agent.credentials import (
+    CredentialPool,
+    CredentialPoolRegistry,
+    CredentialsCoolingDownError,
+    retry_after,
+)
+from ai_agent.metrics import metrics
+
+
+class RateLimitError(Exception):
+    """Ошибка 429 в стиле SDK провайдеров"""
+
+    def __init__(self, headers=None):
+        super().__init__("Too Many Requests")
+        self.response = type(
+            "Response", (), {"status_code": 429, "headers": headers or {}}
+        )()
+
+
+class TestCredentialPool:
+    """Юнит-тесты для пула ключей провайдера"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.fixture
+    def clock(self):
+        """Управляемые часы"""
+
+        class Clock:
+            now = 100.0
+
+            def __call__(self):
+                return self.now
+
+        return Clock()
+
+    def test_round_robin_when_idle(self, clock):
+        """Тест: при равной загрузке ключи выдаются по кругу"""
+        pool = CredentialPool("openai", 3, clock=clock)
+        keys = []
+        for _ in range(6):
+            key = pool.acquire()
+            pool.release(key)
+            keys.append(key)
+
+        assert keys == [0, 1, 2, 0, 1, 2]
+
+    def test_least_loaded(self, clock):
+        """Тест выбора наименее загруженного ключа"""
+        pool = CredentialPool("openai", 3, clock=clock)
+        first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+        pool.release(second)
+
+        assert pool.acquire() == second
+        assert pool.acquire() in (first, third)
+        assert (
+            metrics.get(
+                "ai_agent_credential_in_flight", provider="openai", credential="1"
+            )
+            == 1
+        )
+
+    def test_rate_limited_key_cools_down(self, clock):
+        """Тест охлаждения ключа после 429 и возврата после паузы"""
+        pool = CredentialPool("openai", 2, cooldown=10.0, clock=clock)
+        key = pool.acquire()
+        pool.release(key, error=RateLimitError())
+
+        assert [pool.acquire() for _ in range(3)] == [1, 1, 1]
+        assert metrics.get("ai_agent_credentials_available", provider="openai") == 1
+
+        clock.now += 10.0
+        assert pool.acquire() == 0
+        assert (
+            metrics.get(
+                "ai_agent_credential_cooldowns_total", provider="openai", credential="0"
+            )
+            == 1
+        )
+
+    def test_cooldown_doubles_and_resets(self, clock):
+        """Тест удвоения паузы при повторных 429 и сброса после успеха"""
+        pool = CredentialPool(
+            "openai", 1, cooldown=10.0, max_cooldown=15.0, clock=clock
+        )
+        pool.acquire()
+        pool.release(0, error=RateLimitError())
+        clock.now += 10.0
+        pool.acquire()
+        pool.release(0, error=RateLimitError())
+
+        assert pool.snapshot()[0]["cooldown_remaining"] == 15.0
+
+        clock.now += 15.0
+        pool.acquire()
+        pool.release(0)
+        assert pool.snapshot()[0]["strikes"] == 0
+
+    def test_wave_of_rate_limits_counts_once(self, clock):
+        """Тест: 429 одновременных вызовов ключа - одно охлаждение"""
+        pool = CredentialPool("openai", 1, cooldown=10.0, clock=clock)
+        for _ in range(3):
+            pool.acquire()
+        for _ in range(3):
+            pool.release(0, error=RateLimitError())
+
+        assert pool.snapshot()[0]["strikes"] == 1
+        assert pool.snapshot()[0]["cooldown_remaining"] == 10.0
+
+    def test_retry_after(self, clock):
+        """Тест паузы не меньше Retry-After ответа"""
+        pool = CredentialPool("openai", 1, cooldown=10.0, clock=clock)
+        pool.acquire()
+        pool.release(0, error=RateLimitError(headers={"retry-after": "42"}))
+
+        assert pool.snapshot()[0]["cooldown_remaining"] == 42.0
+        assert retry_after(ValueError()) is None
+
+    def test_retry_after_gigachat(self, clock):
+        """Тест Retry-After из ошибки GigaChat: заголовки в самой ошибке"""
+        error = GigaChatRateLimitError(
+            "https://gigachat.test/chat/completions",
+            429,
+            b"Too Many Requests",
+            httpx.Headers({"Retry-After": "42"}),
+        )
+        pool = CredentialPool("gigachat", 1, cooldown=10.0, clock=clock)
+        pool.acquire()
+        pool.release(0, error=error)
+
+        assert retry_after(error) == 42.0
+        assert pool.snapshot()[0]["cooldown_remaining"] == 42.0
+
+    def test_all_keys_cooling_down(self, clock):
+        """Тест: все ключи на охлаждении - провайдер недоступен"""
+        pool = CredentialPool("openai", 2, clock=clock)
+        for key in (pool.acquire(), pool.acquire()):
+            pool.release(key, error=RateLimitError())
+
+        with pytest.raises(CredentialsCoolingDownError) as exc_info:
+            pool.acquire()
+
+        assert isinstance(exc_info.value, ProviderUnavailableError)
+        assert (
+            metrics.get("ai_agent_credentials_exhausted_total", provider="openai") == 1
+        )
+
+    def test_lease(self, clock):
+        """Тест освобождения ключа контекстом при ошибке и отмене"""
+        pool = CredentialPool("openai", 2, clock=clock)
+
+        with pytest.raises(RateLimitError):
+            with pool.lease():
+                raise RateLimitError()
+        with pytest.raises(KeyboardInterrupt):
+            with pool.lease() as key:
+                raise KeyboardInterrupt
+
+        assert key == 1
+        assert [item["in_flight"] for item in pool.snapshot()] == [0, 0]
+        assert pool.snapshot()[1]["strikes"] == 0
+
+    def test_registry_recreates_pool_on_resize(self):
+        """Тест пересоздания пула при изменении числа ключей"""
+        registry = CredentialPoolRegistry(lambda: {"cooldown": 5.0})
+        pool = registry.get("gigachat", 2)
+
+        assert registry.get("gigachat", 2) is pool
+        assert registry.get("gigachat", 3).size == 3
+        assert registry.get("gigachat", 3).cooldown == 5.0
+
+
+class TestProviderCredentials:
+    """Юнит-тесты для ключей провайдеров в настройках"""
+
+    def test_deepseek_has_own_variables(self, monkeypatch):
+        """Тест: ключ и URL DeepSeek не берутся из переменных OpenAI"""
+        monkeypatch.setenv("ACTIVE_LLM_PROVIDER", "openai")
+        monkeypatch.setenv("LLM_PROVIDER_CHAIN", "openai,deepseek")
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-openai")
+        monkeypatch.setenv("OPENAI_BASE_URL", "https://openai.test/v1")
+        monkeypatch.setenv("DEEPSEEK_API_KEY", "sk-deepseek")
+        monkeypatch.setenv("DEEPSEEK_API_KEYS", "sk-deepseek,sk-deepseek-2")
+
+        settings = LLMSettings(_env_file=None)
+
+        assert settings.get_credentials(LLMProvider.OPENAI) == ["sk-openai"]
+        assert settings.get_credentials(LLMProvider.DEEPSEEK) == [
+            "sk-deepseek",
+            "sk-deepseek-2",
+        ]
+        deepseek = settings.get_provider_config(LLMProvider.DEEPSEEK)
+        assert deepseek["base_url"] == "https://api.deepseek.com"
+        assert deepseek["model"] == "deepseek-chat"
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from ai_agent.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    check_deadline,
+    run_stage,
+)
+from ai_agent.metrics import metrics
+
+
+class TestDeadline:
+    """Юнит-тесты для дедлайна запроса"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.fixture
+    def clock(self):
+        """Управляемые часы"""
+
+        class Clock:
+            now = 100.0
+
+            def __call__(self):
+                return self.now
+
+        return Clock()
+
+    def test_remaining_and_reserve(self, clock):
+        """Тест остатка бюджета и резерва на последующие этапы"""
+        deadline = Deadline(10.0, clock=clock)
+        analysis = deadline.reserve(2.0)
+
+        clock.now += 3.0
+
+        assert deadline.remaining() == 7.0
+        assert analysis.remaining() == 5.0
+        assert analysis.budget(0.5) == 2.5
+
+    def test_check_raises_with_stage(self, clock):
+        """Тест ошибки при исчерпании бюджета"""
+        deadline = Deadline(1.0, clock=clock)
+        clock.now += 1.0
+
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            deadline.check("db")
+
+        assert exc_info.value.stage == "db"
+        assert isinstance(exc_info.value, TimeoutError)
+        assert metrics.get("ai_agent_deadline_exceeded_total", stage="db") == 1
+
+    @pytest.mark.asyncio
+    async def test_run_cancels_slow_stage(self):
+        """Тест отмены этапа, не уложившегося в долю бюджета"""
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        deadline = Deadline(1.0)
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await deadline.run(slow(), stage="upload", share=0.05)
+
+        assert exc_info.value.stage == "upload"
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_nested_stage_keeps_its_name(self):
+        """Тест сохранения имени вложенного этапа"""
+        deadline = Deadline(1.0)
+
+        async def outer():
+            with deadline.scope():
+                await run_stage(asyncio.sleep(10), "upload", share=0.05)
+
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await deadline.run(outer(), stage="chat")
+
+        assert exc_info.value.stage == "upload"
+
+    @pytest.mark.asyncio
+    async def test_iterate_closes_stream(self):
+        """Тест закрытия потока после исчерпания бюджета"""
+        closed = asyncio.Event()
+
+        async def stream():
+            try:
+                yield 1
+                await asyncio.sleep(10)
+                yield 2
+            finally:
+                closed.set()
+
+        items = []
+        with pytest.raises(DeadlineExceeded):
+            async for item in Deadline(0.05).iterate(stream(), stage="chat"):
+                items.append(item)
+
+        assert items == [1]
+        assert closed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_without_deadline(self):
+        """Тест этапов без дедлайна в контексте"""
+        check_deadline("preprocess")
+
+        assert await run_stage(asyncio.sleep(0, result="ok"), "upload") == "ok"
+
+    @pytest.mark.asyncio
+    async def test_scope_propagates_to_tasks(self):
+        """Тест передачи дедлайна в дочерние задачи"""
+        deadline = Deadline(5.0)
+
+        with deadline.scope():
+            task_deadline = await asyncio.ensure_future(self.current_deadline())
+
+        assert task_deadline is deadline
+        assert Deadline.current() is None
+
+    @staticmethod
+    async def current_deadline():
+        return Deadline.current()
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from ai_agent.fake_provider import (
+    DEFAULT_DISHES,
+    CassetteStore,
+    FakeLLM,
+    FakeProviderError,
+)
+from ai_agent.images import images_digest
+
+
+class TestFakeLLM:
+    """Юнит-тесты для фейкового провайдера"""
+
+    @pytest.fixture
+    def images(self):
+        """Возвращает тестовые изображения"""
+        return [b"fake_image_bytes_12345"]
+
+    @pytest.mark.asyncio
+    async def test_deterministic_response(self, images):
+        """Тест одинакового ответа для одних и тех же изображений"""
+        first = await FakeLLM(latency_mean=0).ainvoke(images)
+        second = await FakeLLM(latency_mean=0).ainvoke(images)
+
+        dishes = json.loads(first)
+        assert first == second
+        assert 1 <= len(dishes) <= 3
+        assert all(dish in DEFAULT_DISHES for dish in dishes)
+
+    @pytest.mark.asyncio
+    async def test_streams_in_chunks(self, images):
+        """Тест выдачи ответа фрагментами"""
+        client = FakeLLM(latency_mean=0, chunk_size=8)
+
+        chunks = [chunk async for chunk in client.astream(images)]
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 8 for chunk in chunks)
+
+    @pytest.mark.asyncio
+    async def test_replays_cassette(self, tmp_path, images):
+        """Тест воспроизведения записанного ответа"""
+        CassetteStore(str(tmp_path)).save(
+            images_digest(images),
+            '[{"name": "Борщ"}]',
+            provider="gigachat",
+            latency=1.2,
+        )
+        client = FakeLLM(latency_mean=0, cassette_dir=str(tmp_path))
+
+        assert await client.ainvoke(images) == '[{"name": "Борщ"}]'
+
+    @pytest.mark.asyncio
+    async def test_failure_rate(self, images):
+        """Тест имитации ошибок"""
+        client = FakeLLM(latency_mean=0, failure_rate=1.0)
+
+        with pytest.raises(FakeProviderError):
+            await client.ainvoke(images)
+
+    def test_latency_distributions_are_seeded(self):
+        """Тест воспроизводимости задержек при одинаковом seed"""
+        for distribution in ["constant", "uniform", "normal", "lognormal"]:
+            first = FakeLLM(distribution, latency_mean=1.0, latency_stddev=0.5, seed=7)
+            second = FakeLLM(distribution, latency_mean=1.0, latency_stddev=0.5, seed=7)
+
+            samples = [first.sample_latency() for _ in range(50)]
+            assert samples == [second.sample_latency() for _ in range(50)]
+            assert all(sample >= 0 for sample in samples)
+
+    def test_images_digest(self):
+        """Тест дайджеста набора изображений"""
+        assert images_digest([b"a", b"b"]) == images_digest([b"a", b"b"])
+        assert images_digest([b"ab"]) != images_digest([b"a", b"b"])
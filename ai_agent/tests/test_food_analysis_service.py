@@ -1,32 +1,81 @@
+import asyncio
 import pytest
 import json
 import base64
-from unittest.mock import AsyncMock, MagicMock, patch, call
+from unittest.mock import MagicMock, patch
 
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_openai import ChatOpenAI
 
 from ai_agent import FoodAnalysisService
+from ai_agent.client import LLMClient
+from ai_agent.config import MultiImageMode, get_llm_settings
 from apps.food_diary.schemas import DishCreateIn
 
 
+def dish_json(name: str) -> str:
+    """JSON ответа модели с одним блюдом"""
+    return json.dumps(
+        [
+            {
+                "name": name,
+                "weight": 100,
+                "calories": 200,
+                "protein": 10,
+                "fat": 5,
+                "carbohydrates": 20,
+            }
+        ]
+    )
+
+
+def image_of(message: HumanMessage) -> bytes:
+    """Байты первого изображения из сообщения ChatOpenAI"""
+    url = message.content[1]["image_url"]["url"]
+    return base64.b64decode(url.split(",", 1)[1])
+
+
+def stream_client(response="") -> MagicMock:
+    """
+    Мок ChatOpenAI, стримящий ответ фрагментами.
+    Ответ - client.response: строка или async функция (message) -> str,
+    исключение из которой - ошибка провайдера
+    """
+
+    async def astream(messages, **kwargs):
+        response = client.response
+        if callable(response):
+            response = await response(messages[0])
+        for start in range(0, len(response), 16):
+            yield AIMessageChunk(content=response[start : start + 16])
+
+    client = MagicMock(spec=ChatOpenAI)
+    client.model_name = "gpt-test"
+    client.astream = MagicMock(side_effect=astream)
+    client.response = response
+    return client
+
+
 class TestFoodAnalysisService:
     """Юнит-тесты для FoodAnalysisService"""
 
+    @pytest.fixture(autouse=True)
+    def settings(self, monkeypatch):
+        """Ошибка провайдера не повторяется: тесты не ждут пауз между попытками"""
+        monkeypatch.setenv("DEFAULT_MAX_RETRIES", "0")
+        get_llm_settings.cache_clear()
+        yield
+        get_llm_settings.cache_clear()
+
     @pytest.fixture
     def mock_llm_client(self):
         """Создает мок LLM клиента"""
-        mock_client = AsyncMock()
-        mock_client.ainvoke.return_value = MagicMock(content="")
-        return mock_client
+        return stream_client()
 
     @pytest.fixture
     def service(self, mock_llm_client):
         """Создает сервис с замоканным клиентом"""
-        with patch("ai_agent.client.LLMClient") as MockLLMClient:
-            MockLLMClient.create_client.return_value = mock_llm_client
-            service = FoodAnalysisService()
-            service._client = mock_llm_client  # явно подменяем клиента
-            return service
+        return FoodAnalysisService(llm_client=mock_llm_client)
 
     @pytest.fixture
     def sample_image_bytes(self):
@@ -128,17 +177,18 @@ class TestFoodAnalysisService:
         service = FoodAnalysisService(llm_client=mock_client)
 
         assert service._client == mock_client
+        assert service._providers == [(None, mock_client)]
 
     def test_init_without_client(self):
-        """Тест инициализации без клиента (создается автоматически)"""
+        """Тест инициализации без клиента (клиенты берутся из реестра при вызове)"""
         with patch("ai_agent.client.LLMClient.create_client") as mock_create:
-            mock_client = MagicMock()
-            mock_create.return_value = mock_client
-
             service = FoodAnalysisService()
 
-            mock_create.assert_called_once()
-            assert service._client == mock_client
+            mock_create.assert_not_called()
+            assert service._client is None
+            assert service._providers == [
+                (provider, None) for provider in LLMClient.provider_chain()
+            ]
 
     # MARK: - Тесты analyze_food_image
 
@@ -147,9 +197,9 @@ class TestFoodAnalysisService:
         self, service, mock_llm_client, sample_image_bytes, valid_json_response
     ):
         """Тест успешного анализа изображения (байты)"""
-        mock_llm_client.ainvoke.return_value.content = valid_json_response
+        mock_llm_client.response = valid_json_response
 
-        result = await service.analyze_food_image(sample_image_bytes)
+        result = await service.analyze_food_image([sample_image_bytes])
 
         assert len(result) == 2
         assert isinstance(result[0], DishCreateIn)
@@ -164,8 +214,8 @@ class TestFoodAnalysisService:
         assert result[1].calories == 105
 
         # Проверяем вызов клиента
-        mock_llm_client.ainvoke.assert_called_once()
-        args = mock_llm_client.ainvoke.call_args[0][0]
+        mock_llm_client.astream.assert_called_once()
+        args = mock_llm_client.astream.call_args[0][0]
         assert len(args) == 1
         assert isinstance(args[0], HumanMessage)
 
@@ -174,24 +224,26 @@ class TestFoodAnalysisService:
         self, service, mock_llm_client, sample_image_url, valid_json_response
     ):
         """Тест успешного анализа изображения (URL)"""
-        mock_llm_client.ainvoke.return_value.content = valid_json_response
+        mock_llm_client.response = valid_json_response
 
-        result = await service.analyze_food_image(sample_image_url)
+        result = await service.analyze_food_image([sample_image_url])
 
         assert len(result) == 2
         assert result[0].name == "Овсянка с ягодами"
 
         # Проверяем что URL использовался напрямую, а не base64
-        mock_llm_client.ainvoke.assert_called_once()
+        mock_llm_client.astream.assert_called_once()
+        message = mock_llm_client.astream.call_args[0][0][0]
+        assert message.content[1]["image_url"]["url"] == sample_image_url
 
     @pytest.mark.asyncio
     async def test_analyze_food_image_single_dish(
         self, service, mock_llm_client, sample_image_bytes, single_dish_json_response
     ):
         """Тест анализа изображения с одним блюдом"""
-        mock_llm_client.ainvoke.return_value.content = single_dish_json_response
+        mock_llm_client.response = single_dish_json_response
 
-        result = await service.analyze_food_image(sample_image_bytes)
+        result = await service.analyze_food_image([sample_image_bytes])
 
         assert len(result) == 1
         assert result[0].name == "Яблоко"
@@ -203,9 +255,9 @@ class TestFoodAnalysisService:
         self, service, mock_llm_client, sample_image_bytes
     ):
         """Тест обработки пустого ответа от LLM"""
-        mock_llm_client.ainvoke.return_value.content = json.dumps([])
+        mock_llm_client.response = json.dumps([])
 
-        result = await service.analyze_food_image(sample_image_bytes)
+        result = await service.analyze_food_image([sample_image_bytes])
 
         assert len(result) == 0
 
@@ -214,9 +266,9 @@ class TestFoodAnalysisService:
         self, service, mock_llm_client, sample_image_bytes, invalid_json_response
     ):
         """Тест обработки невалидного JSON"""
-        mock_llm_client.ainvoke.return_value.content = invalid_json_response
+        mock_llm_client.response = invalid_json_response
 
-        result = await service.analyze_food_image(sample_image_bytes)
+        result = await service.analyze_food_image([sample_image_bytes])
 
         assert len(result) == 1
         assert result[0].name == "Не удалось распознать"
@@ -231,40 +283,80 @@ class TestFoodAnalysisService:
         self, service, mock_llm_client, sample_image_bytes
     ):
         """Тест обработки ошибки от API"""
-        mock_llm_client.ainvoke.side_effect = Exception("Connection error")
+
+        async def fail(message):
+            raise Exception("Connection error")
+
+        mock_llm_client.response = fail
 
         with pytest.raises(Exception) as exc_info:
-            await service.analyze_food_image(sample_image_bytes)
+            await service.analyze_food_image([sample_image_bytes])
 
         assert "Connection error" in str(exc_info.value)
 
-    # MARK: - Тесты _ainvoke_for_chat_open_ai_with_images
+    @pytest.mark.asyncio
+    async def test_analyze_food_image_hedged_invalid_json(
+        self, mock_llm_client, sample_image_bytes, invalid_json_response
+    ):
+        """Тест: при хеджировании невалидный JSON обоих провайдеров - заглушка"""
+        mock_llm_client.response = invalid_json_response
+        hedge_client = stream_client(invalid_json_response)
+        service = FoodAnalysisService(
+            llm_client=mock_llm_client, hedge_client=hedge_client
+        )
+
+        result = await service.analyze_food_image([sample_image_bytes])
+
+        assert len(result) == 1
+        assert result[0].name == "Не удалось распознать"
+        assert result[0].calories == 0
+        mock_llm_client.astream.assert_called_once()
+        hedge_client.astream.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_analyze_food_image_hedged_invalid_json_primary(
+        self,
+        mock_llm_client,
+        sample_image_bytes,
+        invalid_json_response,
+        single_dish_json_response,
+    ):
+        """Тест: невалидный JSON основного провайдера - ответ хеджированного"""
+        mock_llm_client.response = invalid_json_response
+        service = FoodAnalysisService(
+            llm_client=mock_llm_client,
+            hedge_client=stream_client(single_dish_json_response),
+        )
+
+        result = await service.analyze_food_image([sample_image_bytes])
+
+        assert [dish.name for dish in result] == ["Яблоко"]
+
+    # MARK: - Тесты _ainvoke
 
     @pytest.mark.asyncio
     async def test_ainvoke_with_images_bytes(
         self, service, mock_llm_client, sample_image_bytes, valid_json_response
     ):
         """Тест отправки изображений (байты)"""
-        mock_llm_client.ainvoke.return_value.content = valid_json_response
+        mock_llm_client.response = valid_json_response
 
-        result = await service._ainvoke_for_chat_open_ai_with_images(
-            [sample_image_bytes]
-        )
+        result = await service._ainvoke([sample_image_bytes])
 
         assert result == valid_json_response
-        mock_llm_client.ainvoke.assert_called_once()
+        mock_llm_client.astream.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_ainvoke_with_images_url(
         self, service, mock_llm_client, sample_image_url, valid_json_response
     ):
         """Тест отправки изображений (URL)"""
-        mock_llm_client.ainvoke.return_value.content = valid_json_response
+        mock_llm_client.response = valid_json_response
 
-        result = await service._ainvoke_for_chat_open_ai_with_images([sample_image_url])
+        result = await service._ainvoke([sample_image_url])
 
         assert result == valid_json_response
-        mock_llm_client.ainvoke.assert_called_once()
+        mock_llm_client.astream.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_ainvoke_with_multiple_images(
@@ -276,14 +368,12 @@ class TestFoodAnalysisService:
         valid_json_response,
     ):
         """Тест отправки нескольких изображений"""
-        mock_llm_client.ainvoke.return_value.content = valid_json_response
+        mock_llm_client.response = valid_json_response
 
-        result = await service._ainvoke_for_chat_open_ai_with_images(
-            [sample_image_bytes, sample_image_url]
-        )
+        result = await service._ainvoke([sample_image_bytes, sample_image_url])
 
         assert result == valid_json_response
-        mock_llm_client.ainvoke.assert_called_once()
+        mock_llm_client.astream.assert_called_once()
 
     # MARK: - Тесты _content_for_openai_deepseek
 
@@ -337,94 +427,102 @@ class TestFoodAnalysisService:
 
     # MARK: - Тесты analyze_multiple_food_images
 
+    @pytest.fixture
+    def images(self):
+        """Разные изображения: одинаковые объединил бы single-flight"""
+        return [f"image_{number}".encode() for number in range(1, 6)]
+
     @pytest.mark.asyncio
-    async def test_analyze_multiple_food_images_success(
-        self, service, mock_llm_client, sample_image_bytes
-    ):
+    async def test_analyze_multiple_food_images_success(self, service, mock_llm_client):
         """Тест успешного анализа нескольких изображений"""
-        responses = [
-            json.dumps(
-                [
-                    {
-                        "name": "Блюдо1",
-                        "weight": 100,
-                        "calories": 200,
-                        "protein": 10,
-                        "fat": 5,
-                        "carbohydrates": 20,
-                    }
-                ]
-            ),
-            json.dumps(
-                [
-                    {
-                        "name": "Блюдо2",
-                        "weight": 150,
-                        "calories": 300,
-                        "protein": 15,
-                        "fat": 8,
-                        "carbohydrates": 30,
-                    }
-                ]
-            ),
-        ]
 
-        # Настраиваем мок для последовательных вызовов
-        mock_llm_client.ainvoke.side_effect = [
-            MagicMock(content=responses[0]),
-            MagicMock(content=responses[1]),
-        ]
+        async def respond(message):
+            return dish_json(f"Блюдо из {image_of(message).decode()}")
+
+        mock_llm_client.response = respond
 
-        images = [sample_image_bytes, sample_image_bytes]
+        images = [b"image_1", b"image_2"]
         results = await service.analyze_multiple_food_images(images)
 
         assert len(results) == 2
-        assert results[0].name == "Блюдо1"
-        assert results[1].name == "Блюдо2"
-        assert mock_llm_client.ainvoke.call_count == 2
+        assert results[0].name == "Блюдо из image_1"
+        assert results[1].name == "Блюдо из image_2"
+        assert mock_llm_client.astream.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_analyze_multiple_food_images_keeps_order(
+        self, service, mock_llm_client, images
+    ):
+        """Тест: порядок результатов - порядок изображений, а не ответов"""
+
+        async def respond(message):
+            image = image_of(message)
+            # Последнее изображение отвечает первым
+            await asyncio.sleep(0.01 * (len(images) - images.index(image)))
+            return dish_json(image.decode())
+
+        mock_llm_client.response = respond
+
+        results = await service.analyze_multiple_food_images(
+            images, concurrency=len(images)
+        )
+
+        assert [dish.name for dish in results] == [image.decode() for image in images]
 
     @pytest.mark.asyncio
     async def test_analyze_multiple_food_images_partial_failure(
-        self, service, mock_llm_client, sample_image_bytes
+        self, service, mock_llm_client, images
     ):
         """Тест анализа нескольких изображений с частичными ошибками"""
-        # Первый вызов успешен, второй - ошибка
-        mock_llm_client.ainvoke.side_effect = [
-            MagicMock(
-                content=json.dumps(
-                    [
-                        {
-                            "name": "Блюдо1",
-                            "weight": 100,
-                            "calories": 200,
-                            "protein": 10,
-                            "fat": 5,
-                            "carbohydrates": 20,
-                        }
-                    ]
-                )
-            ),
-            Exception("API error"),
-        ]
 
-        images = [sample_image_bytes, sample_image_bytes]
-        results = await service.analyze_multiple_food_images(images)
+        async def respond(message):
+            image = image_of(message)
+            if image == images[1]:
+                raise Exception("API error")
+            return dish_json(image.decode())
 
-        assert len(results) == 2
-        assert results[0].name == "Блюдо1"
-        assert results[1].name == "Ошибка анализа 2"
+        mock_llm_client.response = respond
+
+        results = await service.analyze_multiple_food_images(images[:3])
+
+        assert [dish.name for dish in results] == [
+            "image_1",
+            "Ошибка анализа 2",
+            "image_3",
+        ]
         assert results[1].weight == 0
         assert results[1].calories == 0
 
+    @pytest.mark.asyncio
+    async def test_analyze_multiple_food_images_invalid_json_isolated(
+        self, service, mock_llm_client, images
+    ):
+        """Тест: невалидный JSON одной группы не влияет на остальные"""
+
+        async def respond(message):
+            image = image_of(message)
+            if image == images[0]:
+                return "Это просто текст, а не JSON"
+            return dish_json(image.decode())
+
+        mock_llm_client.response = respond
+
+        results = await service.analyze_multiple_food_images(images[:2])
+
+        assert [dish.name for dish in results] == ["Не удалось распознать", "image_2"]
+
     @pytest.mark.asyncio
     async def test_analyze_multiple_food_images_all_fail(
-        self, service, mock_llm_client, sample_image_bytes
+        self, service, mock_llm_client, images
     ):
         """Тест анализа нескольких изображений с полным провалом"""
-        mock_llm_client.ainvoke.side_effect = Exception("API error")
 
-        images = [sample_image_bytes, sample_image_bytes]
-        results = await service.analyze_multiple_food_images(images)
+        async def fail(message):
+            raise Exception("API error")
+
+        mock_llm_client.response = fail
+
+        results = await service.analyze_multiple_food_images(images[:2])
 
         assert len(results) == 2
         assert results[0].name == "Ошибка анализа 1"
@@ -432,6 +530,46 @@ class TestFoodAnalysisService:
         assert results[0].weight == 0
         assert results[1].calories == 0
 
+    @pytest.mark.asyncio
+    async def test_analyze_multiple_food_images_concurrency_bound(
+        self, service, mock_llm_client, images
+    ):
+        """Тест: одновременно выполняется не больше concurrency запросов"""
+        in_flight = 0
+        peak = 0
+
+        async def respond(message):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return dish_json(image_of(message).decode())
+
+        mock_llm_client.response = respond
+
+        results = await service.analyze_multiple_food_images(images, concurrency=2)
+
+        assert len(results) == len(images)
+        assert mock_llm_client.astream.call_count == len(images)
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_analyze_multiple_food_images_single_request(
+        self, service, mock_llm_client, images
+    ):
+        """Тест: в режиме single_request все изображения уходят одним запросом"""
+        mock_llm_client.response = dish_json("Обед")
+
+        results = await service.analyze_multiple_food_images(
+            images, mode=MultiImageMode.SINGLE_REQUEST
+        )
+
+        assert [dish.name for dish in results] == ["Обед"]
+        mock_llm_client.astream.assert_called_once()
+        message = mock_llm_client.astream.call_args[0][0][0]
+        assert len(message.content) == len(images) + 1
+
     @pytest.mark.asyncio
     async def test_analyze_multiple_food_images_empty_list(self, service):
         """Тест анализа пустого списка изображений"""
@@ -492,9 +630,9 @@ class TestFoodAnalysisService:
         self, service, mock_llm_client, sample_image_bytes, json_with_extra_text
     ):
         """Тест полного потока анализа"""
-        mock_llm_client.ainvoke.return_value.content = json_with_extra_text
+        mock_llm_client.response = json_with_extra_text
 
-        result = await service.analyze_food_image(sample_image_bytes)
+        result = await service.analyze_food_image([sample_image_bytes])
 
         assert len(result) == 1
         assert result[0].name == "Омлет"
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from ai_agent.gigachat_files import GigaChatFileCache
+from ai_agent.metrics import metrics
+
+
+class FakeClock:
+    """Ручные часы для управления сроком записей"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeGigaChat:
+    """Клиент GigaChat, запоминающий удаленные файлы"""
+
+    def __init__(self, failing=()) -> None:
+        self.deleted = []
+        self.batches = []
+        self.failing = set(failing)
+        self._in_flight = 0
+
+    async def adelete_file(self, file_id):
+        self._in_flight += 1
+        if self._in_flight == 1:
+            self.batches.append(0)
+        self.batches[-1] += 1
+        await asyncio.sleep(0)
+        self._in_flight -= 1
+        if file_id in self.failing:
+            raise ConnectionError("delete failed")
+        self.deleted.append(file_id)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestGigaChatFileCache:
+    """Юнит-тесты для кэша файлов GigaChat"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_hit_until_ttl(self, clock):
+        """Тест повторного использования ID до истечения срока"""
+        cache = GigaChatFileCache(ttl=10.0, clock=clock)
+        cache.put("digest", "file-1")
+
+        clock.now = 9.0
+        assert cache.get("digest") == "file-1"
+        clock.now = 10.0
+        assert cache.get("digest") is None
+
+        assert metrics.get("ai_agent_gigachat_files_total", result="hit") == 1
+        assert metrics.get("ai_agent_gigachat_files_total", result="miss") == 1
+
+    def test_expired_files_deleted_after_grace(self, clock):
+        """Тест: истекший файл удаляется только после delete_grace"""
+        cache = GigaChatFileCache(ttl=10.0, delete_grace=5.0, clock=clock)
+        cache.put("digest", "file-1")
+
+        clock.now = 12.0
+        assert cache.pop_expired() == []
+        clock.now = 15.0
+        assert cache.pop_expired() == ["file-1"]
+        assert cache.pop_expired() == []
+
+    def test_eviction_over_max_entries(self, clock):
+        """Тест вытеснения самой старой записи сверх лимита"""
+        cache = GigaChatFileCache(ttl=10.0, max_entries=2, delete_grace=0, clock=clock)
+        for number in range(3):
+            cache.put(f"digest-{number}", f"file-{number}")
+
+        assert cache.get("digest-0") is None
+        assert cache.get("digest-2") == "file-2"
+        assert metrics.get("ai_agent_gigachat_files_cached") == 2
+
+        clock.now = 10.0
+        assert cache.pop_expired(limit=1) == ["file-0"]
+
+    @pytest.mark.asyncio
+    async def test_sweep_deletes_in_batches(self, clock):
+        """Тест удаления истекших файлов пачками с учетом ошибок"""
+        cache = GigaChatFileCache(ttl=1.0, sweep_batch=2, delete_grace=0, clock=clock)
+        for number in range(5):
+            cache.put(f"digest-{number}", f"file-{number}")
+        client = FakeGigaChat(failing={"file-4"})
+
+        clock.now = 1.0
+        deleted = await cache.sweep(client)
+
+        assert deleted == 4
+        assert client.batches == [2, 2, 1]
+        assert sorted(client.deleted) == [f"file-{number}" for number in range(4)]
+        assert metrics.get("ai_agent_gigachat_files_deleted_total", result="ok") == 4
+        assert (
+            metrics.get("ai_agent_gigachat_files_deleted_total", result="error") == 1
+        )
+        assert await cache.sweep(client) == 0
+
+    @pytest.mark.asyncio
+    async def test_background_sweeper(self, clock):
+        """Тест фонового удаления: одна задача на event loop"""
+        cache = GigaChatFileCache(
+            ttl=1.0, sweep_interval=0.01, delete_grace=0, clock=clock
+        )
+        client = FakeGigaChat()
+        cache.put("digest", "file-1")
+        clock.now = 1.0
+
+        cache.ensure_sweeper(client)
+        cache.ensure_sweeper(client)
+        await asyncio.sleep(0.05)
+
+        assert client.deleted == ["file-1"]
+        assert len(cache._sweepers) == 1
+        cache.clear()
+        await asyncio.sleep(0)
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from ai_agent.hedging import PRIMARY, SECONDARY, LatencyTracker, RequestHedger
+from ai_agent.metrics import metrics
+
+
+class TestRequestHedger:
+    """Юнит-тесты для хеджирования запросов"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.fixture
+    def hedger(self):
+        """Создает хеджер с короткой задержкой"""
+        return RequestHedger(delay_percentile=95, initial_delay=0.05)
+
+    @staticmethod
+    def delayed(result, delay, error=None):
+        """Фабрика корутины с задержкой"""
+
+        async def _call():
+            await asyncio.sleep(delay)
+            if error:
+                raise error
+            return result
+
+        return _call
+
+    def test_latency_tracker_percentile(self):
+        """Тест расчета перцентиля"""
+        tracker = LatencyTracker()
+        for value in range(1, 101):
+            tracker.observe(value)
+
+        assert tracker.percentile(95) == 95
+        assert tracker.percentile(50) == 50
+
+    def test_current_delay_uses_percentile(self):
+        """Тест использования перцентиля после накопления замеров"""
+        hedger = RequestHedger(
+            delay_percentile=90, initial_delay=10, min_delay=0.5, min_samples=10
+        )
+        assert hedger.current_delay() == 10
+
+        for value in range(10):
+            hedger.tracker.observe(value / 10)
+
+        assert hedger.current_delay() == 0.8
+
+    @pytest.mark.asyncio
+    async def test_primary_fast_no_hedge(self, hedger):
+        """Тест быстрого ответа основного провайдера"""
+        result, winner = await hedger.run(
+            self.delayed("primary", 0), self.delayed("secondary", 0)
+        )
+
+        assert (result, winner) == ("primary", PRIMARY)
+        assert metrics.get("ai_agent_hedge_fired_total") == 0
+        assert metrics.get("ai_agent_hedge_rate") == 0
+
+    @pytest.mark.asyncio
+    async def test_secondary_wins_and_primary_cancelled(self, hedger):
+        """Тест победы хеджа и отмены основного запроса"""
+        cancelled = asyncio.Event()
+
+        async def slow_primary():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        result, winner = await hedger.run(slow_primary, self.delayed("secondary", 0))
+        await asyncio.sleep(0)
+
+        assert (result, winner) == ("secondary", SECONDARY)
+        assert cancelled.is_set()
+        assert metrics.get("ai_agent_hedge_win_rate") == 1.0
+
+    @pytest.mark.asyncio
+    async def test_primary_error_fires_hedge_immediately(self, hedger):
+        """Тест запуска хеджа при ошибке основного провайдера"""
+        result, winner = await hedger.run(
+            self.delayed(None, 0, ValueError("invalid json")),
+            self.delayed("secondary", 0),
+        )
+
+        assert winner == SECONDARY
+
+    @pytest.mark.asyncio
+    async def test_both_fail(self, hedger):
+        """Тест ошибки обеих попыток (пробрасывается последняя ошибка)"""
+        with pytest.raises(ValueError):
+            await hedger.run(
+                self.delayed(None, 0.1, ValueError("primary")),
+                self.delayed(None, 0, ConnectionError("secondary")),
+            )
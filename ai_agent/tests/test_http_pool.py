@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_agent.client import _gigachat_factory
+from ai_agent.config import LLMProvider
+from ai_agent.http_pool import HTTPPoolRegistry
+from ai_agent.metrics import metrics
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Заглушка провайдера с поддержкой keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPPoolRegistry:
+    """Юнит-тесты для пулов HTTP соединений"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.fixture
+    def server_url(self):
+        """Запускает локальный HTTP сервер"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    @pytest.fixture
+    def registry(self):
+        registry = HTTPPoolRegistry(
+            lambda: {"max_connections": 5, "max_keepalive_connections": 5}
+        )
+        yield registry
+        registry.close()
+
+    def test_sync_client_is_shared(self, registry):
+        """Тест: один синхронный клиент на провайдера"""
+        assert registry.sync_client("gigachat") is registry.sync_client("gigachat")
+        assert registry.sync_client("gigachat") is not registry.sync_client("openai")
+
+    def test_sync_connection_reuse(self, registry, server_url):
+        """Тест переиспользования соединения синхронным клиентом"""
+        client = registry.sync_client("stub")
+        for _ in range(3):
+            client.get(server_url)
+
+        assert metrics.get("ai_agent_http_requests_total", pool="stub") == 3
+        assert metrics.get("ai_agent_http_connections_total", pool="stub") == 1
+        assert metrics.get(
+            "ai_agent_http_connection_reuse_ratio", pool="stub"
+        ) == pytest.approx(2 / 3)
+
+    def test_async_client_per_loop(self, registry, server_url):
+        """Тест: асинхронный клиент переиспользуется в рамках event loop"""
+        loop = asyncio.new_event_loop()
+
+        async def request_twice():
+            first = registry.async_client("stub")
+            await first.get(server_url)
+            second = registry.async_client("stub")
+            await second.get(server_url)
+            return first, second
+
+        try:
+            first, second = loop.run_until_complete(request_twice())
+            other = registry.async_client("stub", loop=asyncio.new_event_loop())
+        finally:
+            loop.run_until_complete(registry.aclose())
+            loop.close()
+
+        assert first is second
+        assert other is not first
+        assert metrics.get("ai_agent_http_connections_total", pool="stub") == 1
+
+
+class TestGigaChatPooledClients:
+    """Тесты подключения общих пулов к клиенту GigaChat"""
+
+    SETTINGS = {
+        "credentials": "test",
+        "base_url": "https://gigachat.example/api/v1",
+        "timeout": 30,
+        "verify_ssl_certs": False,
+    }
+
+    @pytest.fixture
+    def registry(self, monkeypatch):
+        registry = HTTPPoolRegistry()
+        monkeypatch.setattr("ai_agent.client.http_pools", registry)
+        yield registry
+        registry.close()
+
+    def test_sync_client_is_pooled(self, registry):
+        """Тест: синхронные запросы GigaChat идут через общий пул"""
+        client = _gigachat_factory(LLMProvider.GIGACHAT, None, self.SETTINGS)
+
+        assert client._client is registry.sync_client("gigachat")
+        assert str(client._client.base_url) == "https://gigachat.example/api/v1/"
+
+    def test_async_client_is_pooled(self, registry):
+        """Тест: асинхронные запросы GigaChat идут через пул event loop"""
+        loop = asyncio.new_event_loop()
+        try:
+            client = _gigachat_factory(LLMProvider.GIGACHAT, loop, self.SETTINGS)
+
+            assert client._aclient is registry.async_client("gigachat", loop=loop)
+        finally:
+            loop.run_until_complete(registry.aclose())
+            loop.close()
@@ -0,0 +1,148 @@
+import base64
+import io
+import tempfile
+import threading
+
+import pytest
+
+from ai_agent.fake_provider import FakeLLM
+from ai_agent.food_analysis_service import FoodAnalysisService
+from ai_agent.images import (
+    ImageDigests,
+    image_buffer,
+    image_to_data_url,
+    image_upload_file,
+    images_digest,
+    iter_base64_chunks,
+)
+from ai_agent.single_flight import SingleFlight
+
+
+class TestImages:
+    """Юнит-тесты для потоковой обработки изображений"""
+
+    @pytest.fixture
+    def image_bytes(self):
+        """Возвращает байты изображения больше одного чанка"""
+        return bytes(range(256)) * 4000 + b"tail"
+
+    @pytest.fixture
+    def expected_data_url(self, image_bytes):
+        """Возвращает ожидаемый data URL"""
+        return "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode("ascii")
+
+    @pytest.fixture
+    def temporary_file(self, image_bytes):
+        """Создает временный файл, как TemporaryUploadedFile в Django"""
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(image_bytes)
+            file.flush()
+            yield file
+
+    def test_data_url_from_bytes(self, image_bytes, expected_data_url):
+        """Тест кодирования байтов"""
+        assert image_to_data_url(image_bytes, chunk_size=3 * 1024) == expected_data_url
+
+    def test_data_url_from_bytes_io(self, image_bytes, expected_data_url):
+        """Тест кодирования InMemoryUploadedFile (BytesIO)"""
+        assert image_to_data_url(io.BytesIO(image_bytes)) == expected_data_url
+
+    def test_data_url_from_temporary_file(self, temporary_file, expected_data_url):
+        """Тест кодирования временного файла через mmap"""
+        assert image_to_data_url(temporary_file) == expected_data_url
+
+    def test_data_url_from_base64_string(self):
+        """Тест передачи готовой base64 строки"""
+        assert image_to_data_url("YWJj") == "data:image/jpeg;base64,YWJj"
+
+    def test_data_url_uses_content_type(self, image_bytes):
+        """Тест использования content_type загруженного файла"""
+        upload = io.BytesIO(image_bytes)
+        upload.content_type = "image/png"
+
+        assert image_to_data_url(upload).startswith("data:image/png;base64,")
+
+    def test_image_buffer_empty_file(self):
+        """Тест пустого файла (mmap не применим)"""
+        with tempfile.NamedTemporaryFile() as file:
+            with image_buffer(file) as buffer:
+                assert buffer.nbytes == 0
+
+    def test_iter_base64_chunks_invalid_chunk_size(self, image_bytes):
+        """Тест проверки кратности размера чанка"""
+        with pytest.raises(ValueError):
+            list(iter_base64_chunks(memoryview(image_bytes), chunk_size=1000))
+
+    def test_upload_file_streams_file_object(self, temporary_file):
+        """Тест передачи файла в GigaChat без чтения в память"""
+        temporary_file.seek(10)
+
+        name, content, mime_type = image_upload_file(temporary_file)
+
+        assert content is temporary_file.file
+        assert content.tell() == 0
+        assert mime_type == "image/jpeg"
+
+    def test_upload_file_from_bytes(self, image_bytes):
+        """Тест формирования файла из байтов"""
+        name, content, mime_type = image_upload_file(image_bytes, index=3)
+
+        assert name == "image_3.jpeg"
+        assert content == image_bytes
+
+
+class TestImageDigests:
+    """Юнит-тесты для дайджестов изображений запроса"""
+
+    @pytest.fixture
+    def hashed(self, monkeypatch):
+        """Потоки, в которых считался SHA-256 (по одному на проход)"""
+        threads = []
+
+        def counting_digest(images):
+            threads.append(threading.current_thread())
+            return images_digest(images)
+
+        monkeypatch.setattr("ai_agent.images.images_digest", counting_digest)
+        return threads
+
+    @pytest.mark.asyncio
+    async def test_hashed_once_off_loop(self, hashed):
+        """Тест: набор хешируется один раз на запрос и не в event loop"""
+        photo = b"photo" * 1000
+
+        with ImageDigests().scope():
+            first = await ImageDigests.current().digest([photo])
+            second = await ImageDigests.current().digest([photo])
+
+        assert first == second == images_digest([photo])
+        assert len(hashed) == 1
+        assert hashed[0] is not threading.current_thread()
+
+    @pytest.mark.asyncio
+    async def test_not_shared_outside_scope(self, hashed):
+        """Тест: вне запроса дайджесты не переиспользуются"""
+        photo = b"photo" * 1000
+
+        await ImageDigests.current().digest([photo])
+        await ImageDigests.current().digest([photo])
+
+        assert len(hashed) == 2
+
+    @pytest.mark.asyncio
+    async def test_text_hashed_inline(self, hashed):
+        """Тест: текст и URL хешируются без потока"""
+        await ImageDigests().digest(["https://example.com/lunch.jpg"])
+
+        assert hashed == [threading.current_thread()]
+
+    @pytest.mark.asyncio
+    async def test_service_hashes_photo_once(self, hashed):
+        """Тест: ключ single-flight и провайдер используют один дайджест"""
+        service = FoodAnalysisService(llm_client=FakeLLM(latency_mean=0))
+        service._hedger = None
+        service._single_flight = SingleFlight()
+
+        await service.analyze_food_image([b"photo" * 1000])
+
+        assert len(hashed) == 1
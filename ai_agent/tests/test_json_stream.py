@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from ai_agent.json_stream import DishStreamParser, parse_dishes
+from ai_agent.prompts import food_analise_system_prompt_mini
+
+
+class TestDishStreamParser:
+    """Юнит-тесты для инкрементального парсера ответа модели"""
+
+    @pytest.fixture
+    def dishes(self):
+        """Возвращает список блюд"""
+        return [
+            {
+                "name": "Омлет {с сыром}",
+                "weight": 200,
+                "calories": 350,
+                "protein": 20,
+                "fat": 25,
+                "carbohydrates": 5,
+            },
+            {
+                "name": 'Чай "Эрл Грей"',
+                "weight": 250,
+                "calories": 5,
+                "protein": 0,
+                "fat": 0,
+                "carbohydrates": 1,
+            },
+        ]
+
+    def test_emits_dish_when_object_closes(self, dishes):
+        """Тест выдачи блюда сразу после закрывающей скобки"""
+        text = json.dumps(dishes, ensure_ascii=False)
+        first_end = text.index("}, ") + 1
+        parser = DishStreamParser()
+
+        assert parser.feed(text[: first_end - 1]) == []
+        assert parser.feed(text[first_end - 1 : first_end]) == [dishes[0]]
+        assert parser.feed(text[first_end:]) == [dishes[1]]
+
+    def test_char_by_char_stream(self, dishes):
+        """Тест потока по одному символу"""
+        text = json.dumps(dishes, ensure_ascii=False)
+
+        assert parse_dishes(iter(text)) == dishes
+
+    def test_markdown_fence_and_prose(self, dishes):
+        """Тест ответа с markdown ограждением и текстом вокруг JSON"""
+        text = (
+            "Я вижу на фото следующие блюда:\n```json\n"
+            + json.dumps(dishes, ensure_ascii=False)
+            + "\n```\nНадеюсь, это поможет!"
+        )
+
+        assert parse_dishes(text) == dishes
+
+    def test_trailing_commas(self):
+        """Тест висячих запятых, как в примере промпта"""
+        text = """[
+            {"name": "Суп", "weight": 300, "calories": 250, "tags": ["горячее",],},
+        ]"""
+
+        result = parse_dishes(text)
+
+        assert result == [
+            {"name": "Суп", "weight": 300, "calories": 250, "tags": ["горячее"]}
+        ]
+
+    def test_prompt_example_is_parsed(self):
+        """Тест примера из промпта (без типов значений)"""
+        example = food_analise_system_prompt_mini.replace("float (г)", "1.5").replace(
+            "integer (ккал)", "100"
+        )
+
+        result = parse_dishes(example)
+
+        assert len(result) == 1
+        assert result[0]["calories"] == 100
+
+    def test_single_object(self):
+        """Тест одиночного объекта без массива"""
+        assert parse_dishes('{"name": "Суп", "calories": 250}') == [
+            {"name": "Суп", "calories": 250}
+        ]
+
+    def test_empty_array(self):
+        """Тест пустого массива"""
+        assert parse_dishes("```json\n[]\n```") == []
+
+    def test_invalid_object_is_skipped(self):
+        """Тест пропуска невалидного объекта среди валидных"""
+        text = '[{"name": oops}, {"name": "Банан"}]'
+
+        assert parse_dishes(text) == [{"name": "Банан"}]
+
+    @pytest.mark.parametrize(
+        "text",
+        ["", "Это просто текст, а не JSON", '[{"name": "Суп"', "{не json}"],
+    )
+    def test_no_json_raises(self, text):
+        """Тест ответа без JSON"""
+        with pytest.raises(json.JSONDecodeError):
+            parse_dishes(text)
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+HEAVY_MODULES = ("gigachat", "langchain_openai", "langchain_core")
+
+
+def run_python(code: str) -> str:
+    """Выполняет код в отдельном интерпретаторе и возвращает stdout"""
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+class TestLazyImport:
+    """Тесты ленивой инициализации ai_agent"""
+
+    def test_import_package_does_not_load_provider_sdks(self):
+        """Тест: импорт ai_agent не импортирует SDK провайдеров"""
+        output = run_python(
+            "import sys, ai_agent, ai_agent.client, ai_agent.web;"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+
+        assert output == ""
+
+    def test_import_package_does_not_read_settings(self):
+        """Тест: настройки не создаются при импорте"""
+        output = run_python(
+            "import ai_agent.client;"
+            "from ai_agent.config import get_llm_settings;"
+            "print(get_llm_settings.cache_info().currsize)"
+        )
+
+        assert output == "0"
+
+    def test_import_food_diary_core_does_not_build_service(self):
+        """Тест: импорт apps.food_diary.core не создает сервис и клиентов"""
+        output = run_python(
+            "import os, sys, django;"
+            "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings');"
+            "django.setup();"
+            "import apps.food_diary.core;"
+            "from ai_agent.food_analysis_service import get_food_analysis_service;"
+            "print(get_food_analysis_service.cache_info().currsize,"
+            f"any(m in sys.modules for m in {HEAVY_MODULES!r}))"
+        )
+
+        assert output == "0 False"
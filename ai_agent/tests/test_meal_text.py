@@ -0,0 +1,57 @@
+import pytest
+
+from ai_agent.meal_text import parse_fragment, parse_meal_text, split_fragments
+from ai_agent.nutrients import DATASET_PATH, NutrientIndex
+
+
+class TestMealText:
+    """Юнит-тесты для разбора текстового описания приема пищи"""
+
+    @pytest.fixture
+    def index(self):
+        """Загружает встроенную таблицу"""
+        return NutrientIndex.from_csv(DATASET_PATH)
+
+    def test_split_fragments(self):
+        """Тест деления на фрагменты без разрыва десятичной запятой"""
+        assert split_fragments("1,5 кг арбуза, хлеб; чай и сыр + мед") == [
+            "1,5 кг арбуза",
+            "хлеб",
+            "чай",
+            "сыр",
+            "мед",
+        ]
+
+    @pytest.mark.parametrize(
+        "fragment, expected",
+        [
+            ("200 г гречки", ("гречки", 200.0)),
+            ("куриная грудка 150г", ("куриная грудка", 150.0)),
+            ("0,3 кг риса", ("риса", 300.0)),
+            ("молоко 0.25 л", ("молоко", 250.0)),
+            ("съел примерно 300 грамм борща", ("борща", 300.0)),
+            ("2 яйца", None),
+            ("гречка", None),
+        ],
+    )
+    def test_parse_fragment(self, fragment, expected):
+        """Тест извлечения продукта и веса в граммах"""
+        assert parse_fragment(fragment) == expected
+
+    def test_resolves_simple_entries_locally(self, index):
+        """Тест расчета КБЖУ по таблице для простых записей"""
+        result = parse_meal_text("200 г гречки, курица отварная 150г", index)
+
+        assert result.unresolved == []
+        assert [(dish["name"], dish["weight"]) for dish in result.dishes] == [
+            ("гречка отварная", 200.0),
+            ("куриная грудка отварная", 150.0),
+        ]
+        assert result.dishes[0]["calories"] == 220
+
+    def test_unresolved_fragments_go_to_model(self, index):
+        """Тест передачи в модель фрагментов без веса или без совпадения"""
+        result = parse_meal_text("2 яйца, кофе с молоком 200 мл, гречка 100 г", index)
+
+        assert [dish["name"] for dish in result.dishes] == ["гречка отварная"]
+        assert result.unresolved == ["2 яйца", "кофе с молоком 200 мл"]
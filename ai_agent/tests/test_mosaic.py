@@ -0,0 +1,60 @@
+import io
+
+import pytest
+from PIL import Image
+
+from ai_agent.mosaic import (
+    build_mosaic,
+    can_build_mosaic,
+    mosaic_grid,
+    mosaic_prompt,
+)
+
+
+def make_photo(color, size=(400, 300)) -> bytes:
+    """JPEG заданного цвета"""
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+class TestMosaic:
+    """Юнит-тесты для сборки мозаики из фото"""
+
+    @pytest.mark.parametrize(
+        "count, grid", [(2, (2, 1)), (3, (2, 2)), (4, (2, 2)), (5, (3, 2))]
+    )
+    def test_grid(self, count, grid):
+        """Тест размера сетки для разного числа фото"""
+        assert mosaic_grid(count) == grid
+
+    def test_can_build_mosaic(self):
+        """Тест: мозаика только для 2+ фото без URL и base64 строк"""
+        photo = make_photo("red")
+
+        assert can_build_mosaic([photo, io.BytesIO(photo)])
+        assert not can_build_mosaic([photo])
+        assert not can_build_mosaic([photo, "https://example.com/photo.jpg"])
+
+    def test_build_mosaic(self):
+        """Тест раскладки уменьшенных фото по ячейкам"""
+        colors = [(255, 0, 0), (0, 0, 255), (0, 255, 0)]
+        photos = [make_photo(color, size=(1600, 1200)) for color in colors]
+
+        data = build_mosaic(photos, tile_size=200, quality=90)
+
+        mosaic = Image.open(io.BytesIO(data))
+        assert mosaic.format == "JPEG"
+        assert mosaic.size == (400, 400)
+        # Центры ячеек - цвета соответствующих фото, пустая ячейка - фон
+        for (x, y), color in zip([(100, 100), (300, 100), (100, 300)], colors):
+            pixel = mosaic.getpixel((x, y))
+            assert all(abs(a - b) < 40 for a, b in zip(pixel, color))
+        assert mosaic.getpixel((300, 300)) == pytest.approx((255, 255, 255), abs=5)
+
+    def test_mosaic_prompt(self):
+        """Тест дополнения промпта описанием мозаики"""
+        prompt = mosaic_prompt("Определи блюда.", 3)
+
+        assert prompt.startswith("Определи блюда.")
+        assert "3 пронумерованных фото" in prompt
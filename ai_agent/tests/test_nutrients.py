@@ -0,0 +1,73 @@
+import pytest
+
+from ai_agent.metrics import metrics
+from ai_agent.nutrients import (
+    DATASET_PATH,
+    NutrientIndex,
+    NutrientRecord,
+    normalize_name,
+)
+
+
+class TestNutrientIndex:
+    """Юнит-тесты для локальной таблицы пищевой ценности"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.fixture
+    def index(self):
+        """Загружает встроенную таблицу"""
+        return NutrientIndex.from_csv(DATASET_PATH)
+
+    def test_normalize_name(self):
+        """Тест нормализации названия"""
+        assert normalize_name("  Гречка, ОТВАРНАЯ!  ") == "гречка отварная"
+        assert normalize_name("Мёд") == "мед"
+
+    def test_exact_match_by_alias(self, index):
+        """Тест точного совпадения по синониму"""
+        match = index.lookup("Гречневая каша")
+
+        assert match.record.name == "гречка отварная"
+        assert match.score == 1.0
+
+    def test_fuzzy_match(self, index):
+        """Тест нечеткого совпадения с опечаткой и другим словом"""
+        assert index.lookup("гречка варёная").record.name == "гречка отварная"
+        assert index.lookup("куриная грудка на гриле").record.name.startswith(
+            "куриная грудка"
+        )
+
+    def test_unknown_food(self, index):
+        """Тест отсутствия совпадения"""
+        assert index.lookup("синхрофазотрон") is None
+        assert metrics.get("ai_agent_nutrient_lookups_total", result="miss") == 1
+
+    def test_for_weight(self):
+        """Тест расчета КБЖУ по весу порции"""
+        record = NutrientRecord(
+            name="рис", calories=130, protein=2.7, fat=0.3, carbohydrates=28.2
+        )
+
+        assert record.for_weight(200) == {
+            "calories": 260,
+            "protein": 5.4,
+            "fat": 0.6,
+            "carbohydrates": 56.4,
+        }
+
+    def test_threshold(self):
+        """Тест порога схожести"""
+        record = NutrientRecord(
+            name="банан", calories=96, protein=1.5, fat=0.2, carbohydrates=21.8
+        )
+        strict = NutrientIndex([("банан", record)], threshold=0.95)
+        loose = NutrientIndex([("банан", record)], threshold=0.5)
+
+        assert strict.lookup("бананы") is None
+        assert loose.lookup("бананы").record == record
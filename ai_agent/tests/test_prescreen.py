@@ -0,0 +1,100 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+from ai_agent.metrics import metrics
+from ai_agent.prescreen import classify, photo_stats, screen_photo
+
+THRESHOLDS = {
+    "size": 256,
+    "min_sharpness": 8.0,
+    "min_brightness": 15.0,
+    "max_brightness": 245.0,
+    "min_entropy": 3.0,
+    "max_peak_ratio": 0.5,
+}
+
+
+def encode(image: Image.Image, format: str = "JPEG") -> bytes:
+    output = io.BytesIO()
+    image.save(output, format=format, quality=90)
+    return output.getvalue()
+
+
+def textured(size=(1600, 1200), seed=0) -> Image.Image:
+    """Фото-подобное изображение: плавные градиенты, пятна и шум"""
+    rng = np.random.default_rng(seed)
+    rows, columns = np.mgrid[0 : size[1], 0 : size[0]]
+    pixels = np.stack(
+        [
+            120 + 80 * np.sin(columns / 90) + 40 * np.cos(rows / 70),
+            100 + 60 * np.cos(columns / 50 + rows / 80),
+            90 + 50 * np.sin(rows / 40),
+        ],
+        axis=-1,
+    )
+    pixels += rng.normal(0, 12, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestPrescreen:
+    """Юнит-тесты для локальной проверки фото"""
+
+    def test_accepts_photo(self):
+        """Тест: обычное фото проходит проверку"""
+        assert screen_photo(encode(textured()), THRESHOLDS) is None
+        assert metrics.get("ai_agent_prescreen_total", result="ok") == 1
+
+    @pytest.mark.parametrize(
+        "image, code",
+        [
+            (Image.new("RGB", (800, 600), (5, 5, 5)), "too_dark"),
+            (Image.new("RGB", (800, 600), (252, 252, 252)), "too_bright"),
+            (Image.new("RGB", (800, 600), (128, 128, 128)), "low_detail"),
+            (textured().filter(ImageFilter.GaussianBlur(10)), "blurry"),
+        ],
+    )
+    def test_rejects_hopeless_photo(self, image, code):
+        """Тест отклонения черных, засвеченных, пустых и размытых кадров"""
+        rejection = screen_photo(encode(image), THRESHOLDS)
+
+        assert rejection.code == code
+        assert rejection.detail
+        assert metrics.get("ai_agent_prescreen_total", result=code) == 1
+
+    def test_rejects_screenshot(self):
+        """Тест: однотонный фон на большей части кадра - скриншот"""
+        screenshot = Image.new("RGB", (1000, 2000), (128, 128, 128))
+        screenshot.paste(textured(size=(1000, 800)), (0, 0))
+
+        rejection = screen_photo(encode(screenshot, format="PNG"), THRESHOLDS)
+
+        assert rejection.code == "screenshot"
+
+    def test_rejects_unreadable(self):
+        """Тест отклонения данных, которые не декодируются"""
+        rejection = screen_photo(b"not an image", THRESHOLDS)
+
+        assert rejection.code == "unreadable"
+        assert rejection.stats is None
+
+    def test_skips_urls(self):
+        """Тест: URL не проверяются"""
+        assert screen_photo("https://example.com/photo.jpg", THRESHOLDS) is None
+
+    def test_stats_on_file_object(self):
+        """Тест расчета признаков для файлового объекта"""
+        stats = photo_stats(io.BytesIO(encode(textured())), size=128)
+
+        assert classify(stats, THRESHOLDS) is None
+        assert 0 < stats.peak_ratio < 0.5
+        assert stats.entropy > 6
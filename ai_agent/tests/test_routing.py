@@ -0,0 +1,124 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ai_agent.config import ModelRoute
+from ai_agent.metrics import metrics
+from ai_agent.routing import RoutingPolicy
+from ai_agent.telemetry import call_telemetry
+
+
+def encode(pixels: np.ndarray) -> bytes:
+    output = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def plain_photo() -> bytes:
+    """Однотонная тарелка на однотонном фоне: низкая энтропия"""
+    pixels = np.full((200, 200), 60)
+    pixels[50:150, 50:150] = 200
+    return encode(pixels)
+
+
+def busy_photo() -> bytes:
+    """Загроможденный кадр: высокая энтропия"""
+    return encode(np.random.default_rng(0).integers(0, 256, (200, 200)))
+
+
+class TestRoutingPolicy:
+    """Юнит-тесты для выбора модели по сложности запроса"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    def test_simple_photo_goes_to_light_model(self):
+        """Тест: одно небольшое фото - легкая модель"""
+        decision = RoutingPolicy().decide([b"x" * 1000])
+
+        assert decision.route == ModelRoute.LIGHT
+        assert decision.reason == "simple"
+        assert (
+            metrics.get("ai_agent_routing_total", route="light", reason="simple") == 1
+        )
+
+    @pytest.mark.parametrize(
+        "images, reason",
+        [
+            ([b"a", b"b"], "images"),
+            (["https://example.com/lunch.jpg"], "url"),
+            ([b"x" * 2_001], "bytes"),
+        ],
+    )
+    def test_complex_photos_go_to_standard_model(self, images, reason):
+        """Тест: несколько фото, фото по ссылке и большое фото - основная модель"""
+        decision = RoutingPolicy(max_image_bytes=2_000).decide(images)
+
+        assert decision.route == ModelRoute.STANDARD
+        assert decision.reason == reason
+
+    def test_retry_goes_to_standard_model(self):
+        """Тест: повторная попытка идет основной модели"""
+        decision = RoutingPolicy().decide([b"x"], attempt=1)
+
+        assert decision.route == ModelRoute.STANDARD
+        assert decision.reason == "retry"
+
+    def test_text_items(self):
+        """Тест: короткое описание - легкой модели, длинное - основной"""
+        policy = RoutingPolicy(max_text_items=2)
+
+        assert policy.decide([], text="борщ и хлеб").route == ModelRoute.LIGHT
+        decision = policy.decide([], text="борщ, котлета с пюре, компот")
+        assert decision.route == ModelRoute.STANDARD
+        assert decision.reason == "text_items"
+
+    def test_entropy(self):
+        """Тест: загроможденный кадр идет основной модели"""
+        policy = RoutingPolicy(max_entropy=5.0)
+
+        assert policy.decodes_images
+        assert policy.decide([plain_photo()]).route == ModelRoute.LIGHT
+        assert policy.decide([busy_photo()]).reason == "entropy"
+        assert policy.decide([b"not an image"]).reason == "unreadable"
+
+    def test_entropy_not_computed_by_default(self):
+        """Тест: без порога энтропии фото не декодируется"""
+        policy = RoutingPolicy()
+
+        assert not policy.decodes_images
+        assert policy.decide([b"not an image"]).route == ModelRoute.LIGHT
+
+
+class TestRouteTelemetry:
+    """Юнит-тесты для учета задержки по маршрутам"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    def test_route_metrics(self):
+        """Тест: вызов с маршрутом попадает в метрики маршрута"""
+        with call_telemetry("openai", model="gpt-4o-mini") as call:
+            call.route = ModelRoute.LIGHT.value
+
+        labels = {"provider": "openai", "route": "light"}
+        histogram = metrics.histogram("ai_agent_llm_route_chat_seconds", **labels)
+        assert metrics.get("ai_agent_llm_route_calls_total", outcome="ok", **labels)
+        assert histogram["count"] == 1
+
+    def test_no_route_metrics_without_routing(self):
+        """Тест: без маршрутизации метрики маршрутов не пишутся"""
+        with call_telemetry("openai"):
+            pass
+
+        assert "ai_agent_llm_route_calls_total" not in str(metrics.snapshot())
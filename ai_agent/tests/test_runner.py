@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from ai_agent.runner import BackgroundLoop
+
+
+class TestBackgroundLoop:
+    """Юнит-тесты для фонового event loop процесса"""
+
+    @pytest.fixture
+    def background(self):
+        """Отдельный фоновый loop на тест"""
+        background = BackgroundLoop(name="test-loop")
+        yield background
+        background.stop()
+
+    def test_run_returns_result(self, background):
+        """Тест выполнения корутины из синхронного кода"""
+
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        assert background.run(add(2, 3)) == 5
+
+    def test_loop_is_reused(self, background):
+        """Тест переиспользования одного loop между вызовами"""
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = background.run(current_loop())
+        second = background.run(current_loop())
+
+        assert first is second is background.loop
+        assert not first.is_closed()
+
+    def test_exception_propagates(self, background):
+        """Тест проброса исключения корутины"""
+
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            background.run(fail())
+
+    def test_submit_from_many_threads(self, background):
+        """Тест потокобезопасной отправки из потоков синхронных view"""
+        results = []
+
+        async def identity(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        def worker(value):
+            results.append(background.run(identity(value)))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == list(range(8))
+
+    def test_timeout_cancels_coroutine(self, background):
+        """Тест отмены корутины по таймауту ожидания"""
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            background.run(slow(), timeout=0.05)
+
+        assert cancelled.wait(1.0)
+
+    def test_run_from_loop_thread_is_rejected(self, background):
+        """Тест защиты от взаимоблокировки при вызове из фонового loop"""
+
+        async def nested():
+            background.run(asyncio.sleep(0))
+
+        with pytest.raises(RuntimeError):
+            background.run(nested())
+
+    def test_stop_closes_loop(self):
+        """Тест остановки фонового loop"""
+        background = BackgroundLoop(name="test-loop")
+        loop = background.loop
+
+        background.stop()
+
+        assert loop.is_closed()
+        assert background.loop is not loop
+        background.stop()
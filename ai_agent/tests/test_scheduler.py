@@ -0,0 +1,204 @@
+import asyncio
+
+import pytest
+
+from ai_agent.concurrency_limiter import AdaptiveLimiter
+from ai_agent.config import MultiImageMode
+from ai_agent.fake_provider import FakeLLM
+from ai_agent.food_analysis_service import FoodAnalysisService
+from ai_agent.metrics import metrics
+from ai_agent.scheduler import (
+    FairQueue,
+    Lane,
+    RequestClass,
+    current_request,
+    request_scope,
+)
+
+
+def drain(queue: FairQueue, eligible=lambda lane: True) -> list:
+    items = []
+    while (item := queue.pop(eligible)) is not None:
+        items.append(item)
+    return items
+
+
+class TestFairQueue:
+    """Юнит-тесты для очереди с полосами приоритета и SCFQ"""
+
+    def test_interleaves_tenants(self):
+        """Тест: вызовы тяжелого пациента чередуются с вызовами других"""
+        queue = FairQueue()
+        for number in range(4):
+            queue.push(f"heavy-{number}", RequestClass(tenant="heavy"))
+        queue.push("light-0", RequestClass(tenant="light"))
+        queue.push("light-1", RequestClass(tenant="light"))
+
+        assert drain(queue) == [
+            "heavy-0",
+            "light-0",
+            "heavy-1",
+            "light-1",
+            "heavy-2",
+            "heavy-3",
+        ]
+
+    def test_weights(self):
+        """Тест: арендатор с весом 2 получает вдвое больше слотов"""
+        queue = FairQueue()
+        for number in range(4):
+            queue.push(f"a-{number}", RequestClass(tenant="a", weight=2.0))
+            queue.push(f"b-{number}", RequestClass(tenant="b"))
+
+        assert drain(queue)[:6] == ["a-0", "b-0", "a-1", "a-2", "b-1", "a-3"]
+
+    def test_new_tenant_does_not_wait_for_backlog(self):
+        """Тест: новый пациент встает вровень с текущим, а не в хвост очереди"""
+        queue = FairQueue()
+        for number in range(5):
+            queue.push(f"batch-{number}", RequestClass(tenant="batch"))
+        assert queue.pop() == "batch-0"
+        assert queue.pop() == "batch-1"
+
+        queue.push("patient", RequestClass(tenant="patient"))
+
+        assert drain(queue) == ["batch-2", "patient", "batch-3", "batch-4"]
+
+    def test_lane_priority(self):
+        """Тест: интерактивная полоса обслуживается раньше фоновой"""
+        queue = FairQueue()
+        queue.push("background", RequestClass(lane=Lane.BACKGROUND))
+        queue.push("interactive", RequestClass(lane=Lane.INTERACTIVE))
+
+        assert queue.blocks(Lane.INTERACTIVE)
+        assert drain(queue) == ["interactive", "background"]
+        assert not queue.blocks(Lane.BACKGROUND)
+
+    def test_ineligible_lane_is_skipped(self):
+        """Тест пропуска полосы без свободных слотов"""
+        queue = FairQueue()
+        queue.push("background", RequestClass(lane=Lane.BACKGROUND))
+
+        assert not queue.blocks(Lane.INTERACTIVE)
+        assert queue.pop(lambda lane: lane != Lane.BACKGROUND) is None
+        assert queue.depth(Lane.BACKGROUND) == 1
+
+    def test_remove(self):
+        """Тест удаления отмененного ожидания"""
+        queue = FairQueue()
+        queue.push("a", RequestClass(tenant="a"))
+        queue.push("b", RequestClass(tenant="b"))
+
+        assert queue.remove("a")
+        assert not queue.remove("a")
+        assert drain(queue) == ["b"]
+        assert len(queue) == 0
+
+    def test_request_scope(self):
+        """Тест класса запроса из контекста"""
+        assert current_request() == RequestClass()
+
+        with request_scope(42, lane=Lane.BACKGROUND) as request:
+            assert current_request() is request
+            assert request.tenant == "42"
+
+        assert current_request().lane == Lane.INTERACTIVE
+        with pytest.raises(ValueError):
+            with request_scope("a", weight=0):
+                pass
+
+
+class TestLimiterScheduling:
+    """Юнит-тесты для планирования слотов лимитера по полосам"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_background_keeps_headroom(self):
+        """Тест: фоновые вызовы не занимают весь лимит"""
+        limiter = AdaptiveLimiter("fake", initial_limit=4, background_share=0.5)
+        with request_scope("batch", lane=Lane.BACKGROUND):
+            lanes = [await limiter.acquire() for _ in range(2)]
+            waiting = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0.001)
+
+        assert lanes == [Lane.BACKGROUND, Lane.BACKGROUND]
+        assert not waiting.done()
+
+        # Интерактивный вызов проходит без ожидания
+        assert await limiter.acquire() == Lane.INTERACTIVE
+        assert limiter.in_flight == 3
+        assert (
+            metrics.get(
+                "ai_agent_scheduler_queue_depth", provider="fake", lane="background"
+            )
+            == 1
+        )
+
+        limiter.release(0.0, lane=Lane.BACKGROUND)
+        await asyncio.wait_for(waiting, timeout=1)
+        snapshot = limiter.snapshot()["lanes"]
+        assert snapshot["background"] == {"in_flight": 2, "queue_depth": 0}
+        assert snapshot["interactive"] == {"in_flight": 1, "queue_depth": 0}
+
+    @pytest.mark.asyncio
+    async def test_interactive_served_first(self):
+        """Тест: освободившийся слот получает интерактивный вызов"""
+        limiter = AdaptiveLimiter("fake", initial_limit=1)
+        order = []
+
+        async def call(name, lane):
+            with request_scope(name, lane=lane):
+                async with limiter.slot():
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+
+        tasks = [asyncio.ensure_future(call("first", Lane.INTERACTIVE))]
+        await asyncio.sleep(0.001)
+        tasks.append(asyncio.ensure_future(call("batch", Lane.BACKGROUND)))
+        await asyncio.sleep(0.001)
+        tasks.append(asyncio.ensure_future(call("patient", Lane.INTERACTIVE)))
+        await asyncio.gather(*tasks)
+
+        assert order == ["first", "patient", "batch"]
+        histogram = metrics.histogram(
+            "ai_agent_scheduler_wait_seconds", provider="fake", lane="background"
+        )
+        assert histogram["count"] == 1
+        assert histogram["sum"] > 0
+
+
+class TestBatchLane:
+    """Юнит-тесты для полосы пакетного анализа"""
+
+    @pytest.mark.asyncio
+    async def test_multiple_images_in_background_lane(self):
+        """Тест: анализ нескольких фото идет фоном от имени арендатора"""
+        service = FoodAnalysisService(llm_client=FakeLLM(latency_mean=0))
+        requests = []
+
+        async def analyze_food_image(images_bytes):
+            requests.append(current_request())
+            return []
+
+        service.analyze_food_image = analyze_food_image
+        with request_scope("clinic", weight=2.0):
+            await service.analyze_multiple_food_images(
+                [b"a", b"b"], mode=MultiImageMode.PER_IMAGE
+            )
+            await service.analyze_multiple_food_images([b"c"], lane=Lane.INTERACTIVE)
+
+        assert [request.lane for request in requests] == [
+            Lane.BACKGROUND,
+            Lane.BACKGROUND,
+            Lane.INTERACTIVE,
+        ]
+        assert {(request.tenant, request.weight) for request in requests} == {
+            ("clinic", 2.0)
+        }
+        assert current_request() == RequestClass()
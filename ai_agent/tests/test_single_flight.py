@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from ai_agent.metrics import metrics
+from ai_agent.single_flight import CacheLock, SingleFlight
+
+
+class MemoryCache:
+    """Асинхронный API кэша Django поверх словаря"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def aadd(self, key, value, timeout=None):
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    async def aget(self, key, default=None):
+        return self.data.get(key, default)
+
+    async def aset(self, key, value, timeout=None):
+        self.data[key] = value
+
+    async def adelete(self, key):
+        self.data.pop(key, None)
+
+
+class BrokenCache(MemoryCache):
+    """Недоступный кэш"""
+
+    async def aadd(self, key, value, timeout=None):
+        raise ConnectionError("cache is down")
+
+
+class TestSingleFlight:
+    """Юнит-тесты для объединения одинаковых запросов"""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        """Сбрасывает метрики между тестами"""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @staticmethod
+    def counting_factory(result="dishes", delay=0.05, error=None):
+        """Фабрика запроса, считающая количество вызовов"""
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return result
+
+        return factory, calls
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_request(self):
+        """Тест одного запроса для одновременных вызовов с одним ключом"""
+        flight = SingleFlight()
+        factory, calls = self.counting_factory()
+
+        results = await asyncio.gather(
+            *(flight.run("photo", factory) for _ in range(5))
+        )
+
+        assert results == ["dishes"] * 5
+        assert len(calls) == 1
+        assert len(flight) == 0
+        assert metrics.get("ai_agent_single_flight_total", result="leader") == 1
+        assert metrics.get("ai_agent_single_flight_total", result="shared") == 4
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_independent(self):
+        """Тест отдельных запросов для разных ключей"""
+        flight = SingleFlight()
+        factory, calls = self.counting_factory()
+
+        await asyncio.gather(
+            flight.run("first", factory), flight.run("second", factory)
+        )
+
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared_and_not_cached(self):
+        """Тест общей ошибки и повторного запроса после нее"""
+        flight = SingleFlight()
+        factory, calls = self.counting_factory(error=ValueError("boom"))
+
+        results = await asyncio.gather(
+            flight.run("photo", factory),
+            flight.run("photo", factory),
+            return_exceptions=True,
+        )
+        with pytest.raises(ValueError):
+            await flight.run("photo", factory)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        """Тест продолжения запроса после отмены одного из ожидающих"""
+        flight = SingleFlight()
+        factory, calls = self.counting_factory(delay=0.1)
+
+        impatient = asyncio.ensure_future(flight.run("photo", factory))
+        patient = asyncio.ensure_future(flight.run("photo", factory))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+
+        assert await patient == "dishes"
+        assert impatient.cancelled()
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_request_cancelled_without_waiters(self):
+        """Тест отмены запроса, когда его никто не ждет"""
+        cancelled = asyncio.Event()
+
+        async def factory():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        flight = SingleFlight()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.run("photo", factory), timeout=0.05)
+        await asyncio.sleep(0)
+
+        assert cancelled.is_set()
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_cache_lock_between_processes(self):
+        """Тест ожидания результата владельца блокировки в другом процессе"""
+        cache = MemoryCache()
+        first = SingleFlight(CacheLock(poll_interval=0.01, cache=cache))
+        second = SingleFlight(CacheLock(poll_interval=0.01, cache=cache))
+        factory, calls = self.counting_factory(result=[{"name": "Борщ"}])
+
+        results = await asyncio.gather(
+            first.run("photo", factory), second.run("photo", factory)
+        )
+
+        assert results == [[{"name": "Борщ"}]] * 2
+        assert len(calls) == 1
+        assert metrics.get("ai_agent_single_flight_total", result="remote") == 1
+        assert "ai_agent:single_flight:lock:photo" not in cache.data
+
+    @pytest.mark.asyncio
+    async def test_cache_unavailable(self):
+        """Тест выполнения запроса при недоступном кэше"""
+        flight = SingleFlight(CacheLock(cache=BrokenCache()))
+        factory, calls = self.counting_factory()
+
+        assert await flight.run("photo", factory) == "dishes"
+        assert len(calls) == 1
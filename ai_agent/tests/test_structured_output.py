@@ -0,0 +1,137 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel, Field
+
+from ai_agent.config import LLMProvider, get_llm_settings
+from ai_agent.fake_provider import FakeLLM
+from ai_agent.food_analysis_service import FoodAnalysisService
+from ai_agent.json_stream import DishStreamParser
+from ai_agent.structured_output import (
+    DISHES_FUNCTION_NAME,
+    DishesArguments,
+    StructuredOutput,
+    dishes_schema,
+    gigachat_function_arguments,
+    tool_call_arguments,
+)
+
+
+class Dish(BaseModel):
+    """Копия полей DishCreateIn без зависимости от Django"""
+
+    name: str = Field(..., max_length=200, description="Название блюда")
+    weight: float = Field(..., ge=0.0, description="Вес в граммах")
+    calories: int = Field(..., ge=0, description="Калорийность")
+
+
+DISHES = [
+    {"name": "Омлет {с сыром}", "weight": 200, "calories": 350},
+    {"name": 'Чай "Эрл Грей"', "weight": 250, "calories": 5},
+]
+
+
+class TestStructuredOutput:
+    """Юнит-тесты для структурированного вывода блюд"""
+
+    def test_schema_from_model(self):
+        """Тест схемы аргументов по модели блюда"""
+        schema = dishes_schema(Dish)
+        item = schema["properties"]["dishes"]["items"]
+
+        assert schema["required"] == ["dishes"]
+        assert item["required"] == ["name", "weight", "calories"]
+        assert item["additionalProperties"] is False
+        assert item["properties"]["calories"] == {
+            "type": "integer",
+            "description": "Калорийность",
+        }
+        # Ограничения не переносятся в схему
+        assert "maxLength" not in item["properties"]["name"]
+
+    def test_schema_fields(self):
+        """Тест схемы только с названием и весом (локальная таблица КБЖУ)"""
+        item = dishes_schema(Dish, fields=("name", "weight"))["properties"]["dishes"]
+
+        assert item["items"]["required"] == ["name", "weight"]
+
+    @pytest.mark.parametrize("strict", [True, False])
+    def test_openai_kwargs(self, strict):
+        """Тест принудительного вызова функции и strict только по запросу"""
+        kwargs = StructuredOutput(dishes_schema(Dish), strict=strict).openai_kwargs()
+        function = kwargs["tools"][0]["function"]
+
+        assert kwargs["tool_choice"]["function"]["name"] == DISHES_FUNCTION_NAME
+        assert function["name"] == DISHES_FUNCTION_NAME
+        assert function.get("strict", False) is strict
+
+    def test_gigachat_payload(self):
+        """Тест описания функции для GigaChat"""
+        payload = StructuredOutput(dishes_schema(Dish)).gigachat_payload()
+
+        assert payload["function_call"] == {"name": DISHES_FUNCTION_NAME}
+        assert payload["functions"][0]["parameters"]["required"] == ["dishes"]
+
+    def test_streams_dishes_from_tool_call_chunks(self):
+        """Тест: блюда из фрагментов аргументов отдаются по мере закрытия"""
+        text = json.dumps({"dishes": DISHES}, ensure_ascii=False)
+        chunks = [
+            SimpleNamespace(tool_call_chunks=[{"args": text[i : i + 7]}])
+            for i in range(0, len(text), 7)
+        ]
+        arguments = DishesArguments()
+        parser = DishStreamParser()
+
+        emitted = []
+        for chunk in chunks:
+            emitted.extend(parser.feed(arguments.feed(tool_call_arguments(chunk))))
+        parser.finish()
+
+        assert emitted == DISHES
+
+    def test_tool_call_arguments_without_tool_calls(self):
+        """Тест фрагмента без вызова функции (например, с usage)"""
+        assert tool_call_arguments(SimpleNamespace(tool_call_chunks=[])) == ""
+        assert tool_call_arguments(SimpleNamespace()) == ""
+
+    @pytest.mark.parametrize(
+        "arguments", [{"dishes": DISHES}, json.dumps({"dishes": DISHES})]
+    )
+    def test_gigachat_function_arguments(self, arguments):
+        """Тест массива блюд из вызова функции GigaChat"""
+        delta = SimpleNamespace(function_call=SimpleNamespace(arguments=arguments))
+
+        text = gigachat_function_arguments(delta)
+        parser = DishStreamParser()
+
+        assert parser.feed(text) == DISHES
+        assert gigachat_function_arguments(SimpleNamespace(content="[]")) is None
+
+
+class TestStructuredOutputSetting:
+    """Юнит-тесты для включения структурированного вывода в сервисе"""
+
+    @pytest.fixture
+    def env(self, monkeypatch):
+        """Окружение для настроек, перечитываемых заново"""
+        get_llm_settings.cache_clear()
+        yield monkeypatch
+        get_llm_settings.cache_clear()
+
+    def test_disabled_by_default(self, env):
+        """Тест: без LLM_STRUCTURED_OUTPUT_ENABLED функции не передаются"""
+        env.delenv("LLM_STRUCTURED_OUTPUT_ENABLED", raising=False)
+        service = FoodAnalysisService(llm_client=FakeLLM(latency_mean=0))
+
+        assert service._structured_output(LLMProvider.GIGACHAT) is None
+
+    def test_opt_in(self, env):
+        """Тест: схема функции передается только после явного включения"""
+        env.setenv("LLM_STRUCTURED_OUTPUT_ENABLED", "true")
+        service = FoodAnalysisService(llm_client=FakeLLM(latency_mean=0))
+
+        structured = service._structured_output(LLMProvider.GIGACHAT)
+        assert structured.gigachat_payload()["function_call"] == {
+            "name": DISHES_FUNCTION_NAME
+        }
@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ai_agent.circuit_breaker import ProviderUnavailableError
+from ai_agent.metrics import metrics
+from ai_agent.telemetry import (
+    call_telemetry,
+    current_call,
+    model_name,
+    record_parse,
+    record_usage,
+)
+
+
+class FakeClock:
+    """Ручные часы для детерминированных замеров"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestHistograms:
+    """Юнит-тесты для гистограмм реестра метрик"""
+
+    def test_observe_cumulative_buckets(self):
+        """Тест накопительных бакетов, суммы и количества"""
+        for value in (0.2, 0.7, 3.0, 100.0):
+            metrics.observe("latency", value, buckets=(0.5, 1.0, 5.0), provider="a")
+
+        histogram = metrics.histogram("latency", provider="a")
+
+        assert histogram["buckets"] == {"0.5": 1, "1.0": 2, "5.0": 3, "+Inf": 4}
+        assert histogram["count"] == 4
+        assert histogram["sum"] == pytest.approx(103.9)
+        assert metrics.snapshot()["histograms"]['latency{provider="a"}'] == histogram
+
+    def test_render_prometheus(self):
+        """Тест текстового формата Prometheus"""
+        metrics.inc("calls_total", outcome="ok")
+        metrics.set_gauge("in_flight", 2)
+        metrics.observe("latency", 0.3, buckets=(0.5,), provider="a")
+
+        text = metrics.render_prometheus()
+
+        assert "# TYPE calls_total counter" in text
+        assert 'calls_total{outcome="ok"} 1.0' in text
+        assert "# TYPE in_flight gauge" in text
+        assert "# TYPE latency histogram" in text
+        assert 'latency_bucket{le="0.5",provider="a"} 1' in text
+        assert 'latency_bucket{le="+Inf",provider="a"} 1' in text
+        assert 'latency_sum{provider="a"} 0.3' in text
+        assert 'latency_count{provider="a"} 1' in text
+
+
+class TestCallTelemetry:
+    """Юнит-тесты для телеметрии вызовов LLM"""
+
+    def test_records_call_measurements(self):
+        """Тест записи задержек, объема загрузки, токенов и разбора"""
+        clock = FakeClock()
+        with call_telemetry("gigachat", model="GigaChat-Max", images=2, clock=clock):
+            call = current_call()
+            call.add_upload(300_000, 0.5)
+            clock.now = 2.0
+            record_usage(
+                SimpleNamespace(
+                    usage=SimpleNamespace(prompt_tokens=900, completion_tokens=120)
+                )
+            )
+            record_parse("ok")
+
+        labels = {"provider": "gigachat", "model": "GigaChat-Max"}
+        assert current_call() is None
+        assert call.chat_seconds == pytest.approx(1.5)
+        assert call.parse_result == "ok"
+        assert metrics.get("ai_agent_llm_calls_total", outcome="ok", **labels) == 1
+        assert metrics.histogram("ai_agent_llm_chat_seconds", **labels)["sum"] == 1.5
+        assert metrics.histogram("ai_agent_llm_upload_bytes", **labels)["count"] == 1
+        assert (
+            metrics.get("ai_agent_llm_tokens_total", kind="prompt", **labels) == 900
+        )
+        assert (
+            metrics.get("ai_agent_llm_tokens_total", kind="completion", **labels)
+            == 120
+        )
+        assert metrics.get("ai_agent_llm_parse_total", result="ok") == 1
+
+    def test_langchain_usage_metadata(self):
+        """Тест расхода токенов из usage_metadata фрагмента langchain"""
+        with call_telemetry("openai") as call:
+            record_usage(SimpleNamespace(usage_metadata=None, usage=None))
+            record_usage(
+                SimpleNamespace(usage_metadata={"input_tokens": 10, "output_tokens": 5})
+            )
+
+        assert (call.prompt_tokens, call.completion_tokens) == (10, 5)
+
+    def test_error_outcome(self):
+        """Тест исхода error при ошибке провайдера"""
+        with pytest.raises(ConnectionError):
+            with call_telemetry("openai"):
+                raise ConnectionError("boom")
+
+        labels = {"provider": "openai", "model": ""}
+        assert metrics.get("ai_agent_llm_calls_total", outcome="error", **labels) == 1
+        assert metrics.histogram("ai_agent_llm_chat_seconds", **labels)["count"] == 1
+
+    def test_rejected_call_skips_histograms(self):
+        """Тест: отклоненный breaker'ом вызов не попадает в гистограммы"""
+        with pytest.raises(ProviderUnavailableError):
+            with call_telemetry("openai"):
+                raise ProviderUnavailableError("open")
+
+        labels = {"provider": "openai", "model": ""}
+        assert (
+            metrics.get("ai_agent_llm_calls_total", outcome="rejected", **labels) == 1
+        )
+        assert metrics.histogram("ai_agent_llm_chat_seconds", **labels)["count"] == 0
+
+    def test_parse_without_call(self):
+        """Тест учета разбора вне вызова провайдера"""
+        record_parse("fallback")
+
+        assert metrics.get("ai_agent_llm_parse_total", result="fallback") == 1
+
+    def test_model_name(self):
+        """Тест определения названия модели клиента"""
+        assert model_name(SimpleNamespace(model_name="gpt-4o")) == "gpt-4o"
+        client = SimpleNamespace(_settings=SimpleNamespace(model="Max"))
+        assert model_name(client) == "Max"
+        assert model_name(object()) == ""
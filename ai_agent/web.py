@@ -0,0 +1,54 @@
+from django.http import HttpRequest, HttpResponse
+from ninja import Router
+
+from ai_agent.client import LLMClient
+from ai_agent.metrics import metrics
+
+# Служебные эндпоинты ai_agent
+ai_agent_routers = Router(tags=["ai_agent"])
+
+
+@ai_agent_routers.get("/metrics")
+def get_metrics(request: HttpRequest):
+    """
+    Получить метрики ai_agent текущего воркера
+
+    Returns:
+        200: Счетчики, gauge-метрики и гистограммы (хеджирование, вызовы LLM и др.)
+    """
+    return metrics.snapshot()
+
+
+@ai_agent_routers.get("/metrics/prometheus")
+def get_metrics_prometheus(request: HttpRequest):
+    """
+    Получить метрики ai_agent текущего воркера в текстовом формате Prometheus
+
+    Returns:
+        200: text/plain для скрейпинга Prometheus
+    """
+    return HttpResponse(
+        metrics.render_prometheus(), content_type="text/plain; version=0.0.4"
+    )
+
+
+@ai_agent_routers.get("/breakers")
+def get_breakers(request: HttpRequest):
+    """
+    Получить состояние circuit breaker'ов провайдеров текущего воркера
+
+    Returns:
+        200: Состояние (closed/open/half_open), доля ошибок и задержка по провайдерам
+    """
+    return LLMClient.breakers.snapshot()
+
+
+@ai_agent_routers.get("/credentials")
+def get_credentials(request: HttpRequest):
+    """
+    Получить состояние пулов ключей провайдеров текущего воркера
+
+    Returns:
+        200: Загрузка и оставшееся охлаждение по индексам ключей (без значений)
+    """
+    return LLMClient.credentials.snapshot()
@@ -21,6 +21,7 @@ class ValidationErrorResponse(Schema):
     error: str = "Validation error"
     detail: Optional[str] = None
     field_errors: Optional[dict[str, list[str]]] = None  # Ошибки по полям
+    code: Optional[str] = None  # Код ошибки для клиента (например, photo_blurry)
 
 
 class NotFoundResponse(Schema):
@@ -1,10 +1,16 @@
 import datetime
 import logging
 
+from asgiref.sync import sync_to_async
 from django.db.models import QuerySet
-from typing import Optional, List
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple
 
-from ai_agent import food_analysis_service
+from ai_agent import get_food_analysis_service
+from ai_agent.config import get_llm_settings
+from ai_agent.deadline import Deadline
+from ai_agent.images import ImageSource
+from ai_agent.runner import run_sync
+from ai_agent.scheduler import request_scope
 from apps.food_diary.base import (
     CreateMealSuccessResponse,
     UpdateMealSuccessResponse,
@@ -13,9 +19,11 @@ from apps.food_diary.base import (
 )
 from apps.food_diary.models import Meal
 from apps.food_diary.schemas import (
+    DishCreateIn,
     MealCreateIn,
     MealUpdateIn,
     MealsResponse,
+    normalize_meal_type,
 )
 from apps.accounts.models import PatientProfile
 from apps.food_diary.sql_repository import MealRepository
@@ -133,38 +141,46 @@ class MealService:
     @staticmethod
     def get_meal_by_photo(
         patient: PatientProfile,
-        images_bytes: List[bytes],
+        images_bytes: List[ImageSource],
         name: str = None,
-        timeout: int = 2,
+        timeout: Optional[float] = None,
     ) -> CreateMealSuccessResponse:
         """
         Создать новый прием пищи по фото, используя create_meal
 
         Args:
             patient: Профиль пациента
-            images_bytes: Список изображений в виде байтов
+            images_bytes: Список изображений (байты или загруженные файлы)
             name: Название приема пищи (опционально)
-            timeout: таймаут запроса к AI
+            timeout: бюджет всего запроса в секундах, от анализа до записи
+                в БД (по умолчанию LLM_REQUEST_DEADLINE)
         Returns:
             Созданный объект CreateMealSuccessResponse
 
         Raises:
             ValidationError: Если ошибка анализа фото или создания
         """
-        import asyncio
-        from asyncio import TimeoutError
+        llm_settings = get_llm_settings()
+        deadline = Deadline(timeout or llm_settings.request_deadline)
+        # Часть бюджета остается на запись в БД
+        analysis_deadline = deadline.reserve(llm_settings.deadline_db_reserve)
+
+        async def analyze() -> List[DishCreateIn]:
+            # Вызовы провайдера в очереди чередуются по пациентам
+            with analysis_deadline.scope(), request_scope(patient.pk):
+                return await get_food_analysis_service().analyze_food_image(
+                    images_bytes=images_bytes
+                )
 
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
             try:
-                task = asyncio.wait_for(
-                    food_analysis_service.analyze_food_image(images_bytes=images_bytes),
-                    timeout=timeout,
+                # Анализ выполняется в фоновом loop процесса: пулы соединений
+                # и клиенты провайдеров переиспользуются между запросами
+                dishes_data = run_sync(
+                    analysis_deadline.run(analyze(), stage="analysis")
                 )
-                dishes_data = loop.run_until_complete(task)
-            except TimeoutError:
-                logger.error(f"AI service timeout after {timeout} seconds")
+            except TimeoutError as e:
+                logger.error(f"AI service deadline exceeded: {e}")
                 raise ValidationError(
                     f"Food analysis service not responding. Please try again later"
                 )
@@ -172,9 +188,6 @@ class MealService:
                 logger.error(f"Error during AI analysis: {e}", exc_info=True)
                 raise ValidationError(f"Error analyzing photo: {str(e)}")
 
-            finally:
-                loop.close()
-
             if not dishes_data:
                 raise ValidationError("No dishes detected in the photo")
 
@@ -186,7 +199,13 @@ class MealService:
                 components=dishes_data,
             )
 
-            meal = MealService.create_meal(patient=patient, payload=meal_payload)
+            try:
+                deadline.check("db")
+            except TimeoutError:
+                raise ValidationError(
+                    f"Food analysis service not responding. Please try again later"
+                )
+            meal = MealRepository.create_meal(patient, meal_payload)
 
             logger.info(
                 f"Meal created from photo: {meal.id} with {len(dishes_data)} dishes"
@@ -202,5 +221,166 @@ class MealService:
             logger.error(f"Error creating meal from photo: {e}", exc_info=True)
             raise ValidationError(f"Error analyzing photo: {str(e)}")
 
+    @staticmethod
+    def get_meal_by_text(
+        patient: PatientProfile,
+        text: str,
+        name: str = None,
+        timeout: Optional[float] = None,
+    ) -> CreateMealSuccessResponse:
+        """
+        Создать новый прием пищи по текстовому описанию
+
+        Простые фрагменты ("200 г гречки") считаются по локальной таблице КБЖУ
+        без обращения к модели; в модель уходят только неразобранные.
+
+        Args:
+            patient: Профиль пациента
+            text: Описание приема пищи, например "200 г гречки, куриная грудка 150г"
+            name: Название приема пищи (опционально)
+            timeout: бюджет всего запроса в секундах
+                (по умолчанию LLM_REQUEST_DEADLINE)
+        Returns:
+            Созданный объект CreateMealSuccessResponse
+
+        Raises:
+            ValidationError: Если ошибка анализа описания или создания
+        """
+        llm_settings = get_llm_settings()
+        deadline = Deadline(timeout or llm_settings.request_deadline)
+        analysis_deadline = deadline.reserve(llm_settings.deadline_db_reserve)
+
+        async def analyze() -> List[DishCreateIn]:
+            with analysis_deadline.scope(), request_scope(patient.pk):
+                return await get_food_analysis_service().analyze_food_text(text)
+
+        try:
+            dishes_data = run_sync(analysis_deadline.run(analyze(), stage="analysis"))
+        except TimeoutError as e:
+            logger.error(f"AI service deadline exceeded: {e}")
+            raise ValidationError(
+                f"Food analysis service not responding. Please try again later"
+            )
+        except Exception as e:
+            logger.error(f"Error during text analysis: {e}", exc_info=True)
+            raise ValidationError(f"Error analyzing text: {str(e)}")
+
+        if not dishes_data:
+            raise ValidationError("No dishes detected in the text")
+
+        try:
+            now = timezone.now()
+            meal_payload = MealCreateIn(
+                name=name,
+                meal_date=now.date(),
+                meal_time=now.time(),
+                components=dishes_data,
+            )
+            meal = MealRepository.create_meal(patient, meal_payload)
+
+            logger.info(
+                f"Meal created from text: {meal.id} with {len(dishes_data)} dishes"
+            )
+            response_data = MealsResponse(components=[meal])
+            return CreateMealSuccessResponse(
+                success=True, message="Meal created successfully", data=response_data
+            )
+
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Error creating meal from text: {e}", exc_info=True)
+            raise ValidationError(f"Error analyzing text: {str(e)}")
+
+    @staticmethod
+    def astream_meal_by_photo(
+        patient: PatientProfile,
+        images_bytes: List[ImageSource],
+        name: str = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Создать прием пищи по фото, отдавая события по мере анализа
+
+        Название проверяется сразу при вызове, до начала потока: ошибка
+        возвращается обычным ответом, а не событием error после блюд.
+
+        Args:
+            patient: Профиль пациента
+            images_bytes: Список изображений (байты или загруженные файлы)
+            name: Название приема пищи (опционально)
+        Returns:
+            Асинхронный итератор пар (событие, данные): uploaded, analyzing,
+            dish на каждое распознанное блюдо, meal с id сохраненного приема
+            пищи или error при ошибке
+
+        Raises:
+            ValidationError: Если название приема пищи недопустимо
+        """
+        try:
+            name = normalize_meal_type(name)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        return MealService._astream_meal_by_photo(patient, images_bytes, name)
+
+    @staticmethod
+    async def _astream_meal_by_photo(
+        patient: PatientProfile,
+        images_bytes: List[ImageSource],
+        name: Optional[str],
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """События создания приема пищи по фото (см. astream_meal_by_photo)"""
+        llm_settings = get_llm_settings()
+        deadline = Deadline(llm_settings.request_deadline)
+        analysis_deadline = deadline.reserve(llm_settings.deadline_db_reserve)
+
+        yield "uploaded", {"photos": len(images_bytes)}
+        yield "analyzing", {}
+
+        dishes_data = []
+        try:
+            with analysis_deadline.scope(), request_scope(patient.pk):
+                dishes = get_food_analysis_service().astream_food_image(
+                    images_bytes=images_bytes
+                )
+                async for dish in analysis_deadline.iterate(dishes, stage="analysis"):
+                    dishes_data.append(dish)
+                    yield "dish", dish.model_dump()
+        except Exception as e:
+            logger.error(f"Error during AI analysis: {e}", exc_info=True)
+            yield "error", {
+                "error": "Validation error",
+                "detail": f"Error analyzing photo: {e}",
+            }
+            return
+
+        if not dishes_data:
+            yield "error", {
+                "error": "Validation error",
+                "detail": "No dishes detected in the photo",
+            }
+            return
+
+        now = timezone.now()
+        try:
+            deadline.check("db")
+            meal_payload = MealCreateIn(
+                name=name,
+                meal_date=now.date(),
+                meal_time=now.time(),
+                components=dishes_data,
+            )
+            meal = await sync_to_async(MealRepository.create_meal)(
+                patient, meal_payload
+            )
+        except Exception as e:
+            logger.error(f"Error creating meal from photo: {e}", exc_info=True)
+            yield "error", {"error": "Validation error", "detail": str(e)}
+            return
+
+        logger.info(
+            f"Meal created from photo: {meal.id} with {len(dishes_data)} dishes"
+        )
+        yield "meal", {"meal_id": str(meal.id), "dishes": len(dishes_data)}
+
 
 meal_service = MealService(meal_repository=MealRepository())
@@ -7,6 +7,18 @@ from pydantic import Field, field_validator, ConfigDict
 from .models import Meal
 
 
+def normalize_meal_type(v: t.Optional[str]) -> t.Optional[str]:
+    """
+    Проверить тип приема пищи и привести к нижнему регистру.
+    None остается None: тип определится по времени при сохранении.
+    """
+    if v is None:
+        return v
+    if v.lower() not in Meal.MealTypes.values:
+        raise ValueError(f"meal_name must be one of {Meal.MealTypes.values}")
+    return v.lower()
+
+
 class DishBaseIn(Schema):
     """Базовая схема блюда"""
 
@@ -57,10 +69,8 @@ class MealBaseIn(Schema):
     )
 
     @field_validator("name")
-    def validate_meal_type(cls, v: str):
-        if v.lower() not in Meal.MealTypes.values:
-            raise ValueError(f"meal_name must be one of {Meal.MealTypes.values}")
-        return v.lower()
+    def validate_meal_type(cls, v: t.Optional[str]):
+        return normalize_meal_type(v)
 
 
 class MealCreateIn(MealBaseIn):
@@ -69,6 +79,28 @@ class MealCreateIn(MealBaseIn):
     pass
 
 
+class MealTextIn(Schema):
+    """Создание приема пищи по текстовому описанию"""
+
+    text: str = Field(
+        ...,
+        min_length=1,
+        max_length=2000,
+        description='Описание съеденного, например "200 г гречки, куриная грудка 150г"',
+    )
+    name: t.Optional[str] = Field(None, description="Завтрак, обед, ужин, перекус")
+
+    @field_validator("text")
+    def validate_text(cls, v: str):
+        if not v.strip():
+            raise ValueError("text must not be blank")
+        return v.strip()
+
+    @field_validator("name")
+    def validate_meal_type(cls, v: t.Optional[str]):
+        return normalize_meal_type(v)
+
+
 class MealUpdateIn(Schema):
     """Обновление приема пищи (все опционально)"""
 
@@ -79,10 +111,8 @@ class MealUpdateIn(Schema):
     components: t.Optional[list[DishCreateIn]] = Field(None, description="Список блюд")
 
     @field_validator("name")
-    def validate_meal_type(cls, v: str):
-        if v.lower() not in Meal.MealTypes.values:
-            raise ValueError(f"meal_name must be one of {Meal.MealTypes.values}")
-        return v.lower()
+    def validate_meal_type(cls, v: t.Optional[str]):
+        return normalize_meal_type(v)
 
 
 class MealOut(Schema):
@@ -11,6 +11,7 @@ from apps.food_diary.schemas import (
     DishOut,
     MealBaseIn,
     MealCreateIn,
+    MealTextIn,
     MealUpdateIn,
     MealOut,
     MealsResponse,
@@ -237,6 +238,23 @@ class TestMealSchemas:
         assert meal.name == "завтрак"
         assert isinstance(meal, MealBaseIn)
 
+    def test_meal_name_explicit_none(self):
+        """Тест явно переданного пустого имени: название определится по времени"""
+        components = [
+            {
+                "name": "Гречка",
+                "weight": 200,
+                "calories": 220,
+                "protein": 8,
+                "fat": 2,
+                "carbohydrates": 42,
+            }
+        ]
+
+        assert MealCreateIn(name=None, components=components).name is None
+        assert MealTextIn(text="200 г гречки", name=None).name is None
+        assert MealUpdateIn(id=uuid.uuid4(), name=None).name is None
+
     def test_meal_update_in_valid(self):
         """Тест валидной схемы обновления"""
         data = {
@@ -1,9 +1,18 @@
+import asyncio
 import pytest
 import datetime
-from unittest.mock import patch, AsyncMock
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, AsyncMock, MagicMock
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 
+from ai_agent import FoodAnalysisService
+from ai_agent.client import provider_clients
+from ai_agent.config import get_llm_settings
+from ai_agent.deadline import Deadline, DeadlineExceeded
+from ai_agent.fake_provider import FakeLLM
+from ai_agent.runner import background_loop
 from apps.food_diary.core import MealService
 from apps.food_diary.schemas import MealCreateIn, MealUpdateIn, DishCreateIn
 
@@ -133,67 +142,311 @@ class TestMealService:
             mock_get.assert_called_once()
             assert result == mock_meal
 
-    @pytest.mark.asyncio
-    async def test_get_meal_by_photo_success(
-        self, mock_patient, mock_dishes_data, mock_meal
-    ):
+    @staticmethod
+    def photo_service(dishes=(), error=None, delay=0):
+        """Мок сервиса анализа фото"""
+
+        async def analyze_food_image(images_bytes):
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return list(dishes)
+
+        service = MagicMock()
+        service.analyze_food_image = AsyncMock(side_effect=analyze_food_image)
+        return service
+
+    def test_get_meal_by_photo_success(self, mock_patient, mock_dishes_data, mock_meal):
         """Тест успешного создания приема пищи по фото"""
         image_bytes = b"fake_image_data"
+        service = self.photo_service(
+            [DishCreateIn(**dish) for dish in mock_dishes_data]
+        )
 
         with patch(
-            "apps.food_diary.services.food_analysis_service.analyze_food_image",
-            new_callable=AsyncMock,
-        ) as mock_analyze, patch(
-            "apps.food_diary.services.MealService.create_meal"
-        ) as mock_create_meal:
-            mock_analyze.return_value = [
-                DishCreateIn(**dish) for dish in mock_dishes_data
-            ]
-            mock_create_meal.return_value = mock_meal
-
-            result = await MealService.get_meal_by_photo(
-                patient=mock_patient, image_bytes=image_bytes, name="ужин"
+            "apps.food_diary.core.get_food_analysis_service", return_value=service
+        ), patch(
+            "apps.food_diary.core.MealRepository.create_meal", return_value=mock_meal
+        ) as mock_create_meal, patch(
+            "apps.food_diary.core.MealsResponse"
+        ), patch(
+            "apps.food_diary.core.CreateMealSuccessResponse"
+        ) as mock_response:
+            result = MealService.get_meal_by_photo(
+                patient=mock_patient, images_bytes=[image_bytes], name="ужин"
             )
 
-            mock_analyze.assert_called_once_with(image=image_bytes)
-            mock_create_meal.assert_called_once()
-            assert result == mock_meal
+        assert result == mock_response.return_value
+        service.analyze_food_image.assert_awaited_once_with(images_bytes=[image_bytes])
+        mock_create_meal.assert_called_once()
+        meal_payload = mock_create_meal.call_args.args[1]
+        assert meal_payload.name == "ужин"
+        assert len(meal_payload.components) == len(mock_dishes_data)
 
-    @pytest.mark.asyncio
-    async def test_get_meal_by_photo_no_dishes(self, mock_patient):
+    def test_get_meal_by_photo_no_dishes(self, mock_patient):
         """Тест ошибки при отсутствии блюд на фото"""
-        image_bytes = b"fake_image_data"
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=self.photo_service([]),
+        ), patch("apps.food_diary.core.MealRepository.create_meal") as mock_create:
+            with pytest.raises(ValidationError) as exc:
+                MealService.get_meal_by_photo(
+                    patient=mock_patient, images_bytes=[b"fake_image_data"]
+                )
+
+        assert "No dishes detected" in str(exc.value)
+        mock_create.assert_not_called()
 
+    def test_get_meal_by_photo_analysis_error(self, mock_patient):
+        """Тест ошибки при анализе фото"""
         with patch(
-            "apps.food_diary.services.food_analysis_service.analyze_food_image",
-            new_callable=AsyncMock,
-        ) as mock_analyze:
-            mock_analyze.return_value = []
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=self.photo_service(error=Exception("API error")),
+        ), patch("apps.food_diary.core.MealRepository.create_meal") as mock_create:
+            with pytest.raises(ValidationError) as exc:
+                MealService.get_meal_by_photo(
+                    patient=mock_patient, images_bytes=[b"fake_image_data"]
+                )
 
+        assert "Error analyzing photo" in str(exc.value)
+        mock_create.assert_not_called()
+
+    def test_get_meal_by_photo_deadline_during_analysis(
+        self, mock_patient, mock_dishes_data, monkeypatch
+    ):
+        """Тест: анализ не уложился в бюджет - ошибка без записи в БД"""
+        monkeypatch.setenv("LLM_DEADLINE_DB_RESERVE", "0.05")
+        get_llm_settings.cache_clear()
+        service = self.photo_service(
+            [DishCreateIn(**dish) for dish in mock_dishes_data], delay=5
+        )
+
+        try:
+            with patch(
+                "apps.food_diary.core.get_food_analysis_service",
+                return_value=service,
+            ), patch("apps.food_diary.core.MealRepository.create_meal") as mock_create:
+                started = time.monotonic()
+                with pytest.raises(ValidationError) as exc:
+                    MealService.get_meal_by_photo(
+                        patient=mock_patient,
+                        images_bytes=[b"fake_image_data"],
+                        timeout=0.2,
+                    )
+        finally:
+            get_llm_settings.cache_clear()
+
+        assert "Food analysis service not responding" in str(exc.value)
+        # Анализ прерван по дедлайну, а не дождался ответа
+        assert time.monotonic() - started < 1
+        service.analyze_food_image.assert_awaited_once()
+        mock_create.assert_not_called()
+
+    def test_get_meal_by_photo_db_reserve_exhausted(
+        self, mock_patient, mock_dishes_data
+    ):
+        """Тест: на запись в БД не осталось бюджета - прием пищи не сохраняется"""
+        check = Deadline.check
+
+        def check_db(deadline, stage):
+            if stage == "db":
+                raise DeadlineExceeded(stage)
+            check(deadline, stage)
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=self.photo_service(
+                [DishCreateIn(**dish) for dish in mock_dishes_data]
+            ),
+        ), patch(
+            "apps.food_diary.core.Deadline.check", autospec=True, side_effect=check_db
+        ), patch(
+            "apps.food_diary.core.MealRepository.create_meal"
+        ) as mock_create:
             with pytest.raises(ValidationError) as exc:
-                await MealService.get_meal_by_photo(
-                    patient=mock_patient, image_bytes=image_bytes
+                MealService.get_meal_by_photo(
+                    patient=mock_patient, images_bytes=[b"fake_image_data"]
                 )
 
-            assert "No dishes detected" in str(exc.value)
+        assert "Food analysis service not responding" in str(exc.value)
+        mock_create.assert_not_called()
+
+    @staticmethod
+    def stream_service(dishes=(), error=None):
+        """Мок сервиса анализа с потоковой выдачей блюд"""
+
+        async def astream_food_image(images_bytes):
+            for dish in dishes:
+                yield dish
+            if error:
+                raise error
+
+        service = MagicMock()
+        service.astream_food_image = astream_food_image
+        return service
 
     @pytest.mark.asyncio
-    async def test_get_meal_by_photo_analysis_error(self, mock_patient):
-        """Тест ошибки при анализе фото"""
-        image_bytes = b"fake_image_data"
+    async def test_astream_meal_by_photo_success(
+        self, mock_patient, mock_dishes_data, mock_meal
+    ):
+        """Тест потоковой выдачи событий при создании приема пищи по фото"""
+        dishes = [DishCreateIn(**dish) for dish in mock_dishes_data]
 
         with patch(
-            "apps.food_diary.services.food_analysis_service.analyze_food_image",
-            new_callable=AsyncMock,
-        ) as mock_analyze:
-            mock_analyze.side_effect = Exception("API error")
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=self.stream_service(dishes),
+        ), patch(
+            "apps.food_diary.core.MealRepository.create_meal", return_value=mock_meal
+        ) as mock_create_meal:
+            events = [
+                event
+                async for event in MealService.astream_meal_by_photo(
+                    patient=mock_patient,
+                    images_bytes=[b"fake_image_data"],
+                    name="ужин",
+                )
+            ]
+
+        assert [name for name, _ in events] == (
+            ["uploaded", "analyzing"] + ["dish"] * len(dishes) + ["meal"]
+        )
+        assert events[2][1] == dishes[0].model_dump()
+        assert events[-1][1] == {"meal_id": str(mock_meal.id), "dishes": len(dishes)}
+        mock_create_meal.assert_called_once()
 
+    def test_astream_meal_by_photo_invalid_name(self, mock_patient):
+        """Тест: недопустимое название отклоняется до начала потока"""
+        service = MagicMock()
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service", return_value=service
+        ):
             with pytest.raises(ValidationError) as exc:
-                await MealService.get_meal_by_photo(
-                    patient=mock_patient, image_bytes=image_bytes
+                MealService.astream_meal_by_photo(
+                    patient=mock_patient,
+                    images_bytes=[b"fake_image_data"],
+                    name="полдник",
                 )
 
-            assert "Error analyzing photo" in str(exc.value)
+        assert "meal_name must be one of" in str(exc.value)
+        service.astream_food_image.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_astream_meal_by_photo_analysis_error(
+        self, mock_patient, mock_dishes_data
+    ):
+        """Тест события ошибки при сбое анализа посреди потока"""
+        dishes = [DishCreateIn(**mock_dishes_data[0])]
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=self.stream_service(dishes, error=Exception("API error")),
+        ), patch(
+            "apps.food_diary.core.MealRepository.create_meal"
+        ) as mock_create_meal:
+            events = [
+                event
+                async for event in MealService.astream_meal_by_photo(
+                    patient=mock_patient, images_bytes=[b"fake_image_data"]
+                )
+            ]
+
+        assert [name for name, _ in events] == [
+            "uploaded",
+            "analyzing",
+            "dish",
+            "error",
+        ]
+        assert "Error analyzing photo" in events[-1][1]["detail"]
+        mock_create_meal.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_astream_meal_by_photo_no_dishes(self, mock_patient):
+        """Тест события ошибки при отсутствии блюд на фото"""
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=self.stream_service(),
+        ):
+            events = [
+                event
+                async for event in MealService.astream_meal_by_photo(
+                    patient=mock_patient, images_bytes=[b"fake_image_data"]
+                )
+            ]
+
+        assert events[-1] == (
+            "error",
+            {"error": "Validation error", "detail": "No dishes detected in the photo"},
+        )
+
+    def test_get_meal_by_text_success(self, mock_patient, mock_dishes_data, mock_meal):
+        """Тест создания приема пищи по текстовому описанию"""
+        service = MagicMock()
+        service.analyze_food_text = AsyncMock(
+            return_value=[DishCreateIn(**dish) for dish in mock_dishes_data]
+        )
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service", return_value=service
+        ), patch(
+            "apps.food_diary.core.MealRepository.create_meal", return_value=mock_meal
+        ) as mock_create_meal, patch(
+            "apps.food_diary.core.MealsResponse"
+        ), patch(
+            "apps.food_diary.core.CreateMealSuccessResponse"
+        ) as mock_response:
+            result = MealService.get_meal_by_text(
+                patient=mock_patient,
+                text="200 г гречки, куриная грудка 150г",
+                name="обед",
+            )
+
+        assert result == mock_response.return_value
+        service.analyze_food_text.assert_awaited_once_with(
+            "200 г гречки, куриная грудка 150г"
+        )
+        meal_payload = mock_create_meal.call_args.args[1]
+        assert meal_payload.name == "обед"
+        assert len(meal_payload.components) == len(mock_dishes_data)
+
+    def test_get_meal_by_text_without_name(
+        self, mock_patient, mock_dishes_data, mock_meal
+    ):
+        """Тест создания приема пищи по тексту без названия"""
+        service = MagicMock()
+        service.analyze_food_text = AsyncMock(
+            return_value=[DishCreateIn(**dish) for dish in mock_dishes_data]
+        )
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service", return_value=service
+        ), patch(
+            "apps.food_diary.core.MealRepository.create_meal", return_value=mock_meal
+        ) as mock_create_meal, patch(
+            "apps.food_diary.core.MealsResponse"
+        ), patch(
+            "apps.food_diary.core.CreateMealSuccessResponse"
+        ) as mock_response:
+            result = MealService.get_meal_by_text(
+                patient=mock_patient, text="200 г гречки", name=None
+            )
+
+        assert result == mock_response.return_value
+        # Название по времени приема пищи подставит репозиторий
+        assert mock_create_meal.call_args.args[1].name is None
+
+    def test_get_meal_by_text_no_dishes(self, mock_patient):
+        """Тест ошибки, когда в описании не найдено блюд"""
+        service = MagicMock()
+        service.analyze_food_text = AsyncMock(return_value=[])
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service", return_value=service
+        ):
+            with pytest.raises(ValidationError) as exc:
+                MealService.get_meal_by_text(patient=mock_patient, text="что-то")
+
+        assert "No dishes detected" in str(exc.value)
 
     def test_get_meals_by_date_range_and_type(self, mock_patient, mock_meals_queryset):
         """Тест получения приемов пищи с фильтрацией по типу"""
@@ -214,3 +467,64 @@ class TestMealService:
 
             assert result == mock_meals_queryset
             mock_filter.assert_called_once_with(patient=mock_patient)
+
+
+@pytest.mark.django_db
+class TestMealServiceFakeProvider:
+    """Тесты MealService с фейковым провайдером через фоновый event loop"""
+
+    @pytest.fixture
+    def fake_provider(self, monkeypatch):
+        """Цепочка из фейкового провайдера без задержки, пустой реестр клиентов"""
+        monkeypatch.setenv("ACTIVE_LLM_PROVIDER", "fake")
+        monkeypatch.setenv("LLM_PROVIDER_CHAIN", "fake")
+        monkeypatch.setenv("LLM_FAKE_LATENCY_MEAN", "0")
+        monkeypatch.setenv("LLM_FAKE_FAILURE_RATE", "0")
+        get_llm_settings.cache_clear()
+        provider_clients.clear()
+        yield
+        provider_clients.clear()
+        get_llm_settings.cache_clear()
+
+    def test_get_meal_by_photo_from_worker_thread(
+        self, fake_provider, mock_patient, mock_meal
+    ):
+        """
+        Тест: синхронный вызов из рабочих потоков получает результат,
+        а клиент провайдера и event loop переиспользуются между вызовами
+        """
+        calls = []
+        astream = FakeLLM.astream
+
+        def record_astream(client, images):
+            calls.append((client, asyncio.get_running_loop()))
+            return astream(client, images)
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=FoodAnalysisService(),
+        ), patch.object(FakeLLM, "astream", record_astream), patch(
+            "apps.food_diary.core.MealRepository.create_meal", return_value=mock_meal
+        ) as mock_create_meal, patch(
+            "apps.food_diary.core.MealsResponse"
+        ), patch(
+            "apps.food_diary.core.CreateMealSuccessResponse"
+        ) as mock_response:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = [
+                    executor.submit(
+                        MealService.get_meal_by_photo,
+                        patient=mock_patient,
+                        images_bytes=[f"photo_{number}".encode()],
+                        name="обед",
+                    ).result(timeout=10)
+                    for number in range(2)
+                ]
+
+        assert results == [mock_response.return_value] * 2
+        assert mock_create_meal.call_count == 2
+        for create_call in mock_create_meal.call_args_list:
+            assert create_call.args[1].components
+        (first_client, first_loop), (second_client, second_loop) = calls
+        assert first_client is second_client
+        assert first_loop is second_loop is background_loop.loop
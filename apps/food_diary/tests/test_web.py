@@ -0,0 +1,116 @@
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from apps.food_diary.models import Meal
+from apps.food_diary.schemas import DishCreateIn
+
+PHOTO_URL = "/api/app/v1/food_diary/photo"
+STREAM_URL = "/api/app/v1/food_diary/photo/stream"
+
+
+def photo() -> SimpleUploadedFile:
+    """Резкое фото средней яркости: проходит предварительную проверку"""
+    pixels = np.random.default_rng(0).integers(40, 220, (200, 200, 3))
+    output = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(output, format="JPEG")
+    return SimpleUploadedFile("lunch.jpg", output.getvalue(), content_type="image/jpeg")
+
+
+def stream_service(dishes):
+    """Мок сервиса анализа с потоковой выдачей блюд"""
+
+    async def astream_food_image(images_bytes):
+        for dish in dishes:
+            yield dish
+
+    service = MagicMock()
+    service.astream_food_image = astream_food_image
+    return service
+
+
+def parse_events(body: str) -> list:
+    """Разобрать Server-Sent Events в пары (событие, данные)"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+@pytest.mark.django_db
+class TestPhotoEndpoint:
+    """Тесты для загрузки фото приема пищи"""
+
+    def test_unreadable_photo_code(self, client):
+        """Тест: непригодное фото отклоняется до анализа с кодом причины"""
+        photo = SimpleUploadedFile(
+            "lunch.jpg", b"not an image", content_type="image/jpeg"
+        )
+
+        response = client.post(PHOTO_URL, {"photos": [photo]})
+
+        assert response.status_code == 400
+        body = response.json()
+        assert body["code"] == "photo_unreadable"
+        assert body["detail"] == "Photo could not be decoded"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPhotoStreamEndpoint:
+    """Тесты для потоковой загрузки фото приема пищи"""
+
+    @pytest.mark.asyncio
+    async def test_stream_without_meal_type(self, async_client, mock_dishes_data):
+        """Тест: без meal_type прием пищи сохраняется с типом по времени"""
+        dishes = [DishCreateIn(**dish) for dish in mock_dishes_data]
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service",
+            return_value=stream_service(dishes),
+        ):
+            response = await async_client.post(STREAM_URL, {"photos": [photo()]})
+            body = b"".join(
+                [chunk async for chunk in response.streaming_content]
+            ).decode()
+
+        assert response.status_code == 200
+        events = parse_events(body)
+        assert [event for event, _ in events] == (
+            ["uploaded", "analyzing"] + ["dish"] * len(dishes) + ["meal"]
+        )
+        meal = await Meal.objects.aget(id=events[-1][1]["meal_id"])
+        assert meal.name in Meal.MealTypes.values
+
+    @pytest.mark.asyncio
+    async def test_invalid_meal_type_before_stream(self, async_client):
+        """Тест: недопустимый meal_type - ответ 400 до начала анализа"""
+        service = MagicMock()
+
+        with patch(
+            "apps.food_diary.core.get_food_analysis_service", return_value=service
+        ):
+            response = await async_client.post(
+                f"{STREAM_URL}?meal_type=полдник", {"photos": [photo()]}
+            )
+
+        assert response.status_code == 400
+        assert "meal_name must be one of" in response.json()["detail"]
+        service.astream_food_image.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unreadable_photo_code(self, async_client):
+        """Тест: непригодное фото отклоняется с кодом причины"""
+        photo = SimpleUploadedFile(
+            "lunch.jpg", b"not an image", content_type="image/jpeg"
+        )
+
+        response = await async_client.post(STREAM_URL, {"photos": [photo]})
+
+        assert response.status_code == 400
+        assert response.json()["code"] == "photo_unreadable"
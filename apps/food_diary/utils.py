@@ -1,5 +1,7 @@
 from datetime import time
 import functools
+import inspect
+import logging
 
 from django.core.cache import cache
 from django.http import Http404
@@ -14,6 +16,8 @@ from apps.food_diary.base import (
 from apps.food_diary.models import MealTimeSlot
 from apps.food_diary.models import Meal
 
+logger = logging.getLogger(__name__)
+
 
 def get_meal_name_by_time(timestamp: time) -> str:
     """
@@ -44,53 +48,70 @@ def get_meal_name_by_time(timestamp: time) -> str:
     return Meal.MealTypes.SNACK
 
 
+def _error_response(error: Exception, kwargs: dict) -> tuple:
+    """
+    Сопоставить исключение роута коду и схеме ответа
+    """
+    if isinstance(error, ValidationError):
+        return 400, ValidationErrorResponse(
+            error="Validation error",
+            detail=error.message,
+            field_errors=getattr(error, "message_dict", None),
+        )
+    if isinstance(error, PermissionError):
+        return 403, ErrorResponse(
+            error="Permission denied",
+            detail="You don't have permission to view meals",
+        )
+    if isinstance(error, IntegrityError) and "unique constraint" in str(error).lower():
+        return 409, ErrorResponse(
+            error="Conflict",
+            detail="A meal with these parameters already exists",
+        )
+    if isinstance(error, Http404):
+        return 404, NotFoundResponse(
+            error="Not found",
+            detail=f"Meal with id {kwargs.get("meal_id") or kwargs.get("payload").id} not found",
+        )
+    if (
+        isinstance(error, OperationalError)
+        and "database is locked" in str(error).lower()
+    ):
+        return 503, ErrorResponse(
+            error="Database busy",
+            detail="The database is currently locked. Please try again.",
+        )
+
+    logger.error(f"Unexpected error in create_meal: {error}", exc_info=error)
+    return 500, ErrorResponse(
+        error="Internal server error", detail="An unexpected error occurred"
+    )
+
+
 def errors_normalized():
     """
     Декоратор для отлавливания и выдачи ошибок в роуты
+    (синхронные и асинхронные)
     """
 
     def decorator(f):
+        if inspect.iscoroutinefunction(f):
+
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await f(*args, **kwargs)
+                except Exception as e:
+                    return _error_response(e, kwargs)
+
+            return async_wrapper
+
         @functools.wraps(f)
         def wrapper(*args, **kwargs):
             try:
                 return f(*args, **kwargs)
-            except ValidationError as e:
-                return 400, ValidationErrorResponse(
-                    error="Validation error",
-                    detail=e.message,
-                    field_errors=getattr(e, "message_dict", None),
-                )
-            except PermissionError:
-                return 403, ErrorResponse(
-                    error="Permission denied",
-                    detail="You don't have permission to view meals",
-                )
-            except IntegrityError as e:
-                if "unique constraint" in str(e).lower():
-                    return 409, ErrorResponse(
-                        error="Conflict",
-                        detail="A meal with these parameters already exists",
-                    )
-            except Http404:
-                return 404, NotFoundResponse(
-                    error="Not found",
-                    detail=f"Meal with id {kwargs.get("meal_id") or kwargs.get("payload").id} not found",
-                )
-            except OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    return 503, ErrorResponse(
-                        error="Database busy",
-                        detail="The database is currently locked. Please try again.",
-                    )
             except Exception as e:
-                import logging
-
-                logger = logging.getLogger(__name__)
-                logger.error(f"Unexpected error in create_meal: {e}", exc_info=True)
-
-                return 500, ErrorResponse(
-                    error="Internal server error", detail="An unexpected error occurred"
-                )
+                return _error_response(e, kwargs)
 
         return wrapper
 
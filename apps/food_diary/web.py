@@ -11,15 +11,24 @@ from apps.food_diary.base import (
     GetMealsSuccessResponse,
 )
 from apps.food_diary.models import Meal
-from apps.food_diary.schemas import MealCreateIn, MealUpdateIn, MealsResponse
+from apps.food_diary.schemas import (
+    MealCreateIn,
+    MealTextIn,
+    MealUpdateIn,
+    MealsResponse,
+)
 from apps.food_diary.core import MealService, meal_service
 from apps.accounts.models import PatientProfile
 from ninja import Router, Query, UploadedFile, File
-from django.http import HttpRequest
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, StreamingHttpResponse
+import asyncio
 import datetime
+import json
 from typing import Optional, List
 
 from apps.food_diary.utils import errors_normalized
+from ai_agent.prescreen import screen_photo
 
 
 # Хелпер для получения профиля пациента
@@ -44,6 +53,40 @@ def _get_patient_profile(request: HttpRequest) -> PatientProfile:
     return patient
 
 
+def _validate_photos(photos: List[UploadedFile]) -> Optional[tuple]:
+    """
+    Проверить размер, формат и пригодность загруженных фото для распознавания
+    (размытые, черные, засвеченные кадры и скриншоты отклоняются до вызова LLM).
+    Возвращает (код, ErrorResponse) для первой ошибки или None.
+    """
+    for photo in photos:
+        if photo.size > 10 * 1024 * 1024:  # 10MB
+            return 413, ErrorResponse(
+                error="Validation error",
+                detail="Photo size should not exceed 10MB",
+            )
+
+        if photo.content_type not in ["image/jpeg", "image/png", "image/webp"]:
+            return 400, ErrorResponse(
+                error="Validation error",
+                detail="Only JPEG, PNG and WEBP images are allowed",
+            )
+
+        rejection = screen_photo(photo)
+        if rejection is not None:
+            return 400, ErrorResponse(
+                error="Validation error",
+                detail=rejection.detail,
+                code=f"photo_{rejection.code}",
+            )
+    return None
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Сформировать событие Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 # СОЗДАЕМ ЗАЩИЩЕННЫЙ РОУТЕР
 user_routers = Router(tags=["food_fairy"])
 
@@ -80,20 +123,12 @@ def create_meals_by_photo(
     """
 
     patient = _get_patient_profile(request)
-    for photo in photos:
-        if photo.size > 10 * 1024 * 1024:  # 10MB
-            return 413, ErrorResponse(
-                error="Validation error",
-                detail="Photo size should not exceed 10MB",
-            )
-
-        if photo.content_type not in ["image/jpeg", "image/png", "image/webp"]:
-            return 400, ErrorResponse(
-                error="Validation error",
-                detail="Only JPEG, PNG and WEBP images are allowed",
-            )
+    photos_error = _validate_photos(photos)
+    if photos_error:
+        return photos_error
 
-    images_bytes = [photo for photo in photos]
+    # Передаем UploadedFile как есть: содержимое читается потоково в ai_agent
+    images_bytes = list(photos)
 
     create_meal_success_response = MealService.get_meal_by_photo(
         patient=patient,
@@ -103,6 +138,97 @@ def create_meals_by_photo(
     return 201, create_meal_success_response
 
 
+@user_routers.post(
+    "/text",
+    response={
+        201: CreateMealSuccessResponse,
+        400: ValidationErrorResponse,
+        403: ErrorResponse,
+        500: ErrorResponse,
+    },
+)
+@errors_normalized()
+def create_meal_by_text(request: HttpRequest, payload: MealTextIn):
+    """
+    Создать прием пищи по текстовому описанию
+
+    Простые записи вида "200 г гречки, куриная грудка 150г" считаются
+    по локальной таблице КБЖУ без обращения к модели.
+
+    Returns:
+        201: Meal created successfully
+        400: Validation error (пустое описание или блюда не распознаны)
+        500: Internal server error
+    """
+    patient = _get_patient_profile(request)
+
+    create_meal_success_response = MealService.get_meal_by_text(
+        patient=patient,
+        name=payload.name,
+        text=payload.text,
+    )
+    return 201, create_meal_success_response
+
+
+@user_routers.post(
+    "/photo/stream",
+    response={
+        200: None,
+        400: ValidationErrorResponse,
+        403: ErrorResponse,
+        413: ErrorResponse,
+        500: ErrorResponse,
+    },
+)
+@errors_normalized()
+async def create_meals_by_photo_stream(
+    request: HttpRequest,
+    photos: List[UploadedFile] = File(),
+    meal_type: Optional[str] = Query(None, alias="meal_type"),
+):
+    """
+    Загрузить фото и получать распознанные блюда потоком (Server-Sent Events)
+
+    События:
+    - uploaded: фото приняты ({"photos": n})
+    - analyzing: начат анализ
+    - dish: распознанное блюдо (DishCreateIn), по одному на событие
+    - meal: прием пищи сохранен ({"meal_id": ..., "dishes": n})
+    - error: ошибка анализа или сохранения ({"error": ..., "detail": ...})
+
+    Под ASGI поток обслуживается event loop сервера, без выделенного потока
+    на соединение.
+
+    Returns:
+        200: text/event-stream
+        400: Bad request - ошибка валидации (фото или meal_type)
+        403: Permission denied
+        413: File too large - файл слишком большой
+        500: Internal server error
+    """
+    # Предварительная проверка декодирует фото: вне event loop сервера
+    photos_error = await asyncio.to_thread(_validate_photos, photos)
+    if photos_error:
+        return photos_error
+
+    patient = await sync_to_async(_get_patient_profile)(request)
+    # Ошибка meal_type возвращается ответом 400 до начала потока
+    stream = MealService.astream_meal_by_photo(
+        patient=patient,
+        name=meal_type,
+        images_bytes=list(photos),
+    )
+
+    async def events():
+        async for event, data in stream:
+            yield _sse_event(event, data)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @user_routers.post(
     "",
     response={
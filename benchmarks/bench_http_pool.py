@@ -0,0 +1,150 @@
+# benchmarks/bench_http_pool.py
+# !/usr/bin/env python
+"""
+Бенчмарк keep-alive пулов соединений против локальной HTTPS заглушки.
+
+Сравнивает новый httpx клиент на каждый запрос (как при новом event loop
+на каждое фото) с долгоживущим клиентом из HTTPPoolRegistry.
+Сертификат заглушки генерируется через openssl.
+
+Запуск:
+    python benchmarks/bench_http_pool.py --requests 200
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from ai_agent.http_pool import HTTPPoolRegistry
+from ai_agent.metrics import metrics
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Заглушка провайдера: отвечает JSON с keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"choices": [{"message": {"content": "[]"}}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_https_stub(directory: str) -> tuple[ThreadingHTTPServer, str]:
+    """Запускает HTTPS заглушку с самоподписанным сертификатом"""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-keyout",
+            key,
+            "-out",
+            cert,
+            "-days",
+            "1",
+            "-subj",
+            "/CN=127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubProviderHandler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://127.0.0.1:{server.server_address[1]}/chat/completions"
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def run_fresh(url: str, count: int) -> list[float]:
+    """Новый клиент (и TLS рукопожатие) на каждый запрос"""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        async with httpx.AsyncClient(verify=False) as client:
+            await client.post(url, json={"messages": []})
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run_pooled(registry: HTTPPoolRegistry, url: str, count: int) -> list[float]:
+    """Долгоживущий клиент из реестра пулов"""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        client = registry.async_client("stub", verify=False)
+        await client.post(url, json={"messages": []})
+        latencies.append(time.perf_counter() - started)
+    await registry.aclose()
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    total = sum(latencies)
+    print(
+        f"{name:>7}: p50={percentile(latencies, 50) * 1000:.2f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.2f}ms "
+        f"throughput={len(latencies) / total:.0f} req/s"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    registry = HTTPPoolRegistry(
+        lambda: {"max_connections": 10, "max_keepalive_connections": 10}
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        server, url = start_https_stub(directory)
+        try:
+            fresh = asyncio.run(run_fresh(url, args.requests))
+            pooled = asyncio.run(run_pooled(registry, url, args.requests))
+        finally:
+            server.shutdown()
+
+    report("fresh", fresh)
+    report("pooled", pooled)
+    print(
+        "pooled connections opened: "
+        f"{metrics.get('ai_agent_http_connections_total', pool='stub'):.0f}, "
+        f"TLS handshakes: "
+        f"{metrics.get('ai_agent_http_tls_handshakes_total', pool='stub'):.0f}, "
+        f"reuse ratio: "
+        f"{metrics.get('ai_agent_http_connection_reuse_ratio', pool='stub'):.3f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
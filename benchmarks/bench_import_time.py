@@ -0,0 +1,152 @@
+# benchmarks/bench_import_time.py
+# !/usr/bin/env python
+"""
+Бенчмарк времени импорта apps.food_diary.core по данным -X importtime.
+
+Сравнивает два запуска:
+    lazy - импорт дневника как при старте воркера (ai_agent ленивый)
+    eager - тот же импорт плюс модули, которые раньше импортировались
+        сразу: сервис и клиент ai_agent и SDK провайдеров (gigachat,
+        langchain); клиенты и настройки при этом не создаются
+Для каждого печатается общее время импорта и доля ai_agent вместе с SDK -
+модули учитываются на любой глубине вложенности (ai_agent импортируется
+внутри apps.food_diary.core). Падает, если SDK провайдеров снова
+импортируются при старте или время импорта превышает бюджет.
+
+Запуск:
+    python benchmarks/bench_import_time.py --max-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("gigachat", "langchain_openai", "langchain_core")
+
+# Модули, время которых относится к ai_agent (вместе с подмодулями)
+AI_AGENT_MODULES = ("ai_agent", *HEAVY_MODULES)
+
+DIARY_IMPORT = (
+    "import os, django;"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings');"
+    "django.setup();"
+    "import apps.food_diary.core"
+)
+
+EAGER_IMPORT = (
+    f"{DIARY_IMPORT};"
+    "import ai_agent.food_analysis_service, ai_agent.client;"
+    "import gigachat, langchain_core.messages, langchain_openai"
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+@dataclass
+class ImportNode:
+    """Импорт модуля и импорты, выполненные внутри него"""
+
+    module: str
+    cumulative: int  # мкс
+    depth: int
+    children: list["ImportNode"] = field(default_factory=list)
+
+
+def importtime(code: str) -> list[ImportNode]:
+    """
+    Выполняет код с -X importtime.
+
+    Returns:
+        Импорты верхнего уровня с деревом вложенных импортов
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Вложенные импорты печатаются перед родителем с большим отступом
+    stack: list[ImportNode] = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        node = ImportNode(module, int(cumulative), (len(indent) - 1) // 2)
+        while stack and stack[-1].depth > node.depth:
+            node.children.insert(0, stack.pop())
+        stack.append(node)
+    return stack
+
+
+def matches(module: str, names: tuple[str, ...]) -> bool:
+    return any(module == name or module.startswith(f"{name}.") for name in names)
+
+
+def total_ms(roots: list[ImportNode]) -> float:
+    """Общее кумулятивное время импортов в миллисекундах"""
+    return sum(root.cumulative for root in roots) / 1000
+
+
+def attributed_ms(roots: list[ImportNode], names: tuple[str, ...]) -> float:
+    """
+    Время импорта модулей names (и их подмодулей) на любой глубине
+    в миллисекундах; вложенные друг в друга модули учитываются один раз.
+    """
+
+    def visit(node: ImportNode) -> int:
+        if matches(node.module, names):
+            return node.cumulative
+        return sum(visit(child) for child in node.children)
+
+    return sum(visit(root) for root in roots) / 1000
+
+
+def imported(roots: list[ImportNode], name: str) -> bool:
+    """Был ли модуль импортирован на любой глубине"""
+    nodes = list(roots)
+    while nodes:
+        node = nodes.pop()
+        if node.module == name:
+            return True
+        nodes.extend(node.children)
+    return False
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=None,
+        help="Бюджет времени импорта apps.food_diary.core (мс)",
+    )
+    args = parser.parse_args()
+
+    lazy = importtime(DIARY_IMPORT)
+    eager = importtime(EAGER_IMPORT)
+
+    lazy_ms, eager_ms = total_ms(lazy), total_ms(eager)
+    leaked = [module for module in HEAVY_MODULES if imported(lazy, module)]
+
+    print(f"{'':<8}{'total_ms':>10}{'ai_agent_ms':>13}")
+    for name, roots in (("lazy", lazy), ("eager", eager)):
+        print(
+            f"{name:<8}{total_ms(roots):>10.1f}"
+            f"{attributed_ms(roots, AI_AGENT_MODULES):>13.1f}"
+        )
+    print(f"saved at startup: {eager_ms - lazy_ms:.1f}ms")
+
+    assert not leaked, f"Provider SDKs imported at startup: {', '.join(leaked)}"
+    if args.max_ms is not None:
+        assert lazy_ms <= args.max_ms, "Import time exceeds the budget"
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# benchmarks/bench_mosaic.py
+# !/usr/bin/env python
+"""
+Бенчмарк мозаики против отправки фото по отдельности.
+
+Для каждого приема пищи из разметки и каждого провайдера сравниваются:
+    per_image - запрос на каждое фото (LLM_MULTI_IMAGE_MODE=per_image)
+    single_request - все фото в одном запросе
+    mosaic - все фото одной мозаикой (как при LLM_MOSAIC_PROVIDERS)
+Считаются задержка приема пищи (p50/p95), число запросов, токены запроса
+и ответа по данным провайдера (телеметрия ai_agent), объем отправленных
+изображений и средняя относительная ошибка КБЖУ против разметки.
+
+Разметка - <dataset>/labels.json:
+    [{"images": ["lunch_1.jpg", "lunch_2.jpg"], "dishes": [{"name": "Борщ",
+      "weight": 300, "calories": 147, "protein": 4.5, "fat": 5.4,
+      "carbohydrates": 20.4}]}]
+
+Запуск:
+    python benchmarks/bench_mosaic.py --dataset eval/meals \
+        --providers gigachat,openai --mode live
+    python benchmarks/bench_mosaic.py --dataset eval/meals --mode stub
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+from eval_prompts import MACROS, percentile, str_list, totals
+
+STRATEGIES = ("per_image", "single_request", "mosaic")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", required=True, help="Каталог с labels.json")
+    parser.add_argument("--providers", type=str_list, default=["gigachat"])
+    parser.add_argument("--mode", default="live", choices=["live", "stub"])
+    parser.add_argument("--latency", type=float, default=0.5, help="Задержка stub")
+    parser.add_argument("--tile-size", type=int, default=768)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    return parser.parse_args()
+
+
+def load_meals(directory: Path) -> list[dict]:
+    with open(directory / "labels.json", encoding="utf-8") as file:
+        meals = json.load(file)
+    for meal in meals:
+        meal["bytes"] = [(directory / image).read_bytes() for image in meal["images"]]
+        meal["truth"] = totals(meal["dishes"])
+    return meals
+
+
+def counter_sum(counters: dict[str, float], name: str, label: str = "") -> float:
+    """Сумма счетчика по всем labels (с фильтром по подстроке label)"""
+    return sum(
+        value
+        for key, value in counters.items()
+        if key.split("{", 1)[0] == name and label in key
+    )
+
+
+async def evaluate(
+    args: argparse.Namespace, meals: list[dict], provider, strategy: str
+) -> dict:
+    from ai_agent import FoodAnalysisService
+    from ai_agent.config import MultiImageMode
+    from ai_agent.metrics import metrics
+    from ai_agent.scheduler import Lane
+
+    service = FoodAnalysisService()
+    service._providers = [(provider, None)]
+    service._mosaic_providers = {provider} if strategy == "mosaic" else set()
+    service._mosaic_tile_size = args.tile_size
+    service._mosaic_quality = args.quality
+    mode = (
+        MultiImageMode.PER_IMAGE
+        if strategy == "per_image"
+        else MultiImageMode.SINGLE_REQUEST
+    )
+
+    metrics.reset()
+    latencies: list[float] = []
+    errors: dict[str, list[float]] = {macro: [] for macro in MACROS}
+    for meal in meals:
+        started = time.perf_counter()
+        # Фото одного приема пищи: пользователь ждет ответ
+        dishes = await service.analyze_multiple_food_images(
+            meal["bytes"], mode=mode, lane=Lane.INTERACTIVE
+        )
+        latencies.append(time.perf_counter() - started)
+
+        predicted = totals([dish.model_dump() for dish in dishes])
+        for macro in MACROS:
+            truth = meal["truth"][macro]
+            if truth > 0:
+                errors[macro].append(abs(predicted[macro] - truth) / truth)
+
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    upload_bytes = sum(
+        histogram["sum"]
+        for key, histogram in snapshot["histograms"].items()
+        if key.startswith("ai_agent_llm_upload_bytes")
+    )
+    count = len(meals)
+    return {
+        "provider": provider.value,
+        "strategy": strategy,
+        "meals": count,
+        "requests": int(counter_sum(counters, "ai_agent_llm_calls_total")),
+        "tokens_in_mean": round(
+            counter_sum(counters, "ai_agent_llm_tokens_total", 'kind="prompt"') / count,
+            1,
+        ),
+        "tokens_out_mean": round(
+            counter_sum(counters, "ai_agent_llm_tokens_total", 'kind="completion"')
+            / count,
+            1,
+        ),
+        "upload_kb_mean": round(upload_bytes / count / 1024, 1),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "mape": {
+            macro: round(sum(values) / len(values), 3) if values else None
+            for macro, values in errors.items()
+        },
+    }
+
+
+def render_table(results: list[dict]) -> str:
+    header = (
+        "provider",
+        "strategy",
+        "req",
+        "tok_in",
+        "tok_out",
+        "upload_kb",
+        "p50_ms",
+        "p95_ms",
+        *(f"mape_{macro[:4]}" for macro in MACROS),
+    )
+    rows = [header]
+    for result in results:
+        rows.append(
+            (
+                result["provider"],
+                result["strategy"],
+                str(result["requests"]),
+                str(result["tokens_in_mean"]),
+                str(result["tokens_out_mean"]),
+                str(result["upload_kb_mean"]),
+                str(result["latency_p50_ms"]),
+                str(result["latency_p95_ms"]),
+                *(
+                    "-" if value is None else f"{value:.1%}"
+                    for value in result["mape"].values()
+                ),
+            )
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows
+    )
+
+
+async def run_all(args: argparse.Namespace) -> list[dict]:
+    from ai_agent.config import LLMProvider
+
+    meals = load_meals(Path(args.dataset))
+    providers = [LLMProvider.FAKE] if args.mode == "stub" else args.providers
+    results = []
+    for provider_name in providers:
+        for strategy in STRATEGIES:
+            results.append(
+                await evaluate(args, meals, LLMProvider(provider_name), strategy)
+            )
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    # Каждый запрос идет к провайдеру: без объединения, хеджирования и кэша файлов
+    os.environ["LLM_SINGLE_FLIGHT_ENABLED"] = "false"
+    os.environ["LLM_HEDGING_ENABLED"] = "false"
+    os.environ["LLM_GIGACHAT_FILE_CACHE_ENABLED"] = "false"
+    if args.mode == "stub":
+        # Без сети: ключи провайдеров не нужны
+        os.environ["ACTIVE_LLM_PROVIDER"] = "fake"
+        os.environ["LLM_PROVIDER_CHAIN"] = "fake"
+        os.environ["LLM_FAKE_LATENCY_MEAN"] = str(args.latency)
+    else:
+        os.environ["LLM_PROVIDER_CHAIN"] = ",".join(args.providers)
+
+    import django
+
+    django.setup()
+
+    results = asyncio.run(run_all(args))
+    print(render_table(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
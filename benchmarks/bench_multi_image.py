@@ -0,0 +1,94 @@
+# benchmarks/bench_multi_image.py
+# !/usr/bin/env python
+"""
+Бенчмарк режимов analyze_multiple_food_images.
+
+Сравнивает запрос на каждое изображение (per_image) с одним запросом
+на все изображения (single_request). Провайдер имитируется задержкой:
+базовая задержка запроса плюс задержка на каждое изображение в нем.
+
+Запуск:
+    python benchmarks/bench_multi_image.py --images 8 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+from ai_agent import FoodAnalysisService
+from ai_agent.config import MultiImageMode
+from ai_agent.scheduler import Lane
+
+DISH = {
+    "name": "Блюдо",
+    "weight": 100,
+    "calories": 200,
+    "protein": 10,
+    "fat": 5,
+    "carbohydrates": 20,
+}
+
+
+class SimulatedProviderService(FoodAnalysisService):
+    """Сервис с имитацией задержки провайдера вместо сетевых вызовов"""
+
+    def __init__(self, base_latency: float, image_latency: float) -> None:
+        super().__init__(llm_client=object())
+        self.base_latency = base_latency
+        self.image_latency = image_latency
+        self.requests = 0
+
+    async def _astream(
+        self,
+        images_bytes,
+        client=None,
+        text=None,
+        prompt=None,
+        structured=None,
+        credential=0,
+    ):
+        self.requests += 1
+        await asyncio.sleep(self.base_latency + self.image_latency * len(images_bytes))
+        yield json.dumps([DISH] * len(images_bytes))
+
+
+async def run_mode(
+    mode: MultiImageMode, args: argparse.Namespace
+) -> tuple[float, int, int]:
+    service = SimulatedProviderService(args.base_latency, args.image_latency)
+    images = [os.urandom(1024) for _ in range(args.images)]
+    started = time.perf_counter()
+    dishes = await service.analyze_multiple_food_images(
+        images, mode=mode, concurrency=args.concurrency, lane=Lane.INTERACTIVE
+    )
+    return time.perf_counter() - started, service.requests, len(dishes)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-latency", type=float, default=1.0)
+    parser.add_argument("--image-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    for mode in MultiImageMode:
+        elapsed, requests, dishes = asyncio.run(run_mode(mode, args))
+        print(
+            f"{mode.value:>14}: {elapsed:.2f}s, "
+            f"requests={requests}, dishes={dishes}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# benchmarks/bench_photo_load.py
+# !/usr/bin/env python
+"""
+Нагрузочный бенчмарк фото-пути create_meals_by_photo.
+
+Запросы идут в Django ASGI приложение в процессе (httpx.ASGITransport,
+без сети), провайдер LLM - фейковый (LLMProvider.FAKE) с заданной задержкой.
+Перебираются уровни конкурентности, количество и размер фото (JPEG
+с шумом, проходящие предварительную проверку ai_agent.prescreen); для каждого
+сценария считаются p50/p95/p99, пропускная способность, пиковая память
+и количество SQL запросов. Результат - JSON.
+
+Используется тестовая БД (как в manage.py test): PostgreSQL из настроек
+проекта (DB_NAME, DB_USER, DB_PASSWORD, localhost:5432; создается
+test_<DB_NAME>) или, с --sqlite, SQLite во временном файле - без PostgreSQL,
+но запись в SQLite сериализуется, и при высокой конкурентности задержки выше.
+
+Завершается с кодом 1, если доля ответов не 201 в сценарии больше
+--max-error-rate (по умолчанию 0: ошибки означают, что измерен не тот путь),
+а с --baseline - и при регрессии p95 относительно предыдущего прогона.
+
+Запуск:
+    python benchmarks/bench_photo_load.py --concurrency 1,4,16 --photos 1,3 \
+        --size-kb 200,2000 --requests 50 --output load.json
+    python benchmarks/bench_photo_load.py --sqlite --concurrency 1,4 --requests 20
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+URL = "http://testserver/api/app/v1/food_diary/photo"
+# Тип приема пищи из Meal.MealTypes
+MEAL_TYPE = "обед"
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16])
+    parser.add_argument("--photos", type=int_list, default=[1, 3])
+    parser.add_argument("--size-kb", type=int_list, default=[200, 2000])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--latency-stddev", type=float, default=0.1)
+    parser.add_argument(
+        "--latency-distribution",
+        default="lognormal",
+        choices=["constant", "uniform", "normal", "lognormal"],
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--keepdb", action="store_true")
+    parser.add_argument(
+        "--sqlite", action="store_true", help="SQLite вместо PostgreSQL"
+    )
+    parser.add_argument("--output", help="Файл для JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Допустимый рост p95 относительно baseline (доля)",
+    )
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.0,
+        help="Допустимая доля ответов не 201 в сценарии (с --failure-rate)",
+    )
+    return parser.parse_args()
+
+
+def configure_fake_provider(args: argparse.Namespace) -> None:
+    """Настройки фейкового провайдера до первого чтения LLMSettings"""
+    os.environ["ACTIVE_LLM_PROVIDER"] = "fake"
+    os.environ["LLM_PROVIDER_CHAIN"] = "fake"
+    os.environ["LLM_HEDGING_ENABLED"] = "false"
+    os.environ["LLM_FAKE_LATENCY_DISTRIBUTION"] = args.latency_distribution
+    os.environ["LLM_FAKE_LATENCY_MEAN"] = str(args.latency)
+    os.environ["LLM_FAKE_LATENCY_STDDEV"] = str(args.latency_stddev)
+    os.environ["LLM_FAKE_FAILURE_RATE"] = str(args.failure_rate)
+
+
+class QueryCounter:
+    """Считает SQL запросы во всех соединениях, включая потоки sync view"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender=None, connection=None, **kwargs) -> None:
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def make_jpeg(size_kb: int, seed: int = 0) -> bytes:
+    """JPEG около size_kb: шум на градиенте, как резкий снимок средней яркости"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    target = size_kb * 1024
+    side = max(64, int((target / 1.5) ** 0.5))
+    for _ in range(4):
+        gradient = np.linspace(40, 200, side)[None, :, None]
+        noise = rng.normal(0, 40, (side, side, 3))
+        pixels = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+        output = io.BytesIO()
+        Image.fromarray(pixels).save(output, format="JPEG", quality=90)
+        data = output.getvalue()
+        if abs(len(data) - target) <= target * 0.1:
+            break
+        # Размер JPEG шума примерно пропорционален площади кадра
+        side = max(64, int(side * (target / len(data)) ** 0.5))
+    return data
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak if sys.platform == "darwin" else peak * 1024) / 2**20
+
+
+async def run_scenario(
+    client,
+    queries: QueryCounter,
+    concurrency: int,
+    photos: int,
+    size_kb: int,
+    requests: int,
+) -> dict:
+    files = [
+        ("photos", (f"photo_{index}.jpg", make_jpeg(size_kb, index), "image/jpeg"))
+        for index in range(photos)
+    ]
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post(
+                URL, params={"meal_type": MEAL_TYPE}, files=files
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                errors += 1
+
+    tracemalloc.reset_peak()
+    queries_before = queries.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": f"c{concurrency}-p{photos}-s{size_kb}",
+        "concurrency": concurrency,
+        "photos": photos,
+        "photo_size_kb": size_kb,
+        "requests": requests,
+        "errors": errors,
+        "latency_ms": {
+            name: round(percentile(latencies, value) * 1000, 2)
+            for name, value in (("p50", 50), ("p95", 95), ("p99", 99))
+        },
+        "throughput_rps": round(requests / elapsed, 2),
+        "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 2),
+        "db_queries_per_request": round((queries.count - queries_before) / requests, 2),
+    }
+
+
+async def run_all(args: argparse.Namespace, queries: QueryCounter) -> list[dict]:
+    import httpx
+    from django.core.asgi import get_asgi_application
+
+    transport = httpx.ASGITransport(app=get_asgi_application())
+    async with httpx.AsyncClient(transport=transport, timeout=None) as client:
+        # Прогрев: создание тестового пациента и клиентов провайдера
+        warmup = [("photos", ("warmup.jpg", make_jpeg(20), "image/jpeg"))]
+        await client.post(URL, params={"meal_type": MEAL_TYPE}, files=warmup)
+
+        results = []
+        for concurrency in args.concurrency:
+            for photos in args.photos:
+                for size_kb in args.size_kb:
+                    result = await run_scenario(
+                        client, queries, concurrency, photos, size_kb, args.requests
+                    )
+                    print(
+                        f"{result['scenario']:>18}: "
+                        f"p95={result['latency_ms']['p95']}ms "
+                        f"rps={result['throughput_rps']} "
+                        f"errors={result['errors']}",
+                        file=sys.stderr,
+                    )
+                    results.append(result)
+        return results
+
+
+def regressions(results: list[dict], baseline_path: str, tolerance: float) -> list:
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {item["scenario"]: item for item in json.load(file)["scenarios"]}
+    failed = []
+    for result in results:
+        previous = baseline.get(result["scenario"])
+        if previous is None:
+            continue
+        limit = previous["latency_ms"]["p95"] * (1 + tolerance)
+        if result["latency_ms"]["p95"] > limit:
+            failed.append((result["scenario"], previous["latency_ms"]["p95"], limit))
+    return failed
+
+
+def main() -> int:
+    args = parse_args()
+    configure_fake_provider(args)
+
+    if args.sqlite:
+        from django.conf import settings
+
+        # Файл, а не память: конкурентные записи ждут блокировку (timeout),
+        # а не падают с "database table is locked"
+        path = os.path.join(tempfile.gettempdir(), "bench_photo_load.sqlite3")
+        settings.DATABASES["default"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": path,
+            "TEST": {"NAME": path},
+            "OPTIONS": {"timeout": 30},
+        }
+
+    import django
+
+    django.setup()
+
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    queries = QueryCounter()
+    connection_created.connect(queries.install)
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=args.keepdb)
+    for connection in connections.all():
+        queries.install(connection=connection)
+
+    tracemalloc.start()
+    try:
+        results = asyncio.run(run_all(args, queries))
+    finally:
+        tracemalloc.stop()
+        teardown_databases(old_config, verbosity=0, keepdb=args.keepdb)
+        teardown_test_environment()
+
+    report = {
+        "provider": {
+            "distribution": args.latency_distribution,
+            "latency": args.latency,
+            "latency_stddev": args.latency_stddev,
+            "failure_rate": args.failure_rate,
+        },
+        "scenarios": results,
+    }
+    rendered = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(rendered)
+    else:
+        print(rendered)
+
+    status = 0
+    for result in results:
+        if result["errors"] > result["requests"] * args.max_error_rate:
+            print(
+                f"ERRORS {result['scenario']}: {result['errors']} of "
+                f"{result['requests']} responses were not 201",
+                file=sys.stderr,
+            )
+            status = 1
+
+    if args.baseline:
+        failed = regressions(results, args.baseline, args.max_regression)
+        for scenario, previous, limit in failed:
+            print(
+                f"REGRESSION {scenario}: p95 above {limit:.2f}ms "
+                f"(baseline {previous:.2f}ms)",
+                file=sys.stderr,
+            )
+        if failed:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
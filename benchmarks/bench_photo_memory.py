@@ -0,0 +1,105 @@
+# benchmarks/bench_photo_memory.py
+# !/usr/bin/env python
+"""
+Бенчмарк памяти фото-пути: загруженные файлы -> analyze_food_image.
+
+Запрос проходит весь путь анализа, как в create_meals_by_photo: фоновый
+event loop (ai_agent.runner), хеширование фото, single-flight, вызов
+провайдера через breaker и телеметрию, разбор потока блюд. Провайдер
+LLM - фейковый (LLMProvider.FAKE) без задержки.
+
+Проверяет, что пиковый прирост RSS на запрос не превышает --max-peak-mb
+(по умолчанию 50MB), то есть фото читаются потоково, а не целиком
+в память.
+
+Запуск:
+    python benchmarks/bench_photo_memory.py --photos 10 --size-mb 10
+"""
+import argparse
+import os
+import resource
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+# Фейковый провайдер без задержки - до первого чтения LLMSettings
+os.environ["ACTIVE_LLM_PROVIDER"] = "fake"
+os.environ["LLM_PROVIDER_CHAIN"] = "fake"
+os.environ["LLM_HEDGING_ENABLED"] = "false"
+os.environ["LLM_FAKE_LATENCY_MEAN"] = "0"
+os.environ["LLM_FAKE_FAILURE_RATE"] = "0"
+
+import django
+
+django.setup()
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+from ai_agent import FoodAnalysisService
+from ai_agent.runner import run_sync
+
+
+def peak_rss_bytes() -> int:
+    """Пиковый RSS процесса (ru_maxrss в Linux указывается в килобайтах)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def make_photos(count: int, size: int) -> list[TemporaryUploadedFile]:
+    """Создать временные загруженные файлы, как их отдает Django"""
+    photos = []
+    chunk = os.urandom(1024 * 1024)
+    for index in range(count):
+        photo = TemporaryUploadedFile(
+            f"photo_{index}.jpg", "image/jpeg", size, charset=None
+        )
+        written = 0
+        while written < size:
+            written += photo.write(chunk[: size - written])
+        photo.flush()
+        photos.append(photo)
+    return photos
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--photos", type=int, default=10)
+    parser.add_argument("--size-mb", type=int, default=10)
+    parser.add_argument(
+        "--max-peak-mb",
+        type=float,
+        default=50.0,
+        help="Допустимый пиковый прирост RSS на запрос в MB",
+    )
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    photos = make_photos(args.photos, size)
+    warmup = make_photos(1, 1024)
+
+    service = FoodAnalysisService()
+    # Прогрев: ленивые импорты, клиент провайдера и фоновый loop
+    # не относятся к памяти запроса
+    run_sync(service.analyze_food_image(warmup))
+    baseline = peak_rss_bytes()
+
+    dishes = run_sync(service.analyze_food_image(photos))
+
+    peak_delta = peak_rss_bytes() - baseline
+    budget = int(args.max_peak_mb * 2**20)
+
+    print(f"photos: {args.photos} x {args.size_mb}MB")
+    print(f"dishes: {len(dishes)}")
+    print(f"peak RSS delta: {peak_delta / 2**20:.1f}MB (budget {args.max_peak_mb}MB)")
+
+    for photo in photos + warmup:
+        photo.close()
+
+    assert dishes, "Fake provider returned no dishes: the analysis path failed"
+    assert peak_delta <= budget, "Peak RSS per request exceeds the budget"
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# benchmarks/bench_routing.py
+# !/usr/bin/env python
+"""
+Бенчмарк маршрутизации запросов между легкой и основной моделью провайдера.
+
+Каждый прием пищи из разметки (все его фото одним запросом) анализируется
+для каждого провайдера двумя способами:
+    standard - все запросы основной модели (LLM_ROUTING_ENABLED=false)
+    routed - простые запросы легкой модели (ai_agent.routing)
+Считаются доля запросов легкой модели, задержка приема пищи (p50/p95)
+в целом и по маршрутам, среднее время ответа модели по маршрутам
+(телеметрия ai_agent) и средняя относительная ошибка КБЖУ против разметки -
+экономия задержки не должна стоить точности.
+
+Легкие модели задаются как в сервисе: OPENAI_LIGHT_MODEL,
+GIGACHAT_LIGHT_MODEL, DEEPSEEK_LIGHT_MODEL. В режиме stub легкая модель -
+фейковый провайдер с задержкой --light-latency (проверка харнесса,
+точность не показательна).
+
+Разметка - <dataset>/labels.json:
+    [{"images": ["lunch_1.jpg"], "dishes": [{"name": "Борщ", "weight": 300,
+      "calories": 147, "protein": 4.5, "fat": 5.4, "carbohydrates": 20.4}]}]
+
+Запуск:
+    OPENAI_LIGHT_MODEL=gpt-4o-mini python benchmarks/bench_routing.py \
+        --dataset eval/meals --providers openai --mode live
+    python benchmarks/bench_routing.py --dataset eval/meals --mode stub \
+        --latency 1.0 --light-latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+from bench_mosaic import counter_sum, load_meals
+from eval_prompts import MACROS, percentile, str_list, totals
+
+STRATEGIES = ("standard", "routed")
+ROUTES = ("light", "standard")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", required=True, help="Каталог с labels.json")
+    parser.add_argument("--providers", type=str_list, default=["gigachat"])
+    parser.add_argument("--mode", default="live", choices=["live", "stub"])
+    parser.add_argument("--latency", type=float, default=1.0, help="Задержка stub")
+    parser.add_argument(
+        "--light-latency", type=float, default=0.3, help="Задержка легкой модели stub"
+    )
+    parser.add_argument("--max-images", type=int, default=1)
+    parser.add_argument("--max-image-bytes", type=int, default=2_000_000)
+    parser.add_argument("--max-entropy", type=float, help="Порог энтропии фото")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    return parser.parse_args()
+
+
+def latency_ms(samples: list[float]) -> dict:
+    return {
+        "p50": round(percentile(samples, 50) * 1000, 1),
+        "p95": round(percentile(samples, 95) * 1000, 1),
+    }
+
+
+async def evaluate(meals: list[dict], provider, strategy: str) -> dict:
+    from ai_agent import FoodAnalysisService
+    from ai_agent.config import get_llm_settings
+    from ai_agent.metrics import metrics
+
+    get_llm_settings().routing_enabled = strategy == "routed"
+    service = FoodAnalysisService()
+    service._providers = [(provider, None)]
+
+    metrics.reset()
+    latencies: dict[str, list[float]] = {route: [] for route in ROUTES}
+    errors: dict[str, list[float]] = {macro: [] for macro in MACROS}
+    for meal in meals:
+        light_before = metrics.get(
+            "ai_agent_routing_total", route="light", reason="simple"
+        )
+        started = time.perf_counter()
+        dishes = await service.analyze_food_image(meal["bytes"])
+        elapsed = time.perf_counter() - started
+        light = (
+            metrics.get("ai_agent_routing_total", route="light", reason="simple")
+            > light_before
+        )
+        latencies["light" if light else "standard"].append(elapsed)
+
+        predicted = totals([dish.model_dump() for dish in dishes])
+        for macro in MACROS:
+            truth = meal["truth"][macro]
+            if truth > 0:
+                errors[macro].append(abs(predicted[macro] - truth) / truth)
+
+    snapshot = metrics.snapshot()
+    chat_seconds = {}
+    for route in ROUTES:
+        matched = [
+            histogram
+            for key, histogram in snapshot["histograms"].items()
+            if key.startswith("ai_agent_llm_route_chat_seconds")
+            and f'route="{route}"' in key
+        ]
+        count = sum(histogram["count"] for histogram in matched)
+        chat_seconds[route] = (
+            round(sum(histogram["sum"] for histogram in matched) / count * 1000, 1)
+            if count
+            else None
+        )
+
+    all_latencies = [value for samples in latencies.values() for value in samples]
+    return {
+        "provider": provider.value,
+        "strategy": strategy,
+        "meals": len(meals),
+        "requests": int(counter_sum(snapshot["counters"], "ai_agent_llm_calls_total")),
+        "light_share": round(len(latencies["light"]) / len(meals), 3),
+        "latency_ms": latency_ms(all_latencies),
+        "route_latency_ms": {
+            route: latency_ms(samples) for route, samples in latencies.items()
+        },
+        "chat_mean_ms": chat_seconds,
+        "mape": {
+            macro: round(sum(values) / len(values), 3) if values else None
+            for macro, values in errors.items()
+        },
+    }
+
+
+def render_table(results: list[dict]) -> str:
+    header = (
+        "provider",
+        "strategy",
+        "light",
+        "p50_ms",
+        "p95_ms",
+        "light_p50",
+        "std_p50",
+        *(f"mape_{macro[:4]}" for macro in MACROS),
+    )
+    rows = [header]
+    for result in results:
+        routes = result["route_latency_ms"]
+        rows.append(
+            (
+                result["provider"],
+                result["strategy"],
+                f"{result['light_share']:.0%}",
+                str(result["latency_ms"]["p50"]),
+                str(result["latency_ms"]["p95"]),
+                str(routes["light"]["p50"]),
+                str(routes["standard"]["p50"]),
+                *(
+                    "-" if value is None else f"{value:.1%}"
+                    for value in result["mape"].values()
+                ),
+            )
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows
+    )
+
+
+async def run_all(args: argparse.Namespace) -> list[dict]:
+    from ai_agent.config import LLMProvider
+
+    meals = load_meals(Path(args.dataset))
+    providers = [LLMProvider.FAKE] if args.mode == "stub" else args.providers
+    results = []
+    for provider_name in providers:
+        for strategy in STRATEGIES:
+            results.append(await evaluate(meals, LLMProvider(provider_name), strategy))
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    # Каждый запрос идет к провайдеру: без объединения, хеджирования и кэша файлов
+    os.environ["LLM_SINGLE_FLIGHT_ENABLED"] = "false"
+    os.environ["LLM_HEDGING_ENABLED"] = "false"
+    os.environ["LLM_GIGACHAT_FILE_CACHE_ENABLED"] = "false"
+    os.environ["LLM_ROUTING_MAX_IMAGES"] = str(args.max_images)
+    os.environ["LLM_ROUTING_MAX_IMAGE_BYTES"] = str(args.max_image_bytes)
+    if args.max_entropy is not None:
+        os.environ["LLM_ROUTING_MAX_ENTROPY"] = str(args.max_entropy)
+    if args.mode == "stub":
+        # Без сети: ключи провайдеров не нужны
+        os.environ["ACTIVE_LLM_PROVIDER"] = "fake"
+        os.environ["LLM_PROVIDER_CHAIN"] = "fake"
+        os.environ["LLM_FAKE_LATENCY_MEAN"] = str(args.latency)
+        os.environ["LLM_FAKE_LIGHT_LATENCY_MEAN"] = str(args.light_latency)
+    else:
+        os.environ["LLM_PROVIDER_CHAIN"] = ",".join(args.providers)
+
+    import django
+
+    django.setup()
+
+    results = asyncio.run(run_all(args))
+    print(render_table(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
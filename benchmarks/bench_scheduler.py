@@ -0,0 +1,146 @@
+# benchmarks/bench_scheduler.py
+# !/usr/bin/env python
+"""
+Бенчмарк планировщика вызовов провайдера под фоновой нагрузкой.
+
+Лимитер провайдера (AdaptiveLimiter с фиксированным лимитом) нагружается
+одновременно:
+    - фоновым заданием клиники: --background-workers вызовов подряд без пауз;
+    - интерактивными загрузками фото: пуассоновский поток --rate вызовов
+      в секунду от --patients пациентов, один из которых (--heavy-share)
+      присылает большую часть фото.
+Сравниваются:
+    fifo - все вызовы в одной полосе и одной очереди (поведение до планировщика)
+    scheduled - фоновые вызовы в полосе background, интерактивные - по пациентам
+Печатаются ожидание слота интерактивных вызовов (p50/p95/p99) отдельно для
+тяжелого и остальных пациентов и пропускная способность фонового задания.
+
+Запуск:
+    python benchmarks/bench_scheduler.py --limit 8 --background-workers 32 \
+        --rate 4 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agent.concurrency_limiter import AdaptiveLimiter
+from ai_agent.scheduler import Lane, request_scope
+
+STRATEGIES = ("fifo", "scheduled")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--background-share", type=float, default=0.5)
+    parser.add_argument("--background-workers", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=4.0, help="Вызовов в секунду")
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--heavy-share", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=1.0, help="Вызов, сек")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    return parser.parse_args()
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def run_strategy(args: argparse.Namespace, strategy: str) -> dict:
+    rng = random.Random(args.seed)
+    limiter = AdaptiveLimiter(
+        strategy,
+        initial_limit=args.limit,
+        min_limit=args.limit,
+        max_limit=args.limit,
+        max_queue=100_000,
+        background_share=args.background_share,
+    )
+    scheduled = strategy == "scheduled"
+    waits: dict[str, list[float]] = {"heavy": [], "others": []}
+    background_calls = 0
+    stop_at = time.monotonic() + args.duration
+
+    async def call(tenant: str, lane: Lane) -> float:
+        if not scheduled:
+            tenant, lane = "", Lane.INTERACTIVE
+        with request_scope(tenant, lane=lane):
+            started = time.monotonic()
+            async with limiter.slot():
+                waited = time.monotonic() - started
+                await asyncio.sleep(args.latency * rng.uniform(0.5, 1.5))
+        return waited
+
+    async def background_worker() -> None:
+        nonlocal background_calls
+        while time.monotonic() < stop_at:
+            await call("clinic", Lane.BACKGROUND)
+            background_calls += 1
+
+    async def interactive_call(patient: int) -> None:
+        waited = await call(f"patient-{patient}", Lane.INTERACTIVE)
+        waits["heavy" if patient == 0 else "others"].append(waited)
+
+    async def interactive_arrivals() -> None:
+        calls = []
+        while time.monotonic() < stop_at:
+            await asyncio.sleep(rng.expovariate(args.rate))
+            patient = (
+                0
+                if rng.random() < args.heavy_share
+                else rng.randrange(1, args.patients)
+            )
+            calls.append(asyncio.ensure_future(interactive_call(patient)))
+        await asyncio.gather(*calls)
+
+    await asyncio.gather(
+        interactive_arrivals(),
+        *(background_worker() for _ in range(args.background_workers)),
+    )
+    return {
+        "strategy": strategy,
+        "background_calls_per_s": round(background_calls / args.duration, 2),
+        **{
+            f"{group}_wait_ms": {
+                name: round(percentile(samples, value) * 1000, 1)
+                for name, value in (("p50", 50), ("p95", 95), ("p99", 99))
+            }
+            for group, samples in waits.items()
+        },
+        "interactive_calls": sum(len(samples) for samples in waits.values()),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    results = [asyncio.run(run_strategy(args, strategy)) for strategy in STRATEGIES]
+
+    print(f"{'strategy':<12}{'group':<8}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}")
+    for result in results:
+        for group in ("heavy", "others"):
+            wait = result[f"{group}_wait_ms"]
+            print(
+                f"{result['strategy']:<12}{group:<8}"
+                f"{wait['p50']:>10}{wait['p95']:>10}{wait['p99']:>10}"
+            )
+        print(f"{'':<12}фон: {result['background_calls_per_s']} вызовов/с")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# benchmarks/eval_prompts.py
+# !/usr/bin/env python
+"""
+Офлайн оценка комбинаций промпт x провайдер на размеченном наборе фото.
+
+Каждое фото прогоняется через FoodAnalysisService (_ainvoke и
+_extract_json_from_response) с выбранным промптом. Для каждой комбинации
+считаются токены запроса и ответа (tiktoken, без токенов изображений -
+они одинаковы для всех промптов), задержка, доля ответов без валидного JSON
+и средняя относительная ошибка КБЖУ приема пищи против разметки.
+
+Режимы ответов:
+    recorded - кассеты <cassettes>/<provider>/<prompt>/<digest>.json
+        (задержка - записанная задержка провайдера)
+    live - реальные провайдеры, ответы записываются в те же кассеты
+    stub - фейковый провайдер (проверка харнесса, точность не показательна)
+
+Разметка - <dataset>/labels.json:
+    [{"image": "borsch.jpg", "dishes": [{"name": "Борщ", "weight": 300,
+      "calories": 147, "protein": 4.5, "fat": 5.4, "carbohydrates": 20.4}]}]
+
+Запуск:
+    python benchmarks/eval_prompts.py --dataset eval/photos \
+        --prompts food_analise_system_prompt,food_analise_system_prompt_mini \
+        --providers gigachat,openai --mode recorded --cassettes eval/cassettes
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+MACROS = ("calories", "protein", "fat", "carbohydrates")
+
+
+def str_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", required=True, help="Каталог с labels.json")
+    parser.add_argument(
+        "--prompts",
+        type=str_list,
+        default=["food_analise_system_prompt", "food_analise_system_prompt_mini"],
+    )
+    parser.add_argument("--providers", type=str_list, default=["gigachat"])
+    parser.add_argument(
+        "--mode", default="recorded", choices=["recorded", "live", "stub"]
+    )
+    parser.add_argument("--cassettes", default="eval_cassettes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка stub")
+    parser.add_argument("--encoding", default="o200k_base", help="Кодировка tiktoken")
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    return parser.parse_args()
+
+
+def load_dataset(directory: Path) -> list[dict]:
+    with open(directory / "labels.json", encoding="utf-8") as file:
+        samples = json.load(file)
+    for sample in samples:
+        sample["bytes"] = (directory / sample["image"]).read_bytes()
+        sample["truth"] = totals(sample["dishes"])
+    return samples
+
+
+def totals(dishes: list[dict]) -> dict[str, float]:
+    """КБЖУ приема пищи (сумма по блюдам)"""
+    return {
+        macro: sum(float(dish.get(macro, 0)) for dish in dishes) for macro in MACROS
+    }
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def make_client(args: argparse.Namespace, provider, cassette_dir: Path):
+    from ai_agent.client import LLMClient
+    from ai_agent.fake_provider import FakeLLM
+
+    if args.mode == "live":
+        return LLMClient.create_client(provider)
+    if args.mode == "recorded":
+        return FakeLLM(latency_mean=0.0, cassette_dir=str(cassette_dir))
+    return FakeLLM(latency_mean=args.latency)
+
+
+async def evaluate(
+    args: argparse.Namespace, samples: list[dict], provider, prompt_name: str
+) -> dict:
+    from ai_agent import FoodAnalysisService, prompts
+    from ai_agent.fake_provider import CassetteStore
+    from ai_agent.images import images_digest
+
+    import tiktoken
+
+    encoding = tiktoken.get_encoding(args.encoding)
+    prompt = getattr(prompts, prompt_name)
+    cassette_dir = Path(args.cassettes) / provider.value / prompt_name
+    cassettes = CassetteStore(str(cassette_dir))
+    client = make_client(args, provider, cassette_dir)
+
+    service = FoodAnalysisService(llm_client=client)
+    service.prompt = prompt
+
+    tokens_in = len(encoding.encode(prompt))
+    tokens_out: list[int] = []
+    latencies: list[float] = []
+    errors: dict[str, list[float]] = {macro: [] for macro in MACROS}
+    parse_failures = provider_errors = missing = 0
+
+    for sample in samples:
+        images = [sample["bytes"]]
+        digest = images_digest(images)
+        cassette = cassettes.load(digest) if args.mode == "recorded" else None
+        if args.mode == "recorded" and cassette is None:
+            missing += 1
+            continue
+
+        started = time.perf_counter()
+        try:
+            response = await service._ainvoke(images, client=client)
+        except Exception as e:
+            print(f"{sample['image']}: ошибка провайдера: {e}", file=sys.stderr)
+            provider_errors += 1
+            continue
+        elapsed = time.perf_counter() - started
+
+        if args.mode == "live":
+            cassettes.save(digest, response, provider=provider.value, latency=elapsed)
+        latencies.append(cassette["latency"] if cassette else elapsed)
+        tokens_out.append(len(encoding.encode(response)))
+
+        try:
+            dishes_data = service._extract_json_from_response(response)
+        except json.JSONDecodeError:
+            parse_failures += 1
+            continue
+
+        predicted = totals(
+            [service._dish_from_data(dish).model_dump() for dish in dishes_data]
+        )
+        for macro in MACROS:
+            truth = sample["truth"][macro]
+            if truth > 0:
+                errors[macro].append(abs(predicted[macro] - truth) / truth)
+
+    answered = len(tokens_out)
+    return {
+        "provider": provider.value,
+        "model": get_model(provider),
+        "prompt": prompt_name,
+        "samples": len(samples),
+        "missing": missing,
+        "provider_errors": provider_errors,
+        "tokens_in": tokens_in,
+        "tokens_out_mean": round(sum(tokens_out) / answered, 1) if answered else 0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "parse_failure_rate": round(parse_failures / answered, 3) if answered else 0,
+        "mape": {
+            macro: round(sum(values) / len(values), 3) if values else None
+            for macro, values in errors.items()
+        },
+    }
+
+
+def get_model(provider) -> str:
+    from ai_agent.config import get_llm_settings
+
+    try:
+        return get_llm_settings().get_provider_config(provider).get("model", "")
+    except Exception:
+        return ""
+
+
+def render_table(results: list[dict]) -> str:
+    header = (
+        "provider",
+        "prompt",
+        "n",
+        "tok_in",
+        "tok_out",
+        "p50_ms",
+        "p95_ms",
+        "parse_fail",
+        *(f"mape_{macro[:4]}" for macro in MACROS),
+    )
+    rows = [header]
+    for result in results:
+        rows.append(
+            (
+                result["provider"],
+                result["prompt"],
+                str(result["samples"] - result["missing"]),
+                str(result["tokens_in"]),
+                str(result["tokens_out_mean"]),
+                str(result["latency_p50_ms"]),
+                str(result["latency_p95_ms"]),
+                f"{result['parse_failure_rate']:.1%}",
+                *(
+                    "-" if value is None else f"{value:.1%}"
+                    for value in result["mape"].values()
+                ),
+            )
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows
+    )
+
+
+async def run_all(args: argparse.Namespace) -> list[dict]:
+    from ai_agent.config import LLMProvider
+
+    samples = load_dataset(Path(args.dataset))
+    results = []
+    for provider_name in args.providers:
+        for prompt_name in args.prompts:
+            results.append(
+                await evaluate(args, samples, LLMProvider(provider_name), prompt_name)
+            )
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    if args.mode != "live":
+        # Без сети: ключи провайдеров не нужны
+        os.environ["ACTIVE_LLM_PROVIDER"] = "fake"
+        os.environ["LLM_PROVIDER_CHAIN"] = "fake"
+        os.environ["LLM_HEDGING_ENABLED"] = "false"
+
+    import django
+
+    django.setup()
+
+    results = asyncio.run(run_all(args))
+    print(render_table(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# benchmarks/tune_prescreen.py
+# !/usr/bin/env python
+"""
+Подбор порогов локальной проверки фото (ai_agent.prescreen) по выборке.
+
+Выборка - каталог с подкаталогами:
+    good/ - фото еды, которые модель распознает
+    bad/ - размытые, черные, засвеченные кадры, скриншоты
+Для каждого признака выбирается порог, отсекающий больше всего плохих
+фото при доле ошибочно отклоненных хороших не выше --max-false-reject
+(бюджет делится поровну между признаками); порог ставится посередине
+между последним отсеченным плохим и ближайшим хорошим фото. Печатаются
+доли отклоненных фото по признакам, итог по всем порогам, время проверки
+и строки настроек LLM_PRESCREEN_* для .env (признаки, не отделяющие
+плохие фото, не выводятся - остаются значения по умолчанию).
+
+Запуск:
+    python benchmarks/tune_prescreen.py --dataset eval/prescreen \
+        --max-false-reject 0.01
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agent.prescreen import PhotoStats, classify, photo_stats
+
+# (признак, порог, направление: min - отклоняются значения ниже порога)
+FEATURES = (
+    ("sharpness", "min_sharpness", "min"),
+    ("brightness", "min_brightness", "min"),
+    ("brightness", "max_brightness", "max"),
+    ("entropy", "min_entropy", "min"),
+    ("peak_ratio", "max_peak_ratio", "max"),
+)
+
+
+def load_stats(directory: Path, size: int) -> tuple[list[PhotoStats], list[float]]:
+    stats, timings = [], []
+    for path in sorted(directory.iterdir()):
+        if not path.is_file():
+            continue
+        data = path.read_bytes()
+        started = time.perf_counter()
+        try:
+            stats.append(photo_stats(data, size=size))
+        except (OSError, ValueError):
+            print(f"{path.name}: не декодируется", file=sys.stderr)
+            continue
+        timings.append(time.perf_counter() - started)
+    return stats, timings
+
+
+def quantile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def pick_threshold(
+    good: list[float], bad: list[float], direction: str, budget: float
+) -> Optional[float]:
+    """
+    Порог, отсекающий больше всего плохих фото в пределах бюджета ошибок
+    на хороших, или None, если признак не отделяет плохие фото.
+    """
+    # Для порогов max зеркалим значения: всегда отклоняется "ниже порога"
+    sign = 1 if direction == "min" else -1
+    good = sorted(sign * value for value in good)
+    best = None
+    for candidate in sorted(sign * value for value in bad):
+        false_reject = sum(value <= candidate for value in good) / len(good)
+        if false_reject <= budget:
+            best = candidate
+    if best is None:
+        return None
+    nearest_good = min((value for value in good if value > best), default=best)
+    return sign * (best + nearest_good) / 2
+
+
+def rejected(values: list[float], threshold: float, direction: str) -> float:
+    if not values:
+        return 0.0
+    if direction == "min":
+        return sum(value < threshold for value in values) / len(values)
+    return sum(value > threshold for value in values) / len(values)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", required=True, help="Каталог с good/ и bad/")
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--max-false-reject", type=float, default=0.01)
+    args = parser.parse_args()
+
+    dataset = Path(args.dataset)
+    good, good_timings = load_stats(dataset / "good", args.size)
+    bad, bad_timings = load_stats(dataset / "bad", args.size)
+    if not good:
+        print("Нет хороших фото в good/", file=sys.stderr)
+        return 1
+
+    budget = args.max_false_reject / len(FEATURES)
+    thresholds = {"size": args.size}
+    tuned = {"size": args.size}
+    print(f"good={len(good)} bad={len(bad)} бюджет на признак={budget:.2%}\n")
+    print(f"{'порог':<16}{'значение':>10}{'good':>8}{'bad':>8}")
+    for attribute, name, direction in FEATURES:
+        good_values = [getattr(item, attribute) for item in good]
+        bad_values = [getattr(item, attribute) for item in bad]
+        threshold = pick_threshold(good_values, bad_values, direction, budget)
+        if threshold is None:
+            # Признак не участвует в отклонении
+            thresholds[name] = float("-inf") if direction == "min" else float("inf")
+            print(f"{name:<16}{'-':>10}")
+            continue
+        threshold = thresholds[name] = tuned[name] = round(threshold, 3)
+        print(
+            f"{name:<16}{threshold:>10}"
+            f"{rejected(good_values, threshold, direction):>8.1%}"
+            f"{rejected(bad_values, threshold, direction):>8.1%}"
+        )
+
+    false_reject = sum(classify(item, thresholds) is not None for item in good)
+    true_reject = sum(classify(item, thresholds) is not None for item in bad)
+    timings = sorted(good_timings + bad_timings)
+    print(
+        f"\nИтого: отклонено good {false_reject / len(good):.1%}, "
+        f"bad {true_reject / len(bad) if bad else 0:.1%}; "
+        f"время p50 {quantile(timings, 0.5) * 1000:.1f} мс, "
+        f"p95 {quantile(timings, 0.95) * 1000:.1f} мс\n"
+    )
+    for name, value in tuned.items():
+        print(f"LLM_PRESCREEN_{name.upper()}={value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
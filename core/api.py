@@ -1,5 +1,6 @@
 from ninja import NinjaAPI
 from apps.food_diary.web import user_routers
+from ai_agent.web import ai_agent_routers
 
 # Создаем главное API
 api = NinjaAPI(
@@ -10,6 +11,7 @@ api = NinjaAPI(
 
 # Подключаем роуты
 api.add_router("food_diary/", user_routers)  # /api/app/v1/food_diary/*
+api.add_router("ai_agent/", ai_agent_routers)  # /api/app/v1/ai_agent/*
 
 
 # Для тестирования добавим простой эндпоинт
@@ -91,6 +91,9 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Фото крупнее 1MB сохраняются во временный файл и читаются через mmap
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Кастомная модель пользователя